@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+"""測試共用設定：把專案根目錄加入 sys.path，並提供在背景執行緒啟動的本地替身伺服器"""
+
+import os
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from whitopia_standin import StandinService, SyntheticArchive, make_server  # noqa: E402
+
+
+@pytest.fixture
+def standin():
+    """start(service=None) 啟動替身伺服器並返回 (base_url, service)；測試結束時關閉"""
+    servers = []
+
+    def start(service=None):
+        service = service or StandinService(synthetic=SyntheticArchive(45))
+        server = make_server(service, port=0)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return 'http://%s:%d' % server.server_address[:2], service
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def make_scraper(tmp_path):
+    """建立不限速、安靜、選擇器記憶寫在暫存目錄的 WhitopiaScraper"""
+    from whitopia_scraper import WhitopiaScraper
+
+    def make(base_url, **kwargs):
+        kwargs.setdefault('rate_per_host', 0)
+        kwargs.setdefault('quiet', True)
+        kwargs.setdefault('selector_memory_file', str(tmp_path / 'selectors.json'))
+        return WhitopiaScraper(base_url=base_url, **kwargs)
+
+    return make
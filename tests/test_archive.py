@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+"""分頁歸檔爬取及進度文件（中斷後繼續、遇到已見過的項目提前停止）"""
+
+import json
+from itertools import islice
+
+from whitopia_standin import StandinService, SyntheticArchive
+
+
+class NewestFirstArchive(SyntheticArchive):
+    """編號最大（最新）的項目在第一頁，增加 count 相當於發佈新公告"""
+
+    def item(self, index):
+        return super().item(self.count - 1 - index)
+
+
+def start_archive(standin, count=45):
+    service = StandinService(synthetic=NewestFirstArchive(count), conditional=False)
+    base_url, _ = standin(service)
+    return base_url, service
+
+
+def read_checkpoint(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def test_crawls_all_pages_and_records_seen_keys(standin, make_scraper, tmp_path):
+    base_url, service = start_archive(standin)
+    checkpoint_file = str(tmp_path / 'checkpoint.json')
+
+    items = make_scraper(base_url).crawl_news_archive(checkpoint_file=checkpoint_file)
+
+    assert len(items) == 45
+    assert service.stats()['requests'] == 3
+    checkpoint = read_checkpoint(checkpoint_file)
+    assert 'in_progress' not in checkpoint
+    assert len(checkpoint['seen_keys']) == 45
+    assert checkpoint['last_page'] == 3
+
+
+def test_resumes_after_page_limit(standin, make_scraper, tmp_path):
+    base_url, service = start_archive(standin)
+    checkpoint_file = str(tmp_path / 'checkpoint.json')
+
+    first = make_scraper(base_url).crawl_news_archive(checkpoint_file=checkpoint_file, max_pages=1)
+    assert len(first) == 20
+    assert read_checkpoint(checkpoint_file)['in_progress']['page'] == 2
+
+    # 繼續時先返回上次已找到的項目，不重新抓取第一頁
+    resumed = make_scraper(base_url).crawl_news_archive(checkpoint_file=checkpoint_file)
+    assert resumed[:20] == first
+    assert len(resumed) == 45
+    assert service.stats()['requests'] == 3
+
+
+def test_interrupted_page_is_fetched_again(standin, make_scraper, tmp_path):
+    base_url, service = start_archive(standin)
+    checkpoint_file = str(tmp_path / 'checkpoint.json')
+
+    # 讀到第二頁中途停止：只有第一頁的進度已保存
+    items = make_scraper(base_url).iter_news_archive(checkpoint_file=checkpoint_file)
+    partial = list(islice(items, 25))
+    items.close()
+    assert read_checkpoint(checkpoint_file)['in_progress']['items'] == partial[:20]
+
+    resumed = make_scraper(base_url).crawl_news_archive(checkpoint_file=checkpoint_file)
+    assert resumed[:25] == partial
+    assert len(resumed) == 45
+    assert service.stats()['requests'] == 4
+
+
+def test_next_crawl_stops_at_seen_items(standin, make_scraper, tmp_path):
+    base_url, service = start_archive(standin)
+    checkpoint_file = str(tmp_path / 'checkpoint.json')
+    make_scraper(base_url).crawl_news_archive(checkpoint_file=checkpoint_file)
+
+    service.synthetic.count = 50
+    new_items = make_scraper(base_url).crawl_news_archive(checkpoint_file=checkpoint_file)
+
+    assert [item['url'] for item in new_items] == [f'{base_url}/news/{index}/' for index in range(49, 44, -1)]
+    assert service.stats()['requests'] == 4
+    assert len(read_checkpoint(checkpoint_file)['seen_keys']) == 50
+
+
+def test_archive_file_merges_new_items(standin, make_scraper, tmp_path):
+    base_url, service = start_archive(standin)
+    checkpoint_file = str(tmp_path / 'checkpoint.json')
+    output_file = str(tmp_path / 'archive.json')
+    make_scraper(base_url).run_archive_crawl(output_file, checkpoint_file)
+
+    service.synthetic.count = 50
+    results = make_scraper(base_url).run_archive_crawl(output_file, checkpoint_file)
+
+    assert results['total_items'] == 50
+    assert len({item['url'] for item in results['all_news']}) == 50
@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+"""歷史快照批量分析：並行分析並合併重複的開業記錄"""
+
+from whitopia_batch import BatchAnalyzer, analyze_snapshot, find_snapshots
+from whitopia_codec import dump
+
+MINOSHIMA = {'title': 'ホワイトピア美野島店がOPEN', 'content': '福岡県福岡市南区', 'date': '2025-07-07',
+             'url': '/news/1/', 'match_keyword': 'OPEN'}
+FUSEISHI = {'title': 'ホワイトピア高松伏石店がOPEN', 'content': '香川県高松市', 'date': '2025-06-26',
+            'url': '/news/2/', 'match_keyword': 'OPEN'}
+
+
+def write_snapshot(path, scrape_time, items):
+    dump({'scrape_time': scrape_time, 'all_news': items, 'store_news': items}, str(path))
+    return str(path)
+
+
+def test_find_snapshots(tmp_path):
+    for name in ('a.json', 'b.jsonl', 'notes.txt'):
+        (tmp_path / name).write_text('{}', encoding='utf-8')
+    assert find_snapshots([str(tmp_path)]) == [str(tmp_path / 'a.json'), str(tmp_path / 'b.jsonl')]
+
+
+def test_snapshot_records_are_deduplicated_without_full_text(tmp_path):
+    path = write_snapshot(tmp_path / 's.json', '2025-06-30T00:00:00', [FUSEISHI, dict(FUSEISHI)])
+    result = analyze_snapshot(path)
+    assert list(result['records']) == ['ホワイトピア高松伏石店|2025-06-26']
+    assert 'full_text' not in result['records']['ホワイトピア高松伏石店|2025-06-26']
+    assert result['prefecture_stats'] == {'香川県': 1}
+
+
+def test_openings_seen_in_several_snapshots_count_once(tmp_path):
+    snapshots = [
+        write_snapshot(tmp_path / 'old.json', '2025-06-30T00:00:00', [FUSEISHI]),
+        write_snapshot(tmp_path / 'new.json', '2025-07-10T00:00:00', [MINOSHIMA, FUSEISHI]),
+    ]
+    (tmp_path / 'broken.json').write_text('{', encoding='utf-8')
+    snapshots.append(str(tmp_path / 'broken.json'))
+
+    result = BatchAnalyzer(snapshots, max_workers=2).run()
+
+    assert result['snapshots'] == 2
+    assert result['total_stores'] == 2
+    assert [record['store_name'] for record in result['store_openings']] == \
+        ['ホワイトピア美野島店', 'ホワイトピア高松伏石店']
+    fuseishi = result['store_openings'][1]
+    assert fuseishi['snapshots'] == 2
+    assert (fuseishi['first_seen'], fuseishi['last_seen']) == ('2025-06-30T00:00:00', '2025-07-10T00:00:00')
+    assert result['prefecture_stats'] == {'福岡県': 1, '香川県': 1}
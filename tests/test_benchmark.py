@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""基準測試套件：模擬語料、各階段計時及退化比較"""
+
+import json
+
+from whitopia_benchmark import (benchmark_size, compare_with_baseline, format_bytes, generate_news_corpus,
+                                iter_news_items)
+from whitopia_stream import iter_jsonl, read_header
+
+
+def test_corpus_is_reproducible():
+    assert list(iter_news_items(20, seed=1)) == list(iter_news_items(20, seed=1))
+    assert list(iter_news_items(20, seed=1)) != list(iter_news_items(20, seed=2))
+
+
+def test_json_and_jsonl_corpora_flag_the_same_items(tmp_path):
+    json_path = generate_news_corpus(50, str(tmp_path / 'news.json'))
+    jsonl_path = generate_news_corpus(50, str(tmp_path / 'news.jsonl'))
+
+    with open(json_path, 'r', encoding='utf-8') as f:
+        corpus = json.load(f)
+    assert corpus['total_items'] == len(corpus['all_news']) == 50
+    assert 0 < corpus['store_related_items'] == len(corpus['store_news']) < 50
+
+    items = list(iter_jsonl(jsonl_path))
+    assert read_header(jsonl_path)['scrape_time'] == corpus['scrape_time']
+    assert [item['title'] for item in items if item.get('store_related')] == \
+           [item['title'] for item in corpus['store_news']]
+
+
+def test_benchmark_size_reports_every_stage():
+    results = benchmark_size(30, max_parse_items=10, measure_memory=True)
+
+    assert set(results) == {'parse', 'parse_remembered', 'parse_text', 'filter', 'extract', 'statistics'}
+    assert results['parse']['items'] == 10
+    assert results['filter']['items'] == 30
+    assert results['extract']['items'] == results['statistics']['items'] > 0
+    assert all(stage['peak_bytes'] > 0 and stage['items_per_sec'] >= 0 for stage in results.values())
+
+
+def test_compare_with_baseline_flags_slow_stages():
+    baseline = {'100': {'parse': {'items_per_sec': 1000.0}, 'extract': {'items_per_sec': 1000.0}}}
+    report = {'100': {'parse': {'items_per_sec': 700.0}, 'extract': {'items_per_sec': 900.0},
+                      'filter': {'items_per_sec': 1.0}}}
+
+    assert compare_with_baseline(report, baseline, 0.2) == [('100', 'parse', 0.7)]
+    assert compare_with_baseline(report, {}, 0.2) == []
+
+
+def test_format_bytes():
+    assert format_bytes(None) == '-'
+    assert format_bytes(512) == '512B'
+    assert format_bytes(2048) == '2KB'
+    assert format_bytes(3 * 1024 ** 2) == '3MB'
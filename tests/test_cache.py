@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""回應快取及 304 重新驗證流程"""
+
+import os
+
+from whitopia_cache import ResponseCache
+
+
+def test_second_fetch_is_revalidated_with_304(standin, make_scraper, tmp_path):
+    base_url, service = standin()
+    cache = ResponseCache(str(tmp_path / 'cache'))
+    scraper = make_scraper(base_url, cache=cache)
+
+    first = scraper.get_page(base_url + '/news/')
+    second = scraper.get_page(base_url + '/news/')
+
+    assert second.content == first.content
+    assert service.stats()['not_modified'] == 1
+    assert cache.stats['misses'] == 1
+    assert cache.stats['hits'] == 1
+
+
+def test_missing_body_is_refetched_and_counted_once(standin, make_scraper, tmp_path, monkeypatch):
+    base_url, service = standin()
+    cache = ResponseCache(str(tmp_path / 'cache'))
+    scraper = make_scraper(base_url, cache=cache)
+    url = base_url + '/news/page/2/'
+    scraper.get_page(url)
+
+    # 條件請求已發出後內容文件才遺失：伺服器返回 304，快取無法還原，必須重新下載
+    conditional_headers = cache.conditional_headers
+
+    def headers_then_lose_body(target):
+        headers = conditional_headers(target)
+        os.remove(cache._path(cache._key(target), '.body'))
+        return headers
+
+    monkeypatch.setattr(cache, 'conditional_headers', headers_then_lose_body)
+    response = scraper.get_page(url)
+
+    assert 'お知らせ' in response.text
+    assert service.stats()['not_modified'] == 1
+    assert service.stats()['ok'] == 2
+    assert cache.stats['misses'] == 2
+    assert cache.stats['hits'] == 0
+
+
+def test_streamed_body_is_cached_only_when_fully_read(standin, make_scraper, tmp_path):
+    base_url, _ = standin()
+    cache = ResponseCache(str(tmp_path / 'cache'))
+    scraper = make_scraper(base_url, cache=cache)
+
+    response = scraper.get_page(base_url + '/news/1/', stream=True)
+    next(response.iter_content(16))
+    response.close()
+    assert cache.conditional_headers(base_url + '/news/1/') == {}
+
+    response = scraper.get_page(base_url + '/news/2/', stream=True)
+    content = b''.join(response.iter_content(1024))
+    response.close()
+    assert cache.conditional_headers(base_url + '/news/2/')
+    assert scraper.get_page(base_url + '/news/2/').content == content
+
+
+def test_prune_keeps_most_recently_used_entries(standin, make_scraper, tmp_path):
+    base_url, _ = standin()
+    cache = ResponseCache(str(tmp_path / 'cache'), max_entries=2)
+    scraper = make_scraper(base_url, cache=cache)
+
+    for page in (1, 2, 3):
+        scraper.get_page(f'{base_url}/news/{page}/')
+
+    assert len(cache.index) == 2
+    assert cache.conditional_headers(base_url + '/news/1/') == {}
+    assert cache.conditional_headers(base_url + '/news/3/')
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+"""whitopia 命令行工具：子命令分派及延遲匯入"""
+
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+import whitopia
+from whitopia import COMMANDS, load_command, main, print_usage
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run_python(code):
+    """在新的直譯器中執行，返回最後一行輸出的 JSON"""
+    output = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True, check=True)
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def test_usage_lists_every_command(capsys):
+    print_usage()
+    out = capsys.readouterr().out
+    for name in COMMANDS:
+        assert f"  {name}" in out
+
+    assert main([]) == 0
+    assert 'whitopia <子命令>' in capsys.readouterr().out
+
+
+def test_unknown_command_exits_with_usage_on_stderr(capsys):
+    assert main(['nope']) == 2
+    err = capsys.readouterr().err
+    assert '未知的子命令: nope' in err
+    assert '子命令:' in err
+
+
+def test_load_command_picks_module():
+    assert load_command('report') is whitopia.report_main
+    assert load_command('analyze').__module__ == 'whitopia_improved_analyzer'
+    assert load_command('analyze', ['--basic']).__module__ == 'whitopia_analyzer'
+    assert load_command('codec').__module__ == 'whitopia_codec'
+
+
+def test_report_from_saved_analysis(tmp_path):
+    analysis = {
+        'analysis_time': '2025-07-25T10:00:00',
+        'total_stores': 1,
+        'store_openings': [{'store_name': 'ホワイトピア高松店', 'date': '2025-07-07', 'prefecture': '香川県',
+                            'city': '高松市', 'match_keyword': 'オープン', 'url': '', 'full_text': '...'}],
+        'monthly_stats': {'2025-07': 1},
+        'prefecture_stats': {'香川県': 1},
+        'summary': {'total_identified_stores': 1, 'prefectures_count': 1,
+                    'date_range': {'start': '2025-07', 'end': '2025-07'}},
+    }
+    source = tmp_path / 'analysis.json'
+    source.write_text(json.dumps(analysis, ensure_ascii=False), encoding='utf-8')
+    output = tmp_path / 'report.md'
+
+    assert main(['report', str(source), '--output', str(output), '--quiet']) == 0
+
+    report = output.read_text(encoding='utf-8')
+    assert '### 1. ホワイトピア高松店' in report
+    assert '- **📍 所在地區**: 香川県 高松市' in report
+
+
+def test_subcommand_help_uses_program_name(capsys, monkeypatch):
+    monkeypatch.setattr(sys, 'argv', ['whitopia'])
+    with pytest.raises(SystemExit) as exc:
+        main(['codec', '--help'])
+    assert exc.value.code == 0
+    assert capsys.readouterr().out.startswith('usage: whitopia codec')
+
+
+def test_import_loads_no_subcommand_modules():
+    loaded = run_python(
+        "import json, sys, whitopia\n"
+        "print(json.dumps(sorted(m for m in sys.modules if m.startswith(('whitopia_', 'requests', 'bs4')))))"
+    )
+    assert loaded == []
+
+
+def test_offline_analyze_skips_network_packages_and_gazetteer_data():
+    loaded = run_python(
+        "import json, sys, whitopia\n"
+        "try:\n"
+        "    whitopia.main(['analyze', '--help'])\n"
+        "except SystemExit:\n"
+        "    pass\n"
+        "from whitopia_gazetteer import shared_gazetteer\n"
+        "print(json.dumps({'network': [m for m in ('requests', 'bs4') if m in sys.modules],\n"
+        "                  'gazetteer_loaded': shared_gazetteer.cache_info().currsize > 0}))"
+    )
+    assert loaded == {'network': [], 'gazetteer_loaded': False}
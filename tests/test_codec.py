@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+"""結果文件的 schema 驗證及編解碼器"""
+
+import json
+
+import pytest
+
+from whitopia_codec import (ANALYSIS_FILE, JSON_CODECS, MSGPACK_CODECS, NEWS_FILE, SCHEMA_VERSION, SchemaError,
+                            dump, load, load_news, validate)
+from whitopia_records import RecordResult, StoreOpening, TextStore
+
+
+def available(codecs, name):
+    try:
+        return codecs[name]()
+    except ImportError:
+        pytest.skip(f"{name} 未安裝")
+
+
+def news_file(*items):
+    return {'scrape_time': '2025-07-07T10:00:00', 'total_items': len(items), 'all_news': list(items)}
+
+
+def news(date='2025-07-07', **fields):
+    return dict({'date': date, 'title': 'お知らせ', 'content': 'ホワイトピア美野島店オープン', 'url': '/news/1/'}, **fields)
+
+
+@pytest.fixture(params=sorted(JSON_CODECS))
+def codec(request):
+    return available(JSON_CODECS, request.param)
+
+
+def test_round_trip(codec):
+    data = news_file(news(store_related=True, duplicates=2), news(date=''))
+    assert codec.decode(codec.encode(data), NEWS_FILE) == data
+    assert codec.decode(codec.encode(data, indent=False), NEWS_FILE) == data
+
+
+def test_unknown_fields_are_dropped(codec):
+    data = news_file(news(extra='x'))
+    data['unknown'] = 1
+    assert codec.decode(codec.encode(data), NEWS_FILE) == news_file(news())
+
+
+def test_invalid_items_are_skipped_with_location(codec):
+    data = news_file(news(), None, news(title=3))
+    skipped = []
+    decoded = codec.decode(codec.encode(data), NEWS_FILE, skipped)
+    assert decoded['all_news'] == [news()]
+    assert len(skipped) == 2
+    assert skipped[0].startswith('$.all_news[1]')
+    assert skipped[1].startswith('$.all_news[2].title')
+
+
+def test_non_iso_dates_are_normalized(codec):
+    data = news_file(news(date='2025年7月7日'), news(date='2025/07/08'), news(date='近日'))
+    skipped = []
+    decoded = codec.decode(codec.encode(data), NEWS_FILE, skipped)
+    assert [item['date'] for item in decoded['all_news']] == ['2025-07-07', '2025-07-08']
+    assert len(skipped) == 1
+    assert skipped[0].startswith('$.all_news[2].date')
+
+
+def test_invalid_top_level_field_raises(codec):
+    data = news_file(news())
+    data['total_items'] = 'many'
+    with pytest.raises(SchemaError, match=r'\$\.total_items'):
+        codec.decode(codec.encode(data), NEWS_FILE)
+
+
+def test_validate_accepts_map_of_counts():
+    data = {'monthly_stats': {'2025-07': 2}, 'prefecture_stats': {'福岡県': 1}}
+    assert validate(data, ANALYSIS_FILE) == data
+    with pytest.raises(SchemaError, match=r'\$\.monthly_stats\.2025-07'):
+        validate({'monthly_stats': {'2025-07': '2'}}, ANALYSIS_FILE)
+
+
+def test_dump_adds_schema_version_and_load_checks_it(tmp_path):
+    path = str(tmp_path / 'news.json')
+    dump(news_file(news()), path)
+    assert load_news(path)['schema_version'] == SCHEMA_VERSION
+
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'schema_version': SCHEMA_VERSION + 1}, f)
+    with pytest.raises(SchemaError, match='schema'):
+        load_news(path)
+
+
+def test_load_reports_skipped_items(tmp_path, capsys):
+    path = str(tmp_path / 'news.json')
+    dump(news_file(news(), None), path)
+    assert load(path, NEWS_FILE)['all_news'] == [news()]
+    assert '跳過 1 個' in capsys.readouterr().err
+
+
+def test_records_are_encoded_with_full_text(codec):
+    texts = TextStore()
+    record = StoreOpening.from_dict({'store_name': 'ホワイトピア美野島店', 'date': '2025-07-07',
+                                     'match_keywords': ['OPEN'], 'full_text': '全文'}, texts)
+    result = RecordResult({'total_stores': 1, 'store_openings': [record]})
+    decoded = codec.decode(codec.encode(result), ANALYSIS_FILE)
+    assert decoded['store_openings'][0]['full_text'] == '全文'
+    assert decoded['store_openings'][0]['match_keywords'] == ['OPEN']
+    assert json.loads(json.dumps(result))['store_openings'][0]['full_text'] == '全文'
+
+
+@pytest.mark.parametrize('name', sorted(MSGPACK_CODECS))
+def test_msgpack_round_trip(name):
+    codec = available(MSGPACK_CODECS, name)
+    data = news_file(news(), news(date='2025/07/08'))
+    decoded = codec.decode(codec.encode(data), NEWS_FILE, [])
+    assert [item['date'] for item in decoded['all_news']] == ['2025-07-07', '2025-07-08']
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""SQLite 開業歷史：upsert、SQL 統計、查詢及舊資料庫遷移"""
+
+import sqlite3
+
+import pytest
+
+from whitopia_db import WhitopiaDB
+from whitopia_records import StoreOpening, TextStore
+from whitopia_server import OpeningIndex
+
+OPENINGS = [
+    {'store_name': 'ホワイトピア美野島店', 'prefecture': '福岡県', 'city': '福岡市', 'date': '2025-07-07', 'full_text': 'a'},
+    {'store_name': 'ホワイトピア高松伏石店', 'prefecture': '香川県', 'city': '高松市', 'date': '2025-06-26', 'full_text': 'b'},
+    {'store_name': 'ホワイトピア高松鶴市店', 'prefecture': '香川県', 'city': '高松市', 'date': '2025-06-09', 'full_text': 'c'},
+    {'store_name': '', 'prefecture': '', 'city': '', 'date': '', 'full_text': '店名なし'},
+]
+
+
+@pytest.fixture
+def db(tmp_path):
+    with WhitopiaDB(str(tmp_path / 'history.db')) as db:
+        yield db
+
+
+def test_upsert_keeps_first_seen_and_known_fields(db):
+    db.upsert_store_openings(OPENINGS, seen_time='2025-07-01')
+    changed = dict(OPENINGS[0], prefecture='', full_text='更新')
+    db.upsert_store_openings([changed], seen_time='2025-07-08')
+
+    row = db.conn.execute("SELECT * FROM store_openings WHERE store_name = 'ホワイトピア美野島店'").fetchone()
+    assert (row['first_seen'], row['last_seen']) == ('2025-07-01', '2025-07-08')
+    assert row['prefecture'] == '福岡県'
+    assert row['full_text'] == '更新'
+    assert db.conn.execute('SELECT COUNT(*) FROM store_openings').fetchone()[0] == 4
+
+
+def test_sql_stats(db):
+    db.upsert_store_openings(OPENINGS)
+    assert db.monthly_stats() == {'2025-07': 1, '2025-06': 2}
+    assert db.prefecture_stats() == {'香川県': 2, '福岡県': 1}
+    assert db.count_identified() == 3
+
+
+@pytest.mark.parametrize('query', [
+    {}, {'since': '2025-06'}, {'until': '2025-06'}, {'since': '2025-06-10', 'until': '2025-07'},
+    {'until': '2025-06-09'}, {'prefecture': '香川県', 'limit': 1}, {'store_name': 'ホワイトピア美野島店'},
+])
+def test_query_matches_in_memory_index(db, query):
+    db.upsert_store_openings(OPENINGS)
+    expected = [record['store_name'] for record in OpeningIndex(OPENINGS).query(**query)]
+    assert [row['store_name'] for row in db.query_openings(**query)] == expected
+
+
+def test_query_by_city(db):
+    db.upsert_store_openings(OPENINGS)
+    assert [row['store_name'] for row in db.query_openings(city='高松市')] == \
+        ['ホワイトピア高松伏石店', 'ホワイトピア高松鶴市店']
+
+
+def test_accepts_slotted_records(db):
+    with TextStore() as texts:
+        db.upsert_store_openings([StoreOpening.from_dict(OPENINGS[0], texts)])
+    assert db.query_openings()[0]['city'] == '福岡市'
+
+
+def test_news_items_upsert(db):
+    item = {'date': '2025-07-07', 'title': 'お知らせ', 'content': '本文', 'url': '/news/1/'}
+    db.upsert_news_items([item, None])
+    db.upsert_news_items([dict(item, content='更新', match_keyword='OPEN')])
+    rows = db.conn.execute('SELECT content, store_related FROM news_items').fetchall()
+    assert [tuple(row) for row in rows] == [('更新', 1)]
+
+
+def test_migrates_database_without_city_column(tmp_path):
+    path = str(tmp_path / 'old.db')
+    conn = sqlite3.connect(path)
+    conn.executescript('''
+        CREATE TABLE store_openings (
+            id INTEGER PRIMARY KEY,
+            opening_key TEXT NOT NULL UNIQUE,
+            store_name TEXT NOT NULL DEFAULT '',
+            prefecture TEXT NOT NULL DEFAULT '',
+            date TEXT NOT NULL DEFAULT '',
+            match_keyword TEXT NOT NULL DEFAULT '',
+            url TEXT NOT NULL DEFAULT '',
+            full_text TEXT NOT NULL DEFAULT '',
+            first_seen TEXT NOT NULL,
+            last_seen TEXT NOT NULL
+        );
+        INSERT INTO store_openings (opening_key, store_name, date, first_seen, last_seen)
+        VALUES ('舊店|2024-01-01', '舊店', '2024-01-01', 'x', 'x');
+    ''')
+    conn.commit()
+    conn.close()
+
+    with WhitopiaDB(path) as db:
+        assert db.query_openings() == [{'store_name': '舊店', 'prefecture': '', 'city': '', 'date': '2024-01-01',
+                                        'match_keyword': '', 'url': ''}]
+        db.upsert_store_openings(OPENINGS[:1])
+        assert db.query_openings(city='福岡市')[0]['store_name'] == 'ホワイトピア美野島店'
@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""重複及近似重複的新聞項目合併"""
+
+import pytest
+
+from whitopia_dedup import NearDuplicateIndex, dedupe_records, hamming_distance, simhash, trim_leading_fragment
+from whitopia_extract import extract_record
+
+ANNOUNCEMENT = ('2025年7月7日 ホワイトピア美野島店が福岡県福岡市南区美野島にグランドオープンいたします。'
+                '皆様のご来店をお待ちしております。営業時間は10時から20時まで、駐車場は50台分ございます。'
+                'オープン記念セールも開催いたします。')
+
+
+def news(content, date='2025-07-07', title='お知らせ'):
+    return {'title': title, 'content': content, 'date': date, 'url': '/news/1/'}
+
+
+def test_trim_leading_fragment_starts_at_own_date():
+    assert trim_leading_fragment('前のお知らせ。' + ANNOUNCEMENT, '2025-07-07') == ANNOUNCEMENT
+    assert trim_leading_fragment(ANNOUNCEMENT, '2025-01-01') == ANNOUNCEMENT
+
+
+def test_leading_fragment_is_merged_but_full_text_is_kept():
+    with_fragment = news('前のお知らせの末尾です。' + ANNOUNCEMENT)
+    records = list(dedupe_records([with_fragment, news(ANNOUNCEMENT)], extract_record))
+    assert len(records) == 1
+    assert records[0]['full_text'].startswith('前のお知らせの末尾です。')
+
+
+def test_near_duplicate_text_is_merged():
+    edited = ANNOUNCEMENT + '以上'
+    assert hamming_distance(simhash(ANNOUNCEMENT), simhash(edited)) <= 3
+    index = NearDuplicateIndex()
+    assert index.add(news(ANNOUNCEMENT))
+    assert not index.add(news(edited))
+    assert index.duplicates == 1
+
+
+def test_same_store_and_date_is_merged():
+    index = NearDuplicateIndex()
+    fields = {'store_name': 'ホワイトピア美野島店', 'date': '2025-07-07'}
+    assert index.add(news('美野島店オープン'), fields)
+    assert not index.add(news('まったく別の文章で同じ店の開業を告知'), fields)
+
+
+def test_similar_text_for_different_store_is_kept():
+    other = ANNOUNCEMENT.replace('美野島', '野間')
+    index = NearDuplicateIndex()
+    assert index.add(news(ANNOUNCEMENT), {'store_name': 'ホワイトピア美野島店', 'date': '2025-07-07'})
+    assert index.add(news(other), {'store_name': 'ホワイトピア野間店', 'date': '2025-07-07'})
+
+
+def test_max_distance_must_be_below_bands():
+    with pytest.raises(ValueError):
+        NearDuplicateIndex(max_distance=4, bands=4)
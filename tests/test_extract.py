@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""關鍵詞過濾器及店鋪信息提取"""
+
+import random
+
+import pytest
+
+from whitopia_extract import (STORE_KEYWORDS, KeywordAutomaton, extract_date, extract_record,
+                              extract_store_info)
+
+
+def naive_find_all(keywords, text):
+    """逐個關鍵詞以 in 檢查的參考實現"""
+    lowered = text.lower()
+    return [keyword for keyword in keywords if keyword.lower() in lowered]
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('新店舗がオープン', ['オープン', '新店', '店舗']),
+    ('グランドオープンのお知らせ', ['オープン', 'グランドオープン']),
+    ('Grand OPEN!', ['OPEN', 'open']),
+    ('お知らせ', []),
+])
+def test_find_all_includes_overlapping_keywords(text, expected):
+    assert KeywordAutomaton(STORE_KEYWORDS).find_all(text) == expected
+
+
+def test_matches_naive_scan_on_random_text():
+    automaton = KeywordAutomaton(STORE_KEYWORDS)
+    rng = random.Random(0)
+    alphabet = list('新店舗開業設規オープンOPENopenグランドスタート始しいあ ')
+    for _ in range(2000):
+        text = ''.join(rng.choice(alphabet) for _ in range(rng.randint(0, 30)))
+        expected = naive_find_all(STORE_KEYWORDS, text)
+        assert automaton.find_all(text) == expected, text
+        assert automaton.first(text) == (expected[0] if expected else ''), text
+
+
+def test_first_follows_keyword_priority_not_position():
+    automaton = KeywordAutomaton(['開業', 'オープン'])
+    assert automaton.first('オープンと開業') == '開業'
+    assert automaton.first('なし') == ''
+
+
+def test_pattern_is_built_on_first_use():
+    automaton = KeywordAutomaton(['開店'])
+    assert automaton._pattern is None
+    assert automaton.find_indexes('本日開店') == {0}
+    assert automaton._pattern is not None
+
+
+def test_extract_store_info():
+    text = '「ホワイトピア美野島店」が2025年7月7日に福岡県福岡市南区美野島にオープンします'
+    info = extract_store_info(text)
+    assert info['store_name'] == 'ホワイトピア美野島店'
+    assert info['prefecture'] == '福岡県'
+    assert info['city'] == '福岡市'
+    assert info['date'] == '2025-07-07'
+    assert info['full_text'] == text
+
+
+def test_extract_record_falls_back_to_item_date():
+    item = {'title': 'ホワイトピア高松伏石店がOPEN', 'content': '香川県高松市伏石町', 'date': '2025-06-26',
+            'url': '/news/1/'}
+    record = extract_record(item)
+    assert record['store_name'] == 'ホワイトピア高松伏石店'
+    assert record['date'] == '2025-06-26'
+    assert record['match_keywords'] == ['OPEN', 'open']
+    assert record['match_keyword'] == 'OPEN'
+    assert record['full_text'] == '香川県高松市伏石町 ホワイトピア高松伏石店がOPEN'
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('2025年7月7日', '2025-07-07'),
+    ('2025/7/7', '2025-07-07'),
+    ('2025.07.07', '2025-07-07'),
+    ('日付なし', ''),
+])
+def test_extract_date(text, expected):
+    assert extract_date(text) == expected
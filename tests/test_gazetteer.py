@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+"""地名辭典：都道府縣及市區町村的解析"""
+
+import re
+
+from whitopia_gazetteer import Gazetteer, build_trie_pattern, shared_gazetteer
+
+
+def small_gazetteer():
+    gazetteer = Gazetteer()
+    gazetteer.load_text('''
+東京都: 府中市 港区
+広島県: 府中市 広島市
+香川県: 高松市 丸亀市
+''')
+    gazetteer.load_aliases('天神: 福岡県 福岡市')
+    return gazetteer
+
+
+def test_trie_pattern_matches_longest_word():
+    pattern = re.compile(build_trie_pattern({'オープン', 'グランドオープン', 'open'}, ignore_ascii_case=True))
+    assert pattern.findall('グランドオープン OPEN オープン') == ['グランドオープン', 'OPEN', 'オープン']
+
+
+def test_mentions_finds_longest_non_overlapping_names():
+    gazetteer = shared_gazetteer()
+    assert gazetteer.mentions('大阪府大阪市北区梅田') == [(0, '大阪府'), (3, '大阪市'), (6, '北区')]
+
+
+def test_store_name_decides_city_and_prefecture():
+    gazetteer = small_gazetteer()
+    assert gazetteer.resolve('ホワイトピア高松伏石店オープン', 'ホワイトピア高松伏石店') == \
+        {'prefecture': '香川県', 'city': '高松市'}
+    assert gazetteer.resolve('ホワイトピア天神店オープン', 'ホワイトピア天神店') == \
+        {'prefecture': '福岡県', 'city': '福岡市'}
+
+
+def test_ambiguous_city_needs_prefecture():
+    gazetteer = small_gazetteer()
+    assert gazetteer.store_city('ホワイトピア府中店') is None
+    assert gazetteer.store_city('ホワイトピア府中店', '広島県') == ('広島県', '府中市')
+    assert gazetteer.resolve('東京都府中市にオープン', 'ホワイトピア府中店') == \
+        {'prefecture': '東京都', 'city': '府中市'}
+    assert gazetteer.resolve('府中市にオープン') == {'prefecture': '', 'city': ''}
+
+
+def test_mentions_after_store_name_take_priority():
+    gazetteer = small_gazetteer()
+    text = '前回は東京都港区。ホワイトピア丸亀店が香川県にオープン'
+    anchor = text.index('ホワイトピア')
+    assert gazetteer.resolve(text, '', anchor) == {'prefecture': '香川県', 'city': ''}
+    assert gazetteer.resolve('香川県丸亀市で開店') == {'prefecture': '香川県', 'city': '丸亀市'}
+
+
+def test_version_changes_with_content():
+    gazetteer = small_gazetteer()
+    version = gazetteer.version()
+    gazetteer.add_city('香川県', '坂出市')
+    assert gazetteer.version() != version
+
+
+def test_shared_gazetteer_is_loaded_once():
+    assert shared_gazetteer() is shared_gazetteer()
+    assert '香川県' in shared_gazetteer().prefectures
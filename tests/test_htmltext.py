@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""詳細頁面的分塊讀取及增量文字提取"""
+
+from whitopia_htmltext import OpeningDetailsFound, extract_text, iter_text_blocks
+from whitopia_metrics import Metrics
+from whitopia_standin import StandinService, SyntheticArchive
+
+PAGE = ('<html><head><title>お知らせ</title><script>var s = "<p>不要</p>";</script>'
+        '<style>p { color: red }</style></head><body><article>'
+        '<h1>「ホワイトピア美野島店」オープン</h1><p>2025年7月7日に\n  オープンします。</p>'
+        '<ul><li>駐車場 &amp; 駐輪場</li><li>営業時間 10:00〜20:00</li></ul>'
+        '</article></body></html>').encode('utf-8')
+
+BLOCKS = ['お知らせ', '「ホワイトピア美野島店」オープン', '2025年7月7日に オープンします。',
+          '駐車場 & 駐輪場', '営業時間 10:00〜20:00']
+
+
+def byte_chunks(data, size):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+def test_blocks_skip_scripts_and_styles():
+    assert list(iter_text_blocks([PAGE])) == BLOCKS
+
+
+def test_chunk_boundaries_inside_characters_and_tags():
+    for size in (1, 2, 3, 7):
+        assert list(iter_text_blocks(byte_chunks(PAGE, size))) == BLOCKS
+
+
+def test_reading_stops_at_max_bytes():
+    read = []
+
+    def chunks():
+        for chunk in byte_chunks(PAGE, 16):
+            read.append(chunk)
+            yield chunk
+
+    limit = PAGE.index('<ul>'.encode('utf-8'))
+    text = extract_text(chunks(), max_bytes=limit)
+    assert text.splitlines() == BLOCKS[:3]
+    assert sum(len(chunk) for chunk in read) < len(PAGE)
+
+
+def test_early_stop_when_name_and_date_are_found():
+    stop = OpeningDetailsFound()
+    assert extract_text(byte_chunks(PAGE, 8), stop=stop).splitlines() == BLOCKS[:3]
+    assert (stop.store_name, stop.date) == ('ホワイトピア美野島店', '2025-07-07')
+
+
+def response_bytes(metrics):
+    return metrics.to_dict()['histograms']['whitopia_http_response_bytes']['']['sum']
+
+
+def test_detail_page_reads_at_most_max_bytes(standin, make_scraper):
+    archive = SyntheticArchive(3, detail_padding=400000)
+    base_url, _ = standin(StandinService(synthetic=archive))
+    page_size = len(archive.detail_page(1).encode('utf-8'))
+    metrics = Metrics()
+    scraper = make_scraper(base_url, metrics=metrics, detail_max_bytes=256 * 1024)
+
+    text = scraper.scrape_detailed_page(base_url + '/news/1/')
+
+    assert archive.item(1)['title'] in text
+    assert 'var data' not in text
+    assert response_bytes(metrics) <= 256 * 1024 < page_size
+
+
+def test_detail_page_early_stop(standin, make_scraper):
+    archive = SyntheticArchive(3, detail_padding=400000)
+    base_url, _ = standin(StandinService(synthetic=archive))
+    full = make_scraper(base_url).scrape_detailed_page(base_url + '/news/1/')
+    early = make_scraper(base_url, detail_early_stop=True).scrape_detailed_page(base_url + '/news/1/')
+    assert len(early) <= len(full)
+    assert full.startswith(early)
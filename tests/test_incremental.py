@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""增量提取快取：只重新提取新增或內容改變的項目"""
+
+import json
+
+from whitopia_extract import extract_record
+from whitopia_incremental import ExtractionCache
+
+ITEMS = [
+    {'title': 'ホワイトピア美野島店がOPEN', 'content': '福岡県福岡市南区', 'date': '2025-07-07', 'url': '/news/1/'},
+    {'title': 'ホワイトピア高松伏石店がOPEN', 'content': '香川県高松市', 'date': '2025-06-26', 'url': '/news/2/'},
+]
+
+
+def test_results_match_direct_extraction(tmp_path):
+    cache = ExtractionCache(str(tmp_path / 'cache.json'), quiet=True)
+    assert [cache.extract(item) for item in ITEMS] == [extract_record(item) for item in ITEMS]
+    assert cache.stats() == {'reused': 0, 'recomputed': 2}
+
+
+def test_only_changed_items_are_recomputed(tmp_path):
+    path = str(tmp_path / 'cache.json')
+    cache = ExtractionCache(path, quiet=True)
+    for item in ITEMS:
+        cache.extract(item)
+    cache.save()
+
+    cache = ExtractionCache(path, quiet=True)
+    changed = dict(ITEMS[1], title='ホワイトピア丸亀店がOPEN', content='香川県丸亀市')
+    # 日期及 URL 不屬於指紋：內容相同的項目重用提取結果，但記錄使用項目自身的欄位
+    moved = dict(ITEMS[0], url='/news/9/')
+    records = [cache.extract(moved), cache.extract(changed)]
+
+    assert cache.stats() == {'reused': 1, 'recomputed': 1}
+    assert records[0]['url'] == '/news/9/'
+    assert (records[1]['store_name'], records[1]['city']) == ('ホワイトピア丸亀店', '丸亀市')
+
+
+def test_rules_change_invalidates_cache(tmp_path):
+    path = str(tmp_path / 'cache.json')
+    cache = ExtractionCache(path, quiet=True)
+    cache.extract(ITEMS[0])
+    cache.save()
+
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    data['rules_version'] = 'old'
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+
+    cache = ExtractionCache(path, quiet=True)
+    assert cache.entries == {}
+    cache.extract(ITEMS[0])
+    assert cache.stats() == {'reused': 0, 'recomputed': 1}
+
+
+def test_save_keeps_most_recently_used_entries(tmp_path):
+    path = str(tmp_path / 'cache.json')
+    cache = ExtractionCache(path, max_entries=1, quiet=True)
+    cache.extract(ITEMS[0])
+    cache.extract(ITEMS[1])
+    cache.save()
+
+    cache = ExtractionCache(path, quiet=True)
+    assert list(cache.entries) == [cache.fingerprint(ITEMS[1])]
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""執行指標：計數器、直方圖、Prometheus 輸出及爬蟲的請求指標"""
+
+from whitopia_metrics import BYTES_BUCKETS, NULL_METRICS, Metrics
+
+
+def test_counters_and_histograms():
+    metrics = Metrics()
+    metrics.inc('requests_total', status=200)
+    metrics.inc('requests_total', 2, status=200)
+    metrics.observe('response_bytes', 2000, buckets=BYTES_BUCKETS)
+    with metrics.timer('stage_seconds', stage='parse'):
+        pass
+
+    data = metrics.to_dict()
+    assert data['counters']['requests_total'] == {'{status="200"}': 3}
+    histogram = data['histograms']['response_bytes']['']
+    assert (histogram['count'], histogram['sum']) == (1, 2000)
+    assert histogram['buckets']['1024'] == 0
+    assert histogram['buckets']['4096'] == 1
+    assert data['histograms']['stage_seconds']['{stage="parse"}']['count'] == 1
+
+
+def test_prometheus_text_format():
+    metrics = Metrics()
+    metrics.inc('errors_total', error='Timeout')
+    metrics.observe('response_bytes', 5000, buckets=(1024, 8192))
+
+    lines = metrics.to_prometheus().splitlines()
+    assert '# TYPE errors_total counter' in lines
+    assert 'errors_total{error="Timeout"} 1' in lines
+    assert 'response_bytes_bucket{le="1024"} 0' in lines
+    assert 'response_bytes_bucket{le="8192"} 1' in lines
+    assert 'response_bytes_bucket{le="+Inf"} 1' in lines
+    assert 'response_bytes_count 1' in lines
+
+
+def test_write_outputs_json_and_textfile(tmp_path):
+    metrics = Metrics()
+    metrics.inc('runs_total')
+    basename = str(tmp_path / 'metrics')
+    metrics.write(basename)
+    assert (tmp_path / 'metrics.json').exists()
+    assert 'runs_total 1' in (tmp_path / 'metrics.prom').read_text(encoding='utf-8')
+    assert not (tmp_path / 'metrics.prom.tmp').exists()
+
+
+def test_null_metrics_do_nothing():
+    with NULL_METRICS.timer('x'):
+        NULL_METRICS.inc('x')
+        NULL_METRICS.observe('x', 1)
+    assert not NULL_METRICS.enabled
+
+
+def response_bytes(metrics):
+    return metrics.to_dict()['histograms']['whitopia_http_response_bytes']['']
+
+
+def test_scraper_records_requests_and_response_sizes(standin, make_scraper):
+    base_url, _ = standin()
+    metrics = Metrics()
+    scraper = make_scraper(base_url, metrics=metrics)
+
+    content = scraper.get_page(base_url + '/news/').content
+
+    data = metrics.to_dict()
+    assert data['counters']['whitopia_http_requests_total'] == {'{status="200"}': 1}
+    assert data['histograms']['whitopia_http_request_seconds']['']['count'] == 1
+    assert response_bytes(metrics)['sum'] == len(content)
+
+
+def test_streamed_responses_record_bytes_read_on_close(standin, make_scraper):
+    base_url, _ = standin()
+    metrics = Metrics()
+    scraper = make_scraper(base_url, metrics=metrics)
+
+    response = scraper.get_page(base_url + '/news/1/', stream=True)
+    full = sum(len(chunk) for chunk in response.iter_content(64))
+    response.close()
+    response.close()
+    assert response_bytes(metrics)['count'] == 1
+    assert response_bytes(metrics)['sum'] == full
+
+    # 提早停止讀取時記錄已讀取的部分
+    response = scraper.get_page(base_url + '/news/2/', stream=True)
+    next(response.iter_content(64))
+    response.close()
+    assert response_bytes(metrics)['count'] == 2
+    assert response_bytes(metrics)['sum'] == full + 64
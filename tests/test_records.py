@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""緊湊記錄：不可修改、日期序數、全文放在 TextStore 中，並與 dict 相容"""
+
+import json
+import pickle
+
+import pytest
+
+from whitopia_records import NewsItem, RecordResult, StoreOpening, TextStore, date_bounds, pack_date, unpack_date
+
+OPENING = {
+    'store_name': 'ホワイトピア美野島店', 'prefecture': '福岡県', 'city': '福岡市', 'date': '2025-07-07',
+    'url': '/news/1/', 'match_keyword': 'OPEN', 'match_keywords': ['OPEN', 'open'], 'full_text': '全文' * 100,
+}
+
+
+@pytest.fixture
+def texts():
+    with TextStore() as store:
+        yield store
+
+
+@pytest.mark.parametrize('value', ['2025-07-07', '', '近日'])
+def test_date_round_trip(value):
+    assert unpack_date(pack_date(value)) == value
+
+
+def test_pack_date_is_an_ordinal():
+    assert pack_date('2025-07-07') == pack_date('2025-07-06') + 1
+    assert pack_date('') == 0
+
+
+@pytest.mark.parametrize('since, until, expected', [
+    (None, None, (None, None)),
+    ('2025-06', '2025-06', ('2025-06', '2025-06-99')),
+    ('2025-06-10', '2025-06-20', ('2025-06-10', '2025-06-20')),
+])
+def test_date_bounds(since, until, expected):
+    assert date_bounds(since, until) == expected
+
+
+def test_store_opening_behaves_like_the_dict(texts):
+    record = StoreOpening.from_dict(OPENING, texts)
+    assert record == OPENING
+    assert record['full_text'] == OPENING['full_text']
+    assert record.get('missing', 'x') == 'x'
+    assert set(record.keys()) == set(OPENING)
+    assert record.date_ordinal == pack_date('2025-07-07')
+    assert record.to_dict() == {key: value for key, value in OPENING.items() if key != 'full_text'}
+
+
+def test_records_are_frozen_and_slotted(texts):
+    record = StoreOpening.from_dict(OPENING, texts)
+    with pytest.raises(AttributeError):
+        record.store_name = 'x'
+    with pytest.raises(AttributeError):
+        record.extra = 1
+    assert not hasattr(record, '__dict__')
+
+
+def test_news_item_optional_fields(texts):
+    item = NewsItem.from_dict({'title': 'お知らせ', 'date': '2025-07-07', 'url': '/news/1/', 'content': '本文'}, texts)
+    assert 'detail_content' not in item
+    assert 'store_related' not in item
+    assert item['content'] == '本文'
+
+    detailed = NewsItem.from_dict({'title': 'お知らせ', 'content': '本文', 'detail_content': '詳細',
+                                   'store_related': True}, texts)
+    assert detailed['detail_content'] == '詳細'
+    assert detailed['store_related'] is True
+
+
+def test_records_pickle_as_dicts(texts):
+    record = StoreOpening.from_dict(OPENING, texts)
+    assert pickle.loads(pickle.dumps(record)) == OPENING
+
+
+def test_record_result_encodes_with_plain_json(texts):
+    records = [StoreOpening.from_dict(OPENING, texts)]
+    result = RecordResult({'total_stores': 1, 'store_openings': records})
+    assert json.loads(json.dumps(result, ensure_ascii=False)) == {'total_stores': 1, 'store_openings': [OPENING]}
+    assert result['store_openings'] is records
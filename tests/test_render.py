@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""無介面分析、安靜模式及可替換的輸出器"""
+
+import json
+
+from whitopia_improved_analyzer import ImprovedWhitopiaAnalyzer
+from whitopia_render import (ConsoleRenderer, JsonRenderer, MarkdownRenderer, format_date, format_place,
+                             format_report_date, render_all)
+
+
+def analyzed(standin, make_scraper, tmp_path):
+    base_url, _ = standin()
+    path = str(tmp_path / 'news.jsonl')
+    make_scraper(base_url).run_scraper_stream(path)
+    analyzer = ImprovedWhitopiaAnalyzer(path, quiet=True)
+    return analyzer, analyzer.analyze()
+
+
+def test_format_helpers():
+    assert format_date('2025-07-25') == '2025年07月25日 (金)'
+    assert format_date('2025-07-25', weekday=False) == '2025年07月25日'
+    assert format_date('近日') == '近日'
+    assert format_date('') == '日期未知'
+    assert format_report_date('2025-07-07') == '2025年07月07日（星期一）'
+    assert format_place({'prefecture': '香川県', 'city': '高松市'}) == '香川県 高松市'
+    assert format_place({'prefecture': '', 'city': None}) == '地區未知'
+
+
+def test_analyze_returns_result_without_output(standin, make_scraper, tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    _, result = analyzed(standin, make_scraper, tmp_path)
+
+    assert result['store_openings']
+    assert result['summary']['total_identified_stores'] == result['total_stores']
+    assert not (tmp_path / 'whitopia_detailed_analysis.json').exists()
+    assert capsys.readouterr().out == ''
+
+
+def test_quiet_default_renderers_only_save_json(standin, make_scraper, tmp_path):
+    analyzer, _ = analyzed(standin, make_scraper, tmp_path)
+    renderers = analyzer.default_renderers()
+    assert [type(renderer) for renderer in renderers] == [JsonRenderer]
+
+    analyzer.quiet = False
+    assert [type(renderer) for renderer in analyzer.default_renderers()] == [ConsoleRenderer, JsonRenderer]
+
+
+def test_render_all_writes_json_and_markdown(standin, make_scraper, tmp_path, capsys):
+    analyzer, result = analyzed(standin, make_scraper, tmp_path)
+    json_path = tmp_path / 'analysis.json'
+    report_path = tmp_path / 'report.md'
+
+    render_all([JsonRenderer(str(json_path), quiet=True), MarkdownRenderer(str(report_path), quiet=True)],
+               result, analyzer.meta)
+
+    assert capsys.readouterr().out == ''
+    saved = json.loads(json_path.read_text(encoding='utf-8'))
+    assert len(saved['store_openings']) == len(result['store_openings'])
+    assert saved['store_openings'][0]['full_text']
+
+    report = report_path.read_text(encoding='utf-8')
+    first = result['store_openings'][0]
+    assert report.startswith('# Whitopia.jp 店鋪開業信息分析報告')
+    assert f"### 1. {first['store_name'] or '店名未知'}" in report
+    assert f"- **成功識別店鋪**: {result['summary']['total_identified_stores']} 家" in report
+    for prefecture, count in result['prefecture_stats'].items():
+        assert f"| {prefecture} | {count} 家 |" in report
+
+
+def test_console_renderer_prints_timeline_and_summary(standin, make_scraper, tmp_path, capsys):
+    analyzer, result = analyzed(standin, make_scraper, tmp_path)
+
+    ConsoleRenderer().render(result, analyzer.meta)
+
+    out = capsys.readouterr().out
+    assert f"總共找到項目: {analyzer.meta['total_items']} 個" in out
+    assert f"成功識別店鋪數量: {result['summary']['total_identified_stores']} 家" in out
+    assert out.count('📅 開業日期') == len(result['store_openings'])
@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+"""重試策略、Retry-After 及斷路器狀態"""
+
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import pytest
+import requests
+
+from whitopia_retry import CircuitBreaker, CircuitOpenError, RetryPolicy, parse_retry_after
+from whitopia_standin import Faults, StandinService, SyntheticArchive
+
+URL = 'http://example.test/news/'
+
+
+class FailFirstAttempts(Faults):
+    """每個路徑的前 failures 次請求返回錯誤"""
+
+    def __init__(self, failures, **kwargs):
+        super().__init__(**kwargs)
+        self.failures = failures
+
+    def is_error(self, path, attempt):
+        return attempt < self.failures
+
+
+def error_response(status, headers=None):
+    response = requests.Response()
+    response.status_code = status
+    response.headers.update(headers or {})
+    return response
+
+
+def test_parse_retry_after():
+    assert parse_retry_after('7') == 7.0
+    when = datetime.now(timezone.utc) + timedelta(seconds=30)
+    assert 25 <= parse_retry_after(format_datetime(when, usegmt=True)) <= 30
+    assert parse_retry_after('soon') is None
+    assert parse_retry_after(None) is None
+
+
+def test_delay_uses_capped_backoff_or_retry_after():
+    policy = RetryPolicy(backoff_base=1.0, backoff_max=4.0, max_retry_after=10.0)
+    for attempt in range(6):
+        delay, from_retry_after = policy.delay(attempt)
+        assert 0 <= delay <= min(4.0, 2 ** attempt)
+        assert not from_retry_after
+    assert policy.delay(0, error_response(503, {'Retry-After': '3'})) == (3.0, True)
+    assert policy.delay(0, error_response(503, {'Retry-After': '600'})) == (10.0, True)
+
+
+def test_is_retryable():
+    policy = RetryPolicy()
+    assert policy.is_retryable(requests.HTTPError(response=error_response(503)))
+    assert not policy.is_retryable(requests.HTTPError(response=error_response(404)))
+    assert policy.is_retryable(requests.ConnectionError())
+    assert not policy.is_retryable(CircuitOpenError())
+
+
+def test_circuit_opens_after_threshold_and_probes_once():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0)
+    assert breaker.check(URL) is False
+    breaker.record_failure(URL)
+    assert breaker.check(URL) is False
+    breaker.record_failure(URL)
+    assert breaker.open_hosts() == ['example.test']
+
+    # 重置時間已過：第一個請求成為試探請求，試探期間其他請求被拒絕
+    assert breaker.check(URL) is True
+    with pytest.raises(CircuitOpenError):
+        breaker.check(URL)
+
+    # 試探失敗再次打開，成功則關閉
+    breaker.record_failure(URL)
+    assert breaker.check(URL) is True
+    breaker.record_success(URL)
+    assert breaker.open_hosts() == []
+    assert breaker.check(URL) is False
+
+
+def test_rejects_requests_until_reset_timeout():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+    breaker.record_failure(URL)
+    with pytest.raises(CircuitOpenError):
+        breaker.check(URL)
+
+
+def test_released_probe_lets_next_request_probe():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    breaker.record_failure(URL)
+    assert breaker.check(URL) is True
+    breaker.release_probe(URL)
+    assert breaker.check(URL) is True
+
+
+def test_get_page_retries_until_success(standin, make_scraper):
+    service = StandinService(synthetic=SyntheticArchive(5), faults=FailFirstAttempts(2, retry_after=0))
+    base_url, _ = standin(service)
+    scraper = make_scraper(base_url, retry_policy=RetryPolicy(max_attempts=3, backoff_base=0))
+
+    response = scraper.get_page(base_url + '/news/')
+
+    assert response.status_code == 200
+    stats = scraper.retry_stats.as_dict()
+    assert stats['attempts'] == 3
+    assert stats['retries'] == 2
+    assert stats['retry_after_waits'] == 2
+    assert stats['giveups'] == 0
+
+
+def test_get_page_gives_up_and_opens_circuit(standin, make_scraper):
+    service = StandinService(synthetic=SyntheticArchive(5), faults=Faults(error_rate=1.0))
+    base_url, _ = standin(service)
+    scraper = make_scraper(base_url, retry_policy=RetryPolicy(max_attempts=2, backoff_base=0),
+                           circuit_breaker=CircuitBreaker(failure_threshold=2, reset_timeout=60))
+
+    with pytest.raises(requests.HTTPError):
+        scraper.get_page(base_url + '/news/')
+    with pytest.raises(CircuitOpenError):
+        scraper.get_page(base_url + '/news/page/2/')
+
+    assert service.stats()['requests'] == 2
+    stats = scraper.retry_stats.as_dict()
+    assert stats['giveups'] == 1
+    assert stats['circuit_rejections'] == 1
+
+
+def test_client_errors_are_not_retried(standin, make_scraper):
+    base_url, service = standin()
+    scraper = make_scraper(base_url, retry_policy=RetryPolicy(max_attempts=3, backoff_base=0))
+
+    with pytest.raises(requests.HTTPError):
+        scraper.get_page(base_url + '/missing/')
+    assert service.stats()['requests'] == 1
+
+
+def test_probe_is_released_when_request_ends_without_outcome(standin, make_scraper, monkeypatch):
+    base_url, _ = standin()
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    breaker.record_failure(base_url + '/')
+    scraper = make_scraper(base_url, circuit_breaker=breaker)
+
+    def interrupted(url):
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(scraper.rate_limiter, 'wait', interrupted)
+    with pytest.raises(KeyboardInterrupt):
+        scraper.get_page(base_url + '/news/')
+    monkeypatch.undo()
+
+    assert scraper.get_page(base_url + '/news/').status_code == 200
+    assert breaker.open_hosts() == []
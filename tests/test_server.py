@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+"""開業信息查詢服務：索引查詢、結果快取、文件更新後重新載入及 HTTP 介面"""
+
+import json
+import os
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+from whitopia_codec import dump
+from whitopia_server import OpeningIndex, OpeningService, make_server
+
+RECORDS = [
+    {'store_name': 'ホワイトピア美野島店', 'prefecture': '福岡県', 'city': '福岡市', 'date': '2025-07-07'},
+    {'store_name': 'ホワイトピア高松伏石店', 'prefecture': '香川県', 'city': '高松市', 'date': '2025-06-26'},
+    {'store_name': 'ホワイトピア高松鶴市店', 'prefecture': '香川県', 'city': '高松市', 'date': '2025-06-09'},
+    {'store_name': 'ホワイトピア丸亀店', 'prefecture': '香川県', 'city': '丸亀市', 'date': '2025-05-31'},
+    {'store_name': '', 'prefecture': '', 'city': '', 'date': ''},
+]
+
+
+def names(results):
+    return [record['store_name'] for record in results]
+
+
+def write_analysis(path, records):
+    dump({'total_stores': len(records), 'store_openings': records}, path)
+
+
+@pytest.fixture
+def service(tmp_path):
+    path = str(tmp_path / 'analysis.json')
+    write_analysis(path, RECORDS)
+    return OpeningService(path)
+
+
+@pytest.mark.parametrize('query, expected', [
+    ({}, ['ホワイトピア美野島店', 'ホワイトピア高松伏石店', 'ホワイトピア高松鶴市店', 'ホワイトピア丸亀店', '']),
+    ({'prefecture': '香川県'}, ['ホワイトピア高松伏石店', 'ホワイトピア高松鶴市店', 'ホワイトピア丸亀店']),
+    ({'month': '2025-06'}, ['ホワイトピア高松伏石店', 'ホワイトピア高松鶴市店']),
+    ({'since': '2025-06', 'until': '2025-06'}, ['ホワイトピア高松伏石店', 'ホワイトピア高松鶴市店']),
+    ({'since': '2025-06-10'}, ['ホワイトピア美野島店', 'ホワイトピア高松伏石店']),
+    ({'until': '2025-06-09'}, ['ホワイトピア高松鶴市店', 'ホワイトピア丸亀店', '']),
+    ({'prefecture': '香川県', 'since': '2025-06', 'limit': 1}, ['ホワイトピア高松伏石店']),
+    ({'store_name': 'ホワイトピア丸亀店'}, ['ホワイトピア丸亀店']),
+    ({'prefecture': '東京都'}, []),
+])
+def test_index_query(query, expected):
+    assert names(OpeningIndex(RECORDS).query(**query)) == expected
+
+
+def test_index_stats():
+    stats = OpeningIndex(RECORDS).stats()
+    assert stats['total_stores'] == 5
+    assert stats['monthly_stats'] == {'2025-07': 1, '2025-06': 2, '2025-05': 1}
+    assert list(stats['prefecture_stats'].items()) == [('香川県', 3), ('福岡県', 1)]
+
+
+def test_repeated_query_is_served_from_cache(service):
+    status, body = service.handle('/openings', {'prefecture': '香川県'})
+    assert status == 200
+    assert json.loads(body)['count'] == 3
+    assert service.handle('/openings', {'prefecture': '香川県'}) == (200, body)
+    assert len(service.cache) == 1
+
+
+def test_reloads_when_file_changes(service):
+    service.handle('/openings', {})
+    write_analysis(service.path, RECORDS[:2])
+    stat = os.stat(service.path)
+    os.utime(service.path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    status, body = service.handle('/openings', {})
+    assert json.loads(body)['count'] == 2
+    assert service.loads == 2
+
+
+def test_keeps_old_index_when_reload_fails(service):
+    with open(service.path, 'w', encoding='utf-8') as f:
+        f.write('{"store_openings": ')
+    stat = os.stat(service.path)
+    os.utime(service.path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    status, body = service.handle('/health', {})
+    assert status == 200
+    assert json.loads(body)['records'] == 5
+
+
+def test_errors_are_not_cached(service):
+    assert service.handle('/openings', {'limit': 'x'})[0] == 400
+    assert service.handle('/unknown', {})[0] == 404
+    assert not service.cache
+
+
+def test_http_interface(service):
+    server = make_server(service, port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = 'http://%s:%d' % server.server_address[:2]
+    try:
+        with urllib.request.urlopen(base_url + '/openings/?prefecture=%E9%A6%99%E5%B7%9D%E7%9C%8C&limit=2') as response:
+            assert response.headers['Content-Type'] == 'application/json; charset=utf-8'
+            assert names(json.load(response)['openings']) == ['ホワイトピア高松伏石店', 'ホワイトピア高松鶴市店']
+        with urllib.request.urlopen(base_url + '/months') as response:
+            assert json.load(response) == ['2025-07', '2025-06', '2025-05']
+        with pytest.raises(urllib.error.HTTPError) as error:
+            urllib.request.urlopen(base_url + '/missing')
+        assert error.value.code == 404
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""多網站爬取：每個網站的設定、共用的連接數上限及失敗網站的隔離"""
+
+import json
+import threading
+
+from whitopia_sites import MultiSiteCrawler, SiteConfig, load_sites
+from whitopia_standin import Faults, StandinService, SyntheticArchive
+
+
+class ConcurrencyProbe:
+    """記錄同時處理中的請求數的最大值（可由多個替身伺服器共用）"""
+
+    def __init__(self):
+        self.active = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        with self._lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+
+    def __exit__(self, *exc):
+        with self._lock:
+            self.active -= 1
+
+
+class ProbedService(StandinService):
+    def __init__(self, probe, **kwargs):
+        super().__init__(**kwargs)
+        self.probe = probe
+
+    def handle(self, path, request_headers, base_url):
+        with self.probe:
+            return super().handle(path, request_headers, base_url)
+
+
+def site(name, base_url, **kwargs):
+    kwargs.setdefault('rate_per_host', 0)
+    return SiteConfig(name, base_url, **kwargs)
+
+
+def test_load_sites(tmp_path):
+    path = tmp_path / 'sites.json'
+    path.write_text(json.dumps({'sites': [{'name': 'a', 'base_url': 'http://a.test/', 'keywords': ['開店'],
+                                           'store_name_patterns': [r'(ＡＢＣ\w+店)']}]}), encoding='utf-8')
+    [config] = load_sites(str(path))
+    assert config.base_url == 'http://a.test'
+    assert config.automaton.first('本日開店') == '開店'
+    assert config.automaton.first('オープン') == ''
+    assert config.extract_record({'title': 'ＡＢＣ梅田店オープン'})['store_name'] == 'ＡＢＣ梅田店'
+
+
+def test_site_gazetteer_csv_adds_places(tmp_path):
+    csv_path = tmp_path / 'places.csv'
+    csv_path.write_text('prefecture,city,alias\n福岡県,福岡市,大橋\n', encoding='utf-8')
+    config = site('a', 'http://a.test', gazetteer_csv=str(csv_path))
+    record = config.extract_record({'title': 'ホワイトピア大橋店がオープン'})
+    assert (record['prefecture'], record['city'], record['site']) == ('福岡県', '福岡市', 'a')
+    # 其他網站仍使用共用的預設地名辭典
+    assert site('b', 'http://b.test').extract_record({'title': 'ホワイトピア大橋店がオープン'})['city'] == ''
+
+
+def test_crawls_sites_with_a_shared_connection_budget(standin):
+    probe = ConcurrencyProbe()
+    faults = Faults(latency=0.01)
+    first_url, _ = standin(ProbedService(probe, synthetic=SyntheticArchive(10, seed=1), faults=faults))
+    second_url, _ = standin(ProbedService(probe, synthetic=SyntheticArchive(10, seed=2), faults=faults))
+    sites = [site('first', first_url, max_connections=4), site('second', second_url, max_connections=4)]
+
+    result = MultiSiteCrawler(sites, max_workers=2, max_connections=2, fetch_details=True).run()
+
+    assert [summary['name'] for summary in result['sites']] == ['first', 'second']
+    assert all('error' not in summary for summary in result['sites'])
+    assert {item['site'] for item in result['all_news']} == {'first', 'second'}
+    assert {record['site'] for record in result['store_openings']} <= {'first', 'second'}
+    assert len(result['store_openings']) == len(result['store_news'])
+    assert probe.peak <= 2
+
+
+def test_failing_site_does_not_stop_others(standin):
+    good_url, _ = standin()
+    # Retry-After: 0 讓重試不需等待
+    bad_url, _ = standin(StandinService(synthetic=SyntheticArchive(10), faults=Faults(error_rate=1.0, retry_after=0)))
+
+    result = MultiSiteCrawler([site('bad', bad_url), site('good', good_url)]).run()
+
+    summaries = {summary['name']: summary for summary in result['sites']}
+    assert 'error' in summaries['bad']
+    assert summaries['bad']['total_items'] == 0
+    assert summaries['good']['total_items'] > 0
+    assert 'error' not in summaries['good']
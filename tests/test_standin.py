@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""回應錄製及重播、替身伺服器的錯誤注入及爬取基準測試"""
+
+from urllib.parse import urlsplit
+
+from whitopia_fixtures import FixtureArchive, FixtureRecorder, fixture_key
+from whitopia_standin import Faults, StandinService, SyntheticArchive, run_benchmark
+
+
+def paths(items):
+    return [urlsplit(item['url']).path for item in items]
+
+
+def test_fixture_key_ignores_host():
+    assert fixture_key('http://127.0.0.1:8081/news/page/2/?a=1') == '/news/page/2/?a=1'
+    assert fixture_key('https://www.whitopia.jp') == '/'
+
+
+def test_recorded_crawl_replays_offline(standin, make_scraper, tmp_path):
+    base_url, _ = standin()
+    archive = FixtureArchive(str(tmp_path / 'fixtures'))
+    scraper = make_scraper(base_url)
+    FixtureRecorder(archive).attach(scraper.session)
+    recorded = scraper.crawl_news_archive(checkpoint_file=str(tmp_path / 'record.json'))
+    assert len(archive) == 3
+
+    replay_url, service = standin(StandinService(fixtures=FixtureArchive(str(tmp_path / 'fixtures'))))
+    replayed = make_scraper(replay_url).crawl_news_archive(checkpoint_file=str(tmp_path / 'replay.json'))
+
+    assert paths(replayed) == paths(recorded)
+    assert [item['title'] for item in replayed] == [item['title'] for item in recorded]
+    assert service.stats()['not_found'] == 0
+
+
+def test_streamed_pages_are_recorded_only_when_fully_read(standin, make_scraper, tmp_path):
+    base_url, _ = standin()
+    archive = FixtureArchive(str(tmp_path / 'fixtures'))
+    scraper = make_scraper(base_url)
+    FixtureRecorder(archive).attach(scraper.session)
+
+    response = scraper.get_page(base_url + '/news/1/', stream=True)
+    next(response.iter_content(16))
+    response.close()
+    response = scraper.get_page(base_url + '/news/2/', stream=True)
+    content = b''.join(response.iter_content(1024))
+    response.close()
+
+    assert archive.lookup('/news/1/') == (None, None)
+    entry, body = archive.lookup('/news/2')
+    assert entry['status'] == 200
+    assert body == content
+
+
+def test_fault_injection_is_deterministic():
+    faults = Faults(error_rate=0.3, seed=7)
+    first = [faults.is_error(f'/news/{i}/', 0) for i in range(200)]
+    assert first == [faults.is_error(f'/news/{i}/', 0) for i in range(200)]
+    assert 30 < sum(first) < 90
+
+
+def test_benchmark_second_pass_is_revalidated():
+    service = StandinService(synthetic=SyntheticArchive(30), faults=Faults(error_rate=0.1, seed=1))
+    first, second = run_benchmark(service, passes=2, max_workers=4, backoff_base=0, max_attempts=5)
+
+    assert first['items'] == second['items'] == 30
+    assert first['server']['not_modified'] == 0
+    assert second['server']['not_modified'] > 0
+    assert second['cache']['hits'] > 0
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+"""向量化開業統計（需要 NumPy）"""
+
+import pytest
+
+pytest.importorskip('numpy')
+
+from whitopia_stats import OpeningFrame  # noqa: E402
+from whitopia_stream import OpeningStats  # noqa: E402
+
+RECORDS = [
+    {'store_name': 'ホワイトピア丸亀店', 'prefecture': '香川県', 'date': '2025-05-31'},
+    {'store_name': 'ホワイトピア高松鶴市店', 'prefecture': '香川県', 'date': '2025-06-09'},
+    {'store_name': 'ホワイトピア高松伏石店', 'prefecture': '香川県', 'date': '2025-06-26'},
+    {'store_name': 'ホワイトピア美野島店', 'prefecture': '福岡県', 'date': '2025-07-07'},
+    {'store_name': '', 'prefecture': '', 'date': ''},
+    {'store_name': '', 'prefecture': '', 'date': '近日'},
+]
+
+
+@pytest.fixture
+def frame():
+    return OpeningFrame.from_records(RECORDS)
+
+
+def test_counts_match_incremental_stats(frame):
+    stats = OpeningStats()
+    for record in RECORDS[:5]:
+        stats.add(record)
+    assert frame.monthly_counts() == stats.monthly_stats
+    assert frame.prefecture_counts() == stats.prefecture_stats
+
+
+def test_weekly_counts_are_keyed_by_monday(frame):
+    assert frame.weekly_counts() == {'2025-05-26': 1, '2025-06-09': 1, '2025-06-23': 1, '2025-07-07': 1}
+
+
+def test_prefecture_month_counts(frame):
+    assert frame.prefecture_month_counts() == {
+        '香川県': {'2025-05': 1, '2025-06': 2},
+        '福岡県': {'2025-07': 1},
+    }
+
+
+def test_cumulative_and_rolling_rate(frame):
+    assert frame.cumulative_counts() == {'2025-05': 1, '2025-06': 3, '2025-07': 4}
+    assert frame.rolling_rate(window=2) == {'2025-05': 1.0, '2025-06': 1.5, '2025-07': 1.5}
+
+
+def test_intervals(frame):
+    intervals = frame.intervals()
+    assert intervals['overall'] == {'count': 3, 'mean': pytest.approx(37 / 3), 'median': 11.0, 'min': 9, 'max': 17}
+    assert list(intervals['by_prefecture']) == ['香川県']
+    assert intervals['by_prefecture']['香川県']['count'] == 2
+
+
+def test_summary_counts_undated_records(frame):
+    summary = frame.summary()
+    assert (summary['total_stores'], summary['dated_stores']) == (6, 4)
+
+
+def test_empty_frame():
+    frame = OpeningFrame.from_records([])
+    assert frame.monthly_counts() == {}
+    assert frame.weekly_counts() == {}
+    assert frame.rolling_rate() == {}
+    assert frame.intervals()['overall']['count'] == 0
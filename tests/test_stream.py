@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""串流 JSONL 輸出及逐項分析"""
+
+import json
+
+from whitopia_analyzer import WhitopiaAnalyzer
+from whitopia_improved_analyzer import ImprovedWhitopiaAnalyzer
+from whitopia_stream import JsonlWriter, NewsSource, OpeningStats, iter_jsonl, iter_news_items, read_header
+
+
+def test_jsonl_writer_header_and_summary(tmp_path):
+    path = str(tmp_path / 'items.jsonl')
+    with JsonlWriter(path, {'scrape_time': 'now'}) as writer:
+        writer.write({'title': 'a'})
+        writer.write({'title': 'b', 'store_related': True})
+        writer.write_summary({'total': 2})
+
+    assert read_header(path) == {'scrape_time': 'now'}
+    assert list(iter_jsonl(path)) == [{'title': 'a'}, {'title': 'b', 'store_related': True}]
+    assert list(iter_news_items(path, store_only=True)) == [{'title': 'b', 'store_related': True}]
+
+
+def test_news_source_counts_items_while_reading(tmp_path):
+    path = str(tmp_path / 'items.jsonl')
+    with JsonlWriter(path, {'scrape_time': 'now'}) as writer:
+        for i in range(5):
+            writer.write({'title': str(i), 'store_related': i % 2 == 0})
+
+    source = NewsSource(path)
+    assert [item['title'] for item in source.iter_store_news()] == ['0', '2', '4']
+    assert source.meta == {'scrape_time': 'now', 'total_items': 5, 'store_related_items': 3}
+
+
+def test_opening_stats_merge():
+    first, second = OpeningStats(), OpeningStats()
+    first.add({'store_name': 'A', 'date': '2025-07-07', 'prefecture': '福岡県'})
+    second.add({'store_name': '', 'date': '2025-07-01', 'prefecture': ''})
+    second.add({'store_name': 'B', 'date': '2025-06-26', 'prefecture': '香川県'})
+    first.merge(second)
+
+    assert (first.total, first.identified) == (3, 2)
+    assert first.monthly_stats == {'2025-07': 2, '2025-06': 1}
+    assert first.summary()['date_range'] == {'start': '2025-06', 'end': '2025-07'}
+
+
+def test_stream_scrape_flags_store_items(standin, make_scraper, tmp_path):
+    base_url, _ = standin()
+    path = str(tmp_path / 'news.jsonl')
+
+    counts = make_scraper(base_url).run_scraper_stream(path)
+
+    items = list(iter_jsonl(path))
+    assert counts['total_items'] == len(items) > 0
+    flagged = [item for item in items if item.get('store_related')]
+    assert counts['store_related_items'] == len(flagged) > 0
+    assert all(item['match_keyword'] for item in flagged)
+
+
+def test_stream_analysis_matches_full_analysis(standin, make_scraper, tmp_path):
+    base_url, _ = standin()
+    path = str(tmp_path / 'news.jsonl')
+    make_scraper(base_url).run_scraper_stream(path)
+
+    full = ImprovedWhitopiaAnalyzer(path, quiet=True).analyze()
+    output = str(tmp_path / 'analysis.jsonl')
+    streamed = ImprovedWhitopiaAnalyzer(path, quiet=True).analyze_stream(output)
+
+    for key in ('total_stores', 'monthly_stats', 'prefecture_stats', 'summary'):
+        assert streamed[key] == full[key]
+    with open(output, 'r', encoding='utf-8') as f:
+        last = json.loads(f.readlines()[-1])
+    assert last['_summary']['total_stores'] == full['total_stores']
+    assert len(list(iter_jsonl(output))) == len(full['store_openings'])
+
+    basic = WhitopiaAnalyzer(path, quiet=True).analyze()
+    assert basic['total_stores'] == len(list(iter_news_items(path, store_only=True)))
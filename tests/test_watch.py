@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""監視模式：自適應輪詢間隔、只輸出變化及保存的基準"""
+
+import pytest
+
+from whitopia_retry import RetryPolicy
+from whitopia_standin import StandinService, SyntheticArchive
+from whitopia_watch import AdaptiveInterval, JsonlSink, NewsWatcher
+
+
+class NewestFirstArchive(SyntheticArchive):
+    def item(self, index):
+        return super().item(self.count - 1 - index)
+
+
+@pytest.fixture
+def archive_url(standin):
+    base_url, service = standin(StandinService(synthetic=NewestFirstArchive(10), conditional=False))
+    return base_url, service.synthetic
+
+
+def test_adaptive_interval():
+    interval = AdaptiveInterval(min_interval=10, max_interval=40, backoff=2)
+    assert [interval.update(False) for _ in range(3)] == [20, 40, 40]
+    assert interval.update(True) == 10
+
+
+def test_only_changes_after_baseline_are_emitted(archive_url, make_scraper, tmp_path):
+    base_url, archive = archive_url
+    events = []
+    watcher = NewsWatcher(make_scraper(base_url), [events.append], state_file=str(tmp_path / 'state.json'))
+
+    watcher.establish_baseline()
+    assert events == []
+    assert len(watcher.known) == 10
+
+    archive.count = 12
+    assert watcher.poll()
+    assert [event['event'] for event in events] == ['new', 'new']
+    assert not watcher.poll()
+    assert len(events) == 2
+
+
+def test_state_file_keeps_baseline_between_runs(archive_url, make_scraper, tmp_path):
+    base_url, archive = archive_url
+    state_file = str(tmp_path / 'state.json')
+    NewsWatcher(make_scraper(base_url), [], state_file=state_file).establish_baseline()
+
+    archive.count = 11
+    events_file = str(tmp_path / 'events.jsonl')
+    watcher = NewsWatcher(make_scraper(base_url), [JsonlSink(events_file)], state_file=state_file,
+                          interval=AdaptiveInterval(min_interval=0, max_interval=0))
+    assert watcher.baseline_established
+    watcher.run(max_polls=1)
+
+    with open(events_file, 'r', encoding='utf-8') as f:
+        assert len(f.readlines()) == 1
+
+
+def test_store_only_skips_unrelated_items(make_scraper):
+    events = []
+    watcher = NewsWatcher(make_scraper('http://127.0.0.1:9'), [events.append], store_only=True)
+    watcher.emit('new', {'title': '年末年始の営業時間', 'content': ''})
+    watcher.emit('new', {'title': 'ホワイトピア美野島店オープン', 'content': ''})
+    assert [event['item']['match_keyword'] for event in events] == ['オープン']
+
+
+def test_failed_poll_keeps_known_items(archive_url, make_scraper):
+    base_url, _ = archive_url
+    watcher = NewsWatcher(make_scraper(base_url, retry_policy=RetryPolicy(max_attempts=1)), [])
+    watcher.establish_baseline()
+    known = dict(watcher.known)
+
+    # 列表頁無法連接：錯誤向上引發，已知公告保持不變
+    watcher.scraper.base_url = 'http://127.0.0.1:9'
+    with pytest.raises(Exception):
+        watcher.poll()
+    assert watcher.known == known
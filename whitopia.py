@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Whitopia.jp 命令行工具
+一個入口執行所有子命令（scrape、analyze、report、stats 等）。
+各子命令的模組只在執行該子命令時才匯入，離線分析不會載入 requests、bs4 等網絡及 HTML 套件，
+啟動時間保持在數十毫秒以內
+"""
+
+import sys
+
+# 子命令 → (模組, 說明)；模組提供 main(argv)，report 由本模組的 report_main 處理
+COMMANDS = {
+    'scrape': ('whitopia_scraper', "爬取お知らせ（需要網絡）"),
+    'analyze': ('whitopia_improved_analyzer', "分析爬蟲結果（離線；--basic 使用基本分析器）"),
+    'report': (None, "從已保存的分析結果產生 Markdown 報告（離線）"),
+    'stats': ('whitopia_stats', "開業統計及時間序列（離線，需要 NumPy）"),
+    'batch': ('whitopia_batch', "並行分析多個歷史快照（離線）"),
+    'watch': ('whitopia_watch', "監視模式，只輸出新增及改變的公告（需要網絡）"),
+    'serve': ('whitopia_server', "開業信息查詢服務（離線）"),
+    'sites': ('whitopia_sites', "按設定文件爬取多個網站（需要網絡）"),
+    'standin': ('whitopia_standin', "本地替身伺服器：重播錄製的回應或模擬歸檔，可注入延遲及錯誤"),
+    'codec': ('whitopia_codec', "按 schema 驗證結果文件，或轉換為 MessagePack（離線）"),
+}
+
+
+def print_usage(file=None):
+    # 執行時才取 sys.stdout，輸出被重新導向時也能正確輸出
+    file = file or sys.stdout
+    print("用法: whitopia <子命令> [選項]\n", file=file)
+    print("子命令:", file=file)
+    for name, (_, help_text) in COMMANDS.items():
+        print(f"  {name:<10}{help_text}", file=file)
+    print("\n各子命令的選項: whitopia <子命令> --help", file=file)
+
+
+def report_main(argv=None):
+    """report 子命令：不重新分析，直接以分析結果輸出 Markdown 報告"""
+    import argparse
+
+    from whitopia_codec import load_analysis
+    from whitopia_render import MarkdownRenderer
+
+    parser = argparse.ArgumentParser(prog='whitopia report', description="從已保存的分析結果產生 Markdown 報告")
+    parser.add_argument('input', nargs='?', default='whitopia_detailed_analysis.json',
+                        help="改進版分析器的結果（.json 或 .msgpack）")
+    parser.add_argument('--output', default='whitopia_report.md', help="報告文件")
+    parser.add_argument('--quiet', action='store_true', help="不輸出保存信息")
+    args = parser.parse_args(argv)
+
+    result = load_analysis(args.input)
+    MarkdownRenderer(args.output, quiet=args.quiet).render(result)
+
+
+def load_command(name, argv=()):
+    """返回子命令的 main（此時才匯入對應模組）"""
+    if name == 'report':
+        return report_main
+    if name == 'analyze' and '--basic' in argv:
+        module_name = 'whitopia_analyzer'
+    else:
+        module_name = COMMANDS[name][0]
+    module = __import__(module_name)
+    return module.main
+
+
+def main(argv=None):
+    argv = list(sys.argv[1:] if argv is None else argv)
+    if not argv or argv[0] in ('-h', '--help'):
+        print_usage()
+        return 0
+    name, rest = argv[0], argv[1:]
+    if name not in COMMANDS:
+        print(f"未知的子命令: {name}\n", file=sys.stderr)
+        print_usage(sys.stderr)
+        return 2
+
+    command = load_command(name, rest)
+    if name == 'analyze' and '--basic' in rest:
+        rest.remove('--basic')
+    # 子命令的 argparse 以 sys.argv[0] 作為用法中的程式名稱
+    sys.argv[0] = f"whitopia {name}"
+    command(rest)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -5,87 +5,50 @@ Whitopia.jp 店鋪開業信息分析器
 分析爬蟲結果並整理店鋪開業的詳細信息
 """
 
-import json
-import re
 from datetime import datetime
 
+from whitopia_extract import extract_basic_store_info
+from whitopia_render import BasicConsoleRenderer, JsonRenderer, MarkdownRenderer, render_all
+from whitopia_stream import NewsSource, OpeningStats
+
 class WhitopiaAnalyzer:
-    def __init__(self, json_file='whitopia_news.json'):
+    def __init__(self, json_file='whitopia_news.json', quiet=False):
         self.json_file = json_file
+        self.quiet = quiet
+        self.meta = {}
         self.store_openings = []
     
     def load_data(self):
-        """載入JSON數據"""
+        """載入爬蟲結果（支援 JSON、MessagePack 及串流 JSONL 格式）"""
         try:
-            with open(self.json_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            return NewsSource(self.json_file)
         except FileNotFoundError:
             print(f"找不到文件: {self.json_file}")
             return None
-        except json.JSONDecodeError:
-            print(f"JSON格式錯誤: {self.json_file}")
+        except ValueError as e:
+            # JSON 無法解碼或不符合 schema（SchemaError）
+            print(f"格式錯誤: {self.json_file}（{e}）")
             return None
     
     def extract_store_info(self, text):
         """從文字中提取店鋪信息"""
-        store_info = {
-            'store_name': '',
-            'location': '',
-            'date': '',
-            'prefecture': ''
-        }
-        
-        # 提取店鋪名稱
-        store_name_patterns = [
-            r'「(ホワイトピア[^」]+)」',
-            r'(ホワイトピア[^\s]+店)',
-            r'(ホワイトピア[^が]+)が'
-        ]
-        
-        for pattern in store_name_patterns:
-            match = re.search(pattern, text)
-            if match:
-                store_info['store_name'] = match.group(1)
-                break
-        
-        # 提取地點信息
-        location_patterns = [
-            r'([^県]+県)に',
-            r'新たに([^県]+県)',
-            r'([^県]+県)にOPEN'
-        ]
-        
-        for pattern in location_patterns:
-            match = re.search(pattern, text)
-            if match:
-                store_info['prefecture'] = match.group(1)
-                break
-        
-        # 提取日期
-        date_match = re.search(r'(\d{4}-\d{2}-\d{2})', text)
-        if date_match:
-            store_info['date'] = date_match.group(1)
-        
-        return store_info
+        return extract_basic_store_info(text)
     
-    def analyze_store_openings(self):
-        """分析店鋪開業信息"""
-        data = self.load_data()
-        if not data:
-            return
-        
-        print("=" * 60)
-        print("Whitopia.jp 店鋪開業信息分析結果")
-        print("=" * 60)
-        print(f"分析時間: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-        print(f"數據來源: {data.get('scrape_time', '未知')}")
-        print(f"總共找到 {data.get('total_items', 0)} 個項目")
-        print(f"店鋪相關項目: {data.get('store_related_items', 0)} 個")
-        print()
+    def analyze(self):
+        """
+        分析店鋪開業信息，只返回結構化結果（不輸出、不寫文件）
+        
+        統計以 OpeningStats 增量累計，但結果包含按日期排序的完整記錄列表，記憶體用量隨店鋪項目數量增長；
+        項目數量很大時請使用改進版分析器的 --stream
+        """
+        source = self.load_data()
+        if not source:
+            return None
         
         store_openings = []
+        stats = OpeningStats()
         
-        for item in data.get('store_news', []):
+        for item in source.iter_store_news():
             store_info = self.extract_store_info(item.get('content', '') + ' ' + item.get('title', ''))
             
             # 如果沒有從內容中提取到日期，使用項目的日期
@@ -95,65 +58,53 @@ class WhitopiaAnalyzer:
             store_info['raw_content'] = item.get('content', '')
             store_info['match_keyword'] = item.get('match_keyword', '')
             
+            stats.add(store_info)
             store_openings.append(store_info)
+        self.meta = dict(source.meta)
         
         # 按日期排序（最新的在前）
         store_openings.sort(key=lambda x: x['date'], reverse=True)
         
-        print("📅 店鋪開業時間表:")
-        print("-" * 60)
-        
-        for i, store in enumerate(store_openings, 1):
-            date_obj = datetime.strptime(store['date'], '%Y-%m-%d')
-            formatted_date = date_obj.strftime('%Y年%m月%d日')
-            
-            print(f"{i}. 開業日期: {formatted_date}")
-            print(f"   店鋪名稱: {store['store_name']}")
-            print(f"   所在地區: {store['prefecture']}")
-            print(f"   關鍵詞: {store['match_keyword']}")
-            print(f"   原始內容: {store['raw_content'][:100]}...")
-            print()
-        
-        # 統計分析
-        print("📊 統計分析:")
-        print("-" * 60)
-        
-        # 按月份統計
-        monthly_stats = {}
-        prefecture_stats = {}
-        
-        for store in store_openings:
-            if store['date']:
-                month = store['date'][:7]  # YYYY-MM
-                monthly_stats[month] = monthly_stats.get(month, 0) + 1
-            
-            if store['prefecture']:
-                prefecture_stats[store['prefecture']] = prefecture_stats.get(store['prefecture'], 0) + 1
-        
-        print("按月份統計:")
-        for month, count in sorted(monthly_stats.items(), reverse=True):
-            print(f"  {month}: {count} 家店鋪")
-        
-        print("\n按地區統計:")
-        for prefecture, count in sorted(prefecture_stats.items(), key=lambda x: x[1], reverse=True):
-            print(f"  {prefecture}: {count} 家店鋪")
-        
-        # 保存分析結果
-        analysis_result = {
+        return {
             'analysis_time': datetime.now().isoformat(),
             'total_stores': len(store_openings),
             'store_openings': store_openings,
-            'monthly_stats': monthly_stats,
-            'prefecture_stats': prefecture_stats
+            'monthly_stats': stats.monthly_stats,
+            'prefecture_stats': stats.prefecture_stats
         }
+    
+    def default_renderers(self):
+        """終端輸出（安靜模式下省略）及 whitopia_analysis.json"""
+        renderers = [JsonRenderer('whitopia_analysis.json', quiet=self.quiet)]
+        if not self.quiet:
+            renderers.insert(0, BasicConsoleRenderer())
+        return renderers
+    
+    def analyze_store_openings(self, renderers=None):
+        """分析店鋪開業信息並輸出"""
+        analysis_result = self.analyze()
+        if analysis_result is None:
+            return
         
-        with open('whitopia_analysis.json', 'w', encoding='utf-8') as f:
-            json.dump(analysis_result, f, ensure_ascii=False, indent=2)
-        
-        print(f"\n詳細分析結果已保存到 whitopia_analysis.json")
-        
+        render_all(renderers if renderers is not None else self.default_renderers(), analysis_result, self.meta)
         return analysis_result
 
+def main(argv=None):
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Whitopia.jp 店鋪開業信息分析器")
+    parser.add_argument('json_file', nargs='?', default='whitopia_news.json', help="爬蟲結果（.json 或 .jsonl）")
+    parser.add_argument('--quiet', action='store_true', help="安靜模式，不輸出時間表及統計，只保存結果")
+    parser.add_argument('--report', nargs='?', const='whitopia_report.md', metavar='FILE',
+                        help="同時輸出 Markdown 報告（預設 whitopia_report.md）")
+    args = parser.parse_args(argv)
+    
+    analyzer = WhitopiaAnalyzer(args.json_file, quiet=args.quiet)
+    renderers = analyzer.default_renderers()
+    if args.report:
+        renderers.append(MarkdownRenderer(args.report, quiet=args.quiet))
+    analyzer.analyze_store_openings(renderers)
+
+
 if __name__ == "__main__":
-    analyzer = WhitopiaAnalyzer()
-    analyzer.analyze_store_openings()
\ No newline at end of file
+    main()
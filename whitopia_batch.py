@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Whitopia.jp 歷史快照批量分析
+以進程池並行分析多個 whitopia_news.json 快照，合併成完整的開業時間表，
+在多個快照中出現的同一開業記錄只計算一次
+"""
+
+import glob
+import os
+import time
+from datetime import datetime
+
+from whitopia_extract import extract_record
+from whitopia_stream import NewsSource, OpeningStats
+
+
+def find_snapshots(patterns):
+    """展開目錄或萬用字元，返回排序後的快照文件列表"""
+    from whitopia_codec import MSGPACK_SUFFIXES
+
+    paths = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            for name in os.listdir(pattern):
+                if name.endswith(('.json', '.jsonl') + MSGPACK_SUFFIXES):
+                    paths.append(os.path.join(pattern, name))
+        else:
+            paths.extend(glob.glob(pattern))
+    return sorted(set(paths))
+
+
+def analyze_snapshot(path):
+    """
+    分析單個快照（在子進程中執行）
+
+    返回快照信息、去重後的店鋪記錄（不含全文，減少進程間傳輸）及該快照的統計
+    """
+    from whitopia_db import opening_key
+    from whitopia_dedup import dedupe_records
+
+    try:
+        source = NewsSource(path)
+    except (OSError, ValueError) as e:
+        return {'path': path, 'error': str(e)}
+
+    records = {}
+    stats = OpeningStats()
+    for record in dedupe_records(source.iter_store_news(), extract_record):
+        key = opening_key(record)
+        del record['full_text']
+        if key not in records:
+            records[key] = record
+            stats.add(record)
+
+    return {
+        'path': path,
+        'scrape_time': source.meta.get('scrape_time', ''),
+        'records': records,
+        'monthly_stats': stats.monthly_stats,
+        'prefecture_stats': stats.prefecture_stats
+    }
+
+
+def merge_record(existing, record):
+    """同一開業記錄出現在多個快照時，補上缺少的欄位"""
+    for field in ('prefecture', 'city', 'date', 'url', 'match_keyword'):
+        if not existing.get(field) and record.get(field):
+            existing[field] = record[field]
+    existing['match_keywords'] = sorted(set(existing['match_keywords']) | set(record['match_keywords']))
+
+
+class BatchAnalyzer:
+    """並行分析多個快照並合併結果"""
+
+    def __init__(self, snapshots, max_workers=None):
+        self.snapshots = snapshots
+        self.max_workers = max_workers or os.cpu_count() or 1
+
+    def run(self):
+        """分析所有快照，返回合併後的時間表和統計"""
+        openings = {}
+        snapshot_summaries = []
+
+        # 進程池（multiprocessing）載入較慢，只在實際分析時才匯入
+        from concurrent.futures import ProcessPoolExecutor
+
+        # 每個工作進程一次取多個快照，減少調度開銷
+        chunksize = max(1, len(self.snapshots) // (self.max_workers * 4))
+        with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
+            for result in executor.map(analyze_snapshot, self.snapshots, chunksize=chunksize):
+                if 'error' in result:
+                    print(f"跳過無法讀取的快照 {result['path']}: {result['error']}")
+                    continue
+
+                for key, record in result['records'].items():
+                    existing = openings.get(key)
+                    if existing is None:
+                        record['first_seen'] = record['last_seen'] = result['scrape_time']
+                        record['snapshots'] = 1
+                        openings[key] = record
+                    else:
+                        merge_record(existing, record)
+                        existing['first_seen'] = min(existing['first_seen'], result['scrape_time'])
+                        existing['last_seen'] = max(existing['last_seen'], result['scrape_time'])
+                        existing['snapshots'] += 1
+
+                snapshot_summaries.append({
+                    'path': result['path'],
+                    'scrape_time': result['scrape_time'],
+                    'store_openings': len(result['records']),
+                    'monthly_stats': result['monthly_stats'],
+                    'prefecture_stats': result['prefecture_stats']
+                })
+
+        # 合併後的統計以去重後的記錄計算
+        stats = OpeningStats()
+        for record in openings.values():
+            stats.add(record)
+
+        timeline = sorted(openings.values(), key=lambda x: x['date'] or '0000-00-00', reverse=True)
+        return {
+            'analysis_time': datetime.now().isoformat(),
+            'snapshots': len(snapshot_summaries),
+            'total_stores': stats.identified,
+            'store_openings': timeline,
+            'monthly_stats': stats.monthly_stats,
+            'prefecture_stats': stats.prefecture_stats,
+            'summary': stats.summary(),
+            'snapshot_summaries': snapshot_summaries
+        }
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Whitopia.jp 歷史快照批量分析")
+    parser.add_argument('snapshots', nargs='+', help="快照目錄或萬用字元（如 'snapshots/*.json'）")
+    parser.add_argument('--workers', type=int, default=None, help="工作進程數（預設為 CPU 數量）")
+    parser.add_argument('--output', default='whitopia_timeline.json', help="輸出文件（.msgpack 保存為 MessagePack）")
+    args = parser.parse_args(argv)
+
+    snapshots = find_snapshots(args.snapshots)
+    if not snapshots:
+        print("找不到任何快照文件")
+        raise SystemExit(1)
+
+    print(f"正在以 {args.workers or os.cpu_count()} 個進程分析 {len(snapshots)} 個快照...")
+    start = time.perf_counter()
+    result = BatchAnalyzer(snapshots, args.workers).run()
+    elapsed = time.perf_counter() - start
+
+    from whitopia_codec import dump
+
+    dump(result, args.output)
+
+    print(f"完成，耗時 {elapsed:.2f} 秒（{len(snapshots) / elapsed:.1f} 個快照/秒）")
+    print(f"去重後共 {len(result['store_openings'])} 筆開業記錄，成功識別 {result['total_stores']} 家店鋪")
+    print(f"結果已保存到 {args.output}")
+
+
+if __name__ == "__main__":
+    main()
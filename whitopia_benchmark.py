@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Whitopia.jp 基準測試套件
+產生模擬的お知らせ頁面與 whitopia_news.json 語料（10 ~ 1,000,000 個項目），
+分別測量解析、關鍵詞過濾、店鋪信息提取和統計四個階段的處理速度與記憶體峰值，
+並與保存的基準結果比較找出效能退化
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import time
+import tracemalloc
+
+STORES = [
+    ('美野島', '福岡県'), ('高松伏石', '香川県'), ('高松鶴市', '香川県'), ('丸亀', '香川県'),
+    ('徳島', '徳島県'), ('松山', '愛媛県'), ('高知', '高知県'), ('岡山', '岡山県'),
+    ('広島', '広島県'), ('博多', '福岡県'), ('小倉', '福岡県'), ('熊本', '熊本県'),
+]
+
+OTHER_NEWS = [
+    '年末年始の営業時間についてご案内いたします。平素より格別のご高配を賜り誠にありがとうございます。',
+    '台風接近に伴う臨時休業のお知らせ。ご不便をおかけしますが何卒ご了承ください。',
+    'ホームページをリニューアルしました。今後ともよろしくお願いいたします。',
+    'お盆期間中の配送についてのお知らせです。',
+]
+
+BASELINE_FILE = 'whitopia_benchmark_baseline.json'
+
+
+def make_news_item(rng, index):
+    """產生一個模擬的新聞項目（約一半是開業公告）"""
+    date = f"{rng.randint(2019, 2025)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"
+    if rng.random() < 0.5:
+        name, prefecture = rng.choice(STORES)
+        name = f"{name}{index % 97 or ''}"
+        title = f"ホワイトピア{name}店がOPEN！"
+        content = f"{date}{title}「ホワイトピア{name}店」が新たに{prefecture}にOPENしました！"
+    else:
+        title = rng.choice(OTHER_NEWS)
+        content = f"{date}{title}"
+    return {'date': date, 'title': title, 'content': content, 'url': f"https://www.whitopia.jp/news/{index}/"}
+
+
+def iter_news_items(count, seed=0):
+    rng = random.Random(seed)
+    for index in range(count):
+        yield make_news_item(rng, index)
+
+
+def generate_news_html(count, structured=True, seed=0):
+    """
+    產生お知らせ頁面 HTML
+
+    structured=True 時每個項目是一個 .news-item 元素；
+    否則模仿實際網站，項目只是以換行分隔的文字（走日期文字行備用解析）
+    """
+    parts = ['<html><head><title>ホワイトピア</title><script>var x = 1;</script></head><body>',
+             '<header><nav><a href="/">ホーム</a><a href="/news/">お知らせ</a></nav></header><main>']
+    for item in iter_news_items(count, seed):
+        if structured:
+            parts.append(f'<div class="news-item"><span class="date">{item["date"]}</span>'
+                         f'<a href="{item["url"]}">{item["title"]}</a><p>{item["content"]}</p></div>')
+        else:
+            parts.append(f'<p>{item["content"]}</p>\n')
+    parts.append('</main><footer>© ホワイトピア</footer></body></html>')
+    return ''.join(parts)
+
+
+def generate_news_corpus(count, path, seed=0):
+    """產生 whitopia_news.json 格式的語料（.jsonl 時逐行寫出，記憶體不隨數量增長）"""
+    from whitopia_extract import STORE_KEYWORD_AUTOMATON
+    from whitopia_stream import JsonlWriter
+
+    if path.endswith('.jsonl'):
+        with JsonlWriter(path, {'scrape_time': '2025-07-29T00:00:00'}) as writer:
+            for item in iter_news_items(count, seed):
+                keyword = STORE_KEYWORD_AUTOMATON.first(item['title'] + ' ' + item['content'])
+                if keyword:
+                    item['match_keyword'] = keyword
+                    item['store_related'] = True
+                writer.write(item)
+        return path
+
+    all_news = list(iter_news_items(count, seed))
+    store_news = []
+    for item in all_news:
+        keyword = STORE_KEYWORD_AUTOMATON.first(item['title'] + ' ' + item['content'])
+        if keyword:
+            item['match_keyword'] = keyword
+            store_news.append(item)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({
+            'scrape_time': '2025-07-29T00:00:00',
+            'total_items': len(all_news),
+            'store_related_items': len(store_news),
+            'all_news': all_news,
+            'store_news': store_news
+        }, f, ensure_ascii=False)
+    return path
+
+
+class PageResponse:
+    """代替網絡回應的頁面"""
+
+    def __init__(self, text):
+        self.text = text
+
+
+def run_stage(func, measure_memory):
+    """執行一個階段，返回 (結果, 耗時秒數, 記憶體峰值位元組)"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+
+        peak = None
+        if measure_memory:
+            tracemalloc.start()
+            func()
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def benchmark_size(count, max_parse_items, measure_memory):
+    """對一個語料大小執行所有階段"""
+    from whitopia_extract import extract_record
+    from whitopia_scraper import WhitopiaScraper
+    from whitopia_stream import OpeningStats
+
+    scraper = WhitopiaScraper(selector_memory_file=None)
+    results = {}
+
+    # 解析：以 scrape_news_list 處理產生的頁面（不經網絡）
+    # HTML 頁面大小有上限，過大的語料只解析前 max_parse_items 個項目
+    parse_count = min(count, max_parse_items)
+    for stage, structured, remembered in (('parse', True, False),
+                                          ('parse_remembered', True, True),
+                                          ('parse_text', False, False)):
+        page = PageResponse(generate_news_html(parse_count, structured))
+        scraper.get_page = lambda url, page=page: page
+
+        def parse():
+            if not remembered:
+                scraper.selector_memory = {}
+            return scraper.scrape_news_list()
+
+        if remembered:
+            run_stage(parse, False)
+        _, elapsed, peak = run_stage(parse, measure_memory)
+        results[stage] = {'items': parse_count, 'seconds': elapsed, 'peak_bytes': peak}
+
+    news_items = list(iter_news_items(count))
+
+    def filter_news():
+        return scraper.filter_store_opening_news([dict(item) for item in news_items])
+
+    store_news, elapsed, peak = run_stage(filter_news, measure_memory)
+    results['filter'] = {'items': count, 'seconds': elapsed, 'peak_bytes': peak}
+
+    def extract():
+        return [extract_record(item) for item in store_news]
+
+    records, elapsed, peak = run_stage(extract, measure_memory)
+    results['extract'] = {'items': len(store_news), 'seconds': elapsed, 'peak_bytes': peak}
+
+    def statistics():
+        stats = OpeningStats()
+        for record in records:
+            stats.add(record)
+        return stats
+
+    _, elapsed, peak = run_stage(statistics, measure_memory)
+    results['statistics'] = {'items': len(records), 'seconds': elapsed, 'peak_bytes': peak}
+
+    for stage in results.values():
+        stage['items_per_sec'] = stage['items'] / stage['seconds'] if stage['seconds'] else 0.0
+    return results
+
+
+def compare_with_baseline(report, baseline, threshold):
+    """找出處理速度比基準低超過 threshold 比例的階段"""
+    regressions = []
+    for size, stages in report.items():
+        for stage, result in stages.items():
+            base = baseline.get(size, {}).get(stage)
+            if not base or not base.get('items_per_sec'):
+                continue
+            ratio = result['items_per_sec'] / base['items_per_sec']
+            if ratio < 1 - threshold:
+                regressions.append((size, stage, ratio))
+    return regressions
+
+
+def format_bytes(value):
+    if value is None:
+        return '-'
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if value < 1024:
+            return f"{value:.0f}{unit}"
+        value /= 1024
+    return f"{value:.1f}TB"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Whitopia.jp 基準測試套件")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 1000, 10000], help="語料大小（項目數）")
+    parser.add_argument('--max-parse-items', type=int, default=10000, help="解析階段 HTML 頁面的最大項目數")
+    parser.add_argument('--no-memory', action='store_true', help="不測量記憶體峰值（大語料時可節省一半時間）")
+    parser.add_argument('--baseline', default=BASELINE_FILE, help="基準結果文件")
+    parser.add_argument('--save-baseline', action='store_true', help="把本次結果保存為基準")
+    parser.add_argument('--threshold', type=float, default=0.2, help="速度低於基準多少比例時視為退化")
+    parser.add_argument('--generate', metavar='FILE', help="只產生語料文件（.json 或 .jsonl），大小取 --sizes 第一個值")
+    args = parser.parse_args()
+
+    if args.generate:
+        generate_news_corpus(args.sizes[0], args.generate)
+        print(f"已產生 {args.sizes[0]} 個項目的語料: {args.generate}")
+        return
+
+    report = {}
+    print(f"{'大小':>9} {'階段':<18}{'項目數':>10}{'耗時(秒)':>12}{'項目/秒':>14}{'記憶體峰值':>12}")
+    for count in args.sizes:
+        results = benchmark_size(count, args.max_parse_items, not args.no_memory)
+        report[str(count)] = results
+        for stage, result in results.items():
+            print(f"{count:>9} {stage:<18}{result['items']:>10}{result['seconds']:>12.4f}"
+                  f"{result['items_per_sec']:>14,.0f}{format_bytes(result['peak_bytes']):>12}")
+
+    if os.path.exists(args.baseline):
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare_with_baseline(report, baseline, args.threshold)
+        if regressions:
+            print("\n⚠️ 效能退化:")
+            for size, stage, ratio in regressions:
+                print(f"  {size} 個項目 {stage}: 速度為基準的 {ratio:.0%}")
+        else:
+            print("\n✅ 沒有發現效能退化")
+
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"基準結果已保存到 {args.baseline}")
+
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Whitopia.jp HTTP 回應快取
+以 URL 為鍵把回應內容與驗證資訊（ETag / Last-Modified）保存到磁碟，
+發送條件請求，伺服器返回 304 時直接使用快取內容
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+
+
+class CachedResponse:
+    """從快取還原的回應，提供與 requests.Response 相同的常用屬性"""
+
+    def __init__(self, url, content, headers, encoding='utf-8'):
+        self.url = url
+        self.status_code = 200
+        self.headers = headers
+        self.content = content
+        self.encoding = encoding
+        self.from_cache = True
+        self.not_modified = True
+
+    @property
+    def text(self):
+        return self.content.decode(self.encoding, errors='replace')
+
+    def iter_content(self, chunk_size=1):
+        for start in range(0, len(self.content), chunk_size):
+            yield self.content[start:start + chunk_size]
+
+    def raise_for_status(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def tee_content(chunks, callbacks):
+    """
+    逐塊返回 chunks，同時保留已讀內容；全部讀完後以完整內容呼叫每個 callback(content)
+
+    呼叫者提早停止迭代時內容不完整，不呼叫 callback
+    """
+    parts = []
+    for chunk in chunks:
+        parts.append(chunk)
+        yield chunk
+    content = b''.join(parts)
+    for callback in callbacks:
+        callback(content)
+
+
+class ResponseCache:
+    """磁碟上的 HTTP 回應快取，支援按存活時間及總大小淘汰"""
+
+    def __init__(self, cache_dir='.whitopia_cache', max_age=7 * 24 * 3600,
+                 max_entries=500, max_bytes=50 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_age = max_age
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.index_file = os.path.join(cache_dir, 'index.json')
+        self.stats = {'hits': 0, 'misses': 0, 'stores': 0, 'evictions': 0}
+        self._lock = threading.RLock()
+
+        os.makedirs(cache_dir, exist_ok=True)
+        self.index = self._load_index()
+        self.prune()
+
+    def _load_index(self):
+        """載入快取索引"""
+        try:
+            with open(self.index_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _save_index(self):
+        """保存快取索引（先寫臨時文件再替換）"""
+        tmp_file = self.index_file + '.tmp'
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(self.index, f, ensure_ascii=False)
+        os.replace(tmp_file, self.index_file)
+
+    def _key(self, url):
+        return hashlib.sha1(url.encode('utf-8')).hexdigest()
+
+    def _path(self, key, suffix):
+        return os.path.join(self.cache_dir, key + suffix)
+
+    def _remove(self, key):
+        """刪除一個快取項目及其文件"""
+        self.index.pop(key, None)
+        for suffix in ('.body', '.parsed.json'):
+            try:
+                os.remove(self._path(key, suffix))
+            except FileNotFoundError:
+                pass
+        self.stats['evictions'] += 1
+
+    def _entry(self, url):
+        """取得未過期的快取項目"""
+        key = self._key(url)
+        entry = self.index.get(key)
+        if not entry:
+            return key, None
+        if time.time() - entry['stored_at'] > self.max_age or not os.path.exists(self._path(key, '.body')):
+            self._remove(key)
+            self._save_index()
+            return key, None
+        return key, entry
+
+    def conditional_headers(self, url):
+        """返回條件請求需要的標頭"""
+        with self._lock:
+            _, entry = self._entry(url)
+            if not entry:
+                return {}
+            headers = {}
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+            return headers
+
+    def revalidated_response(self, url):
+        """
+        伺服器返回 304 時，從快取還原回應
+
+        項目已被淘汰或內容文件遺失時返回 None，由呼叫者重新下載
+        （未命中在重新下載後的 store() 中計算，不在這裡重複計算）
+        """
+        with self._lock:
+            key, entry = self._entry(url)
+            if not entry:
+                return None
+            try:
+                with open(self._path(key, '.body'), 'rb') as f:
+                    content = f.read()
+            except FileNotFoundError:
+                self._remove(key)
+                self._save_index()
+                return None
+            # stored_at 保持為下載時間，存活時間到期後仍會重新下載
+            entry['validated_at'] = entry['accessed_at'] = time.time()
+            self._save_index()
+            self.stats['hits'] += 1
+            return CachedResponse(url, content, entry.get('headers', {}), entry.get('encoding') or 'utf-8')
+
+    def store(self, url, response, content=None):
+        """
+        保存新下載的回應（每次下載計為一次未命中）
+
+        串流回應的內容由呼叫者分塊讀取，讀完後以 content 傳入
+        """
+        if content is None:
+            content = response.content
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        with self._lock:
+            self.stats['misses'] += 1
+            if not etag and not last_modified:
+                return
+
+            key = self._key(url)
+            with open(self._path(key, '.body'), 'wb') as f:
+                f.write(content)
+            try:
+                os.remove(self._path(key, '.parsed.json'))
+            except FileNotFoundError:
+                pass
+
+            now = time.time()
+            self.index[key] = {
+                'url': url,
+                'etag': etag,
+                'last_modified': last_modified,
+                'encoding': response.encoding,
+                'headers': {'Content-Type': response.headers.get('Content-Type', '')},
+                'size': len(content),
+                'stored_at': now,
+                'accessed_at': now
+            }
+            self.stats['stores'] += 1
+            self.prune()
+
+    def get_parsed(self, url, version=''):
+        """
+        取得之前保存的解析結果
+
+        version 為解析規則的版本（解析器、選擇器等），與保存時不同則視為沒有結果
+        """
+        with self._lock:
+            key, entry = self._entry(url)
+            if not entry:
+                return None
+            try:
+                with open(self._path(key, '.parsed.json'), 'r', encoding='utf-8') as f:
+                    parsed = json.load(f)
+            except (FileNotFoundError, json.JSONDecodeError):
+                return None
+            if not isinstance(parsed, dict) or parsed.get('version') != version:
+                return None
+            return parsed.get('data')
+
+    def store_parsed(self, url, data, version=''):
+        """保存頁面的解析結果及解析規則的版本，頁面及規則都未變更時可跳過解析"""
+        with self._lock:
+            key, entry = self._entry(url)
+            if not entry:
+                return
+            with open(self._path(key, '.parsed.json'), 'w', encoding='utf-8') as f:
+                json.dump({'version': version, 'data': data}, f, ensure_ascii=False)
+
+    def prune(self):
+        """淘汰過期項目，並按最近使用時間淘汰超出數量或大小上限的項目"""
+        with self._lock:
+            now = time.time()
+            for key in [k for k, e in self.index.items() if now - e['stored_at'] > self.max_age]:
+                self._remove(key)
+
+            entries = sorted(self.index.items(), key=lambda x: x[1]['accessed_at'])
+            total_bytes = sum(e['size'] for _, e in entries)
+            while entries and (len(entries) > self.max_entries or total_bytes > self.max_bytes):
+                key, entry = entries.pop(0)
+                total_bytes -= entry['size']
+                self._remove(key)
+
+            self._save_index()
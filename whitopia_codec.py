@@ -0,0 +1,540 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Whitopia.jp 結果文件的 schema 及編解碼
+爬蟲結果（whitopia_news.json、歸檔）和分析結果的欄位類型以帶版本號的 schema 定義。
+有安裝 msgspec 時，解碼和驗證在同一次掃描中完成，直接得到符合 schema 的記錄；
+否則使用 orjson 或標準庫 json，解碼後再逐項驗證。
+.msgpack 文件使用 MessagePack 二進制格式（需要 msgspec 或 msgpack 套件）
+"""
+
+import json
+import os
+import re
+import sys
+from functools import lru_cache
+
+from whitopia_records import expand_records, to_json
+
+# 結果文件的 schema 版本；欄位類型有不兼容的改變時遞增
+SCHEMA_VERSION = 1
+SCHEMA_VERSION_KEY = 'schema_version'
+
+MSGPACK_SUFFIXES = ('.msgpack', '.mpk')
+
+# 以環境變數指定 JSON 編解碼器（msgspec、orjson 或 json），預設自動選擇
+CODEC_ENV = 'WHITOPIA_CODEC'
+
+# 日期欄位：YYYY-MM-DD，未知時為空字串
+DATE_PATTERN = r'^(\d{4}-\d{2}-\d{2})?$'
+DATE_RE = re.compile(DATE_PATTERN)
+
+
+class SchemaError(ValueError):
+    """文件無法解碼或不符合 schema（訊息包含出錯的位置，如 $.all_news[3].date）"""
+
+
+class DateField:
+    """YYYY-MM-DD 日期字串或空字串"""
+
+    def __repr__(self):
+        return 'DATE'
+
+
+DATE = DateField()
+
+
+class ListOf:
+    def __init__(self, item):
+        self.item = item
+
+
+class MapOf:
+    """鍵為字串的物件，值為同一類型（如月份 → 店鋪數）"""
+
+    def __init__(self, value):
+        self.value = value
+
+
+class Schema:
+    """
+    一種 JSON 物件的欄位定義
+
+    欄位都可以省略；未在 schema 中列出的欄位在解碼時捨棄（各編解碼器的結果相同）
+    """
+
+    def __init__(self, name, fields):
+        self.name = name
+        self.fields = fields
+
+
+NEWS_ITEM = Schema('NewsItem', {
+    'date': DATE,
+    'title': str,
+    'content': str,
+    'url': str,
+    'match_keyword': str,
+    'store_related': bool,
+    'detail_content': str,
+    'site': str,
+    'duplicates': int,
+})
+
+STORE_OPENING = Schema('StoreOpening', {
+    'store_name': str,
+    'prefecture': str,
+    'city': str,
+    'location': str,
+    'date': DATE,
+    'url': str,
+    'match_keyword': str,
+    'match_keywords': ListOf(str),
+    'full_text': str,
+    'raw_content': str,
+    'site': str,
+    'first_seen': str,
+    'last_seen': str,
+    'snapshots': int,
+})
+
+# 爬蟲結果：whitopia_news.json、whitopia_archive.json 及多網站爬取結果
+NEWS_FILE = Schema('NewsFile', {
+    SCHEMA_VERSION_KEY: int,
+    'scrape_time': str,
+    'total_items': int,
+    'store_related_items': int,
+    'sites': ListOf(dict),
+    'all_news': ListOf(NEWS_ITEM),
+    'store_news': ListOf(NEWS_ITEM),
+    'store_openings': ListOf(STORE_OPENING),
+})
+
+# 分析結果：基本及改進版分析器、批量分析的時間表
+ANALYSIS_FILE = Schema('AnalysisFile', {
+    SCHEMA_VERSION_KEY: int,
+    'analysis_time': str,
+    'snapshots': int,
+    'total_stores': int,
+    'store_openings': ListOf(STORE_OPENING),
+    'monthly_stats': MapOf(int),
+    'prefecture_stats': MapOf(int),
+    'summary': dict,
+    'extract_cache': dict,
+    'snapshot_summaries': ListOf(dict),
+})
+
+TYPE_NAMES = {str: '字串', int: '整數', bool: '布林值', dict: '物件', list: '列表'}
+
+
+def type_name(spec):
+    if spec is DATE:
+        return 'YYYY-MM-DD 日期或空字串'
+    if isinstance(spec, ListOf):
+        return '列表'
+    if isinstance(spec, (MapOf, Schema)):
+        return '物件'
+    return TYPE_NAMES.get(spec, getattr(spec, '__name__', str(spec)))
+
+
+class InvalidValue(Exception):
+    """validate 內部使用：出錯位置在逐層返回時才組合，驗證通過的值不需要建立路徑字串"""
+
+    def __init__(self, message):
+        super().__init__(message)
+        self.message = message
+        self.location = []
+
+
+def check(value, spec):
+    """就地檢查並捨棄未列出的欄位；不符合時引發 InvalidValue"""
+    if isinstance(spec, Schema):
+        if type(value) is not dict:
+            raise InvalidValue(f"應為{type_name(spec)}")
+        fields = spec.fields
+        if not value.keys() <= fields.keys():
+            for key in [key for key in value if key not in fields]:
+                del value[key]
+        for key, item in value.items():
+            try:
+                check(item, fields[key])
+            except InvalidValue as e:
+                e.location.append(f".{key}")
+                raise
+    elif isinstance(spec, ListOf):
+        if type(value) is not list:
+            raise InvalidValue("應為列表")
+        for i, item in enumerate(value):
+            try:
+                check(item, spec.item)
+            except InvalidValue as e:
+                e.location.append(f"[{i}]")
+                raise
+    elif isinstance(spec, MapOf):
+        if type(value) is not dict:
+            raise InvalidValue("應為物件")
+        for key, item in value.items():
+            try:
+                check(item, spec.value)
+            except InvalidValue as e:
+                e.location.append(f".{key}")
+                raise
+    elif spec is DATE:
+        if type(value) is not str or not DATE_RE.match(value):
+            raise InvalidValue(f"應為{type_name(spec)}，實際為 {value!r:.40}")
+    elif spec is int:
+        if type(value) is not int:
+            raise InvalidValue(f"應為{type_name(spec)}，實際為 {value!r:.40}")
+    elif not isinstance(value, spec):
+        raise InvalidValue(f"應為{type_name(spec)}，實際為 {value!r:.40}")
+
+
+def check_skipping(value, spec, skipped):
+    """
+    與 check 相同，但列表中不符合的項目不會令整個值無效：項目被移除，錯誤加入 skipped，
+    外層在返回時為這些錯誤補上自己的位置。非 YYYY-MM-DD 寫法的日期先以 normalize_date 轉換。
+    只在 check 失敗後使用，符合的文件不需要這些處理
+    """
+    if isinstance(spec, ListOf):
+        if type(value) is not list:
+            raise InvalidValue("應為列表")
+        invalid = set()
+        for i, item in enumerate(value):
+            mark = len(skipped)
+            try:
+                check_skipping(item, spec.item, skipped)
+            except InvalidValue as e:
+                e.location.append(f"[{i}]")
+                skipped.append(e)
+                invalid.add(i)
+                continue
+            add_location(skipped, mark, f"[{i}]")
+        if invalid:
+            value[:] = [item for i, item in enumerate(value) if i not in invalid]
+    elif isinstance(spec, (Schema, MapOf)):
+        if type(value) is not dict:
+            raise InvalidValue(f"應為{type_name(spec)}")
+        if isinstance(spec, Schema):
+            fields = spec.fields
+            for key in [key for key in value if key not in fields]:
+                del value[key]
+        for key, item in value.items():
+            item_spec = spec.fields[key] if isinstance(spec, Schema) else spec.value
+            if item_spec is DATE and type(item) is str and not DATE_RE.match(item):
+                # 2025/07/01、2025年7月1日等其他寫法先轉成 YYYY-MM-DD，只有無法解析的日期才不符合
+                item = normalize_date(item) or item
+                value[key] = item
+            mark = len(skipped)
+            try:
+                check_skipping(item, item_spec, skipped)
+            except InvalidValue as e:
+                e.location.append(f".{key}")
+                raise
+            add_location(skipped, mark, f".{key}")
+    else:
+        check(value, spec)
+
+
+def normalize_date(value):
+    """以爬蟲相同的日期提取把其他寫法的日期轉成 YYYY-MM-DD；無法解析時返回空字串"""
+    from whitopia_extract import extract_date
+
+    return extract_date(value)
+
+
+def add_location(skipped, mark, location):
+    """為子值中新跳過的項目補上位置"""
+    for error in skipped[mark:]:
+        error.location.append(location)
+
+
+def error_message(error):
+    return f"${''.join(reversed(error.location))}: {error.message}"
+
+
+def validate(value, spec, skipped=None):
+    """
+    按 schema 檢查解碼後的值，並就地捨棄未列出的欄位；返回檢查後的值
+
+    列表中不符合的項目被移除，其錯誤訊息（含位置）加入 skipped 列表；
+    其他不符合時引發 SchemaError
+    """
+    try:
+        check(value, spec)
+    except InvalidValue:
+        # 有不符合的地方：重新檢查，跳過不符合的列表項目，其他錯誤仍然引發
+        errors = []
+        try:
+            check_skipping(value, spec, errors)
+        except InvalidValue as e:
+            raise SchemaError(error_message(e)) from None
+        if skipped is not None:
+            skipped.extend(error_message(e) for e in errors)
+    return value
+
+
+def check_version(data):
+    """沒有版本號的舊文件視為第 1 版；比目前版本新的文件無法讀取"""
+    version = data.get(SCHEMA_VERSION_KEY, 1) if isinstance(data, dict) else 1
+    if version > SCHEMA_VERSION:
+        raise SchemaError(f"不支援的 schema 版本 {version}（目前為 {SCHEMA_VERSION}）")
+
+
+class JsonCodec:
+    """標準庫 json；解碼後再驗證"""
+
+    name = 'json'
+
+    def encode(self, data, indent=True):
+        return json.dumps(data, ensure_ascii=False, indent=2 if indent else None, default=to_json).encode('utf-8')
+
+    def loads(self, raw):
+        return json.loads(raw)
+
+    def decode(self, raw, schema=None, skipped=None):
+        data = self.loads(raw)
+        if schema is not None:
+            data = validate(data, schema, skipped)
+        return data
+
+
+class OrjsonCodec(JsonCodec):
+    """orjson：編碼和解碼都比標準庫快，驗證與標準庫相同"""
+
+    name = 'orjson'
+
+    def __init__(self):
+        import orjson
+        self.orjson = orjson
+
+    def encode(self, data, indent=True):
+        # 記錄是 dict 子類別，全文不在 dict 內容中，要交給 to_json 轉換
+        option = self.orjson.OPT_PASSTHROUGH_SUBCLASS | (self.orjson.OPT_INDENT_2 if indent else 0)
+        return self.orjson.dumps(data, default=to_json, option=option)
+
+    def loads(self, raw):
+        return self.orjson.loads(raw)
+
+
+class MsgspecCodec:
+    """msgspec：以 schema 轉成的 TypedDict 類型解碼，解碼時同時驗證"""
+
+    name = 'msgspec'
+
+    def __init__(self):
+        import msgspec
+        self.msgspec = msgspec
+        self.encoder = self.protocol.Encoder(enc_hook=to_json)
+        self._decoders = {}
+
+    @property
+    def protocol(self):
+        return self.msgspec.json
+
+    def encode(self, data, indent=True):
+        # msgspec 直接讀取 dict 內容，不呼叫 enc_hook，記錄要先展開成包含全文的 dict
+        raw = self.encoder.encode(expand_records(data))
+        return self.msgspec.json.format(raw, indent=2) if indent else raw
+
+    def decoder(self, schema):
+        decoder = self._decoders.get(schema)
+        if decoder is None:
+            type_ = msgspec_type(schema) if schema is not None else object
+            decoder = self._decoders[schema] = self.protocol.Decoder(type_)
+        return decoder
+
+    def decode(self, raw, schema=None, skipped=None):
+        try:
+            return self.decoder(schema).decode(raw)
+        except self.msgspec.ValidationError:
+            # 有不符合的項目：不指定類型重新解碼，逐項驗證並跳過不符合的列表項目
+            return validate(self.decoder(None).decode(raw), schema, skipped)
+        except self.msgspec.DecodeError as e:
+            raise SchemaError(f"無法解碼: {e}") from None
+
+
+class MsgspecMsgpackCodec(MsgspecCodec):
+    name = 'msgspec-msgpack'
+
+    @property
+    def protocol(self):
+        return self.msgspec.msgpack
+
+    def encode(self, data, indent=True):
+        return self.encoder.encode(expand_records(data))
+
+
+class MsgpackCodec(JsonCodec):
+    """msgpack 套件：沒有 msgspec 時的 MessagePack 編解碼，解碼後再驗證"""
+
+    name = 'msgpack'
+
+    def __init__(self):
+        import msgpack
+        self.msgpack = msgpack
+
+    def encode(self, data, indent=True):
+        return self.msgpack.packb(data, default=to_json, use_bin_type=True)
+
+    def loads(self, raw):
+        try:
+            return self.msgpack.unpackb(raw, raw=False)
+        except (ValueError, self.msgpack.UnpackException) as e:
+            raise SchemaError(f"無法解碼: {e}") from None
+
+
+def msgspec_type(spec):
+    """把 schema 轉成 msgspec 可以直接解碼的類型"""
+    from typing import Annotated, Any, TypedDict
+
+    import msgspec
+
+    if spec is DATE:
+        return Annotated[str, msgspec.Meta(pattern=DATE_PATTERN)]
+    if spec is dict:
+        return dict[str, Any]
+    if isinstance(spec, ListOf):
+        return list[msgspec_type(spec.item)]
+    if isinstance(spec, MapOf):
+        return dict[str, msgspec_type(spec.value)]
+    if isinstance(spec, Schema):
+        fields = {key: msgspec_type(field_spec) for key, field_spec in spec.fields.items()}
+        return TypedDict(spec.name, fields, total=False)
+    return spec
+
+
+JSON_CODECS = {'msgspec': MsgspecCodec, 'orjson': OrjsonCodec, 'json': JsonCodec}
+MSGPACK_CODECS = {'msgspec': MsgspecMsgpackCodec, 'msgpack': MsgpackCodec}
+
+
+def first_available(codecs, names):
+    for name in names:
+        try:
+            return codecs[name]()
+        except ImportError:
+            continue
+    return None
+
+
+@lru_cache(maxsize=None)
+def json_codec(name=None):
+    """
+    返回 JSON 編解碼器：name 或環境變數 WHITOPIA_CODEC 指定的一個，
+    否則依次嘗試 msgspec、orjson，都沒有安裝時使用標準庫
+    """
+    name = name or os.environ.get(CODEC_ENV)
+    if name:
+        if name not in JSON_CODECS:
+            raise ValueError(f"未知的編解碼器: {name}（可用: {', '.join(JSON_CODECS)}）")
+        return JSON_CODECS[name]()
+    return first_available(JSON_CODECS, ('msgspec', 'orjson')) or JsonCodec()
+
+
+@lru_cache(maxsize=None)
+def msgpack_codec():
+    codec = first_available(MSGPACK_CODECS, ('msgspec', 'msgpack'))
+    if codec is None:
+        raise ImportError("MessagePack 格式需要安裝 msgspec 或 msgpack")
+    return codec
+
+
+def is_msgpack(path):
+    return path.endswith(MSGPACK_SUFFIXES)
+
+
+def codec_for(path):
+    """按副檔名選擇編解碼器：.msgpack 為 MessagePack，其他為 JSON"""
+    return msgpack_codec() if is_msgpack(path) else json_codec()
+
+
+def dump(data, path, indent=True):
+    """
+    保存結果文件，頂層加上 schema_version
+
+    JSON 預設縮排兩格（與以前的輸出相同）；MessagePack 沒有縮排
+    """
+    if isinstance(data, dict) and SCHEMA_VERSION_KEY not in data:
+        data = {SCHEMA_VERSION_KEY: SCHEMA_VERSION, **data}
+    raw = codec_for(path).encode(data, indent=indent)
+    with open(path, 'wb') as f:
+        f.write(raw)
+
+
+def load(path, schema=None, skipped=None):
+    """
+    讀取並按 schema 驗證結果文件；不符合時引發 SchemaError
+
+    列表中不符合 schema 的項目（如 null）被跳過：skipped 為列表時錯誤訊息加入其中，
+    否則在標準錯誤輸出報告
+    """
+    with open(path, 'rb') as f:
+        raw = f.read()
+    errors = []
+    data = codec_for(path).decode(raw, schema, errors)
+    if schema is not None and not isinstance(data, dict):
+        raise SchemaError(f"$: 應為物件（{schema.name}）")
+    check_version(data)
+    if skipped is not None:
+        skipped.extend(errors)
+    elif errors:
+        report_skipped(path, errors)
+    return data
+
+
+def report_skipped(path, errors, limit=5):
+    print(f"⚠️ {path}: 跳過 {len(errors)} 個不符合 schema 的項目", file=sys.stderr)
+    for message in errors[:limit]:
+        print(f"   {message}", file=sys.stderr)
+    if len(errors) > limit:
+        print(f"   ……另外 {len(errors) - limit} 個", file=sys.stderr)
+
+
+def load_news(path, skipped=None):
+    """讀取爬蟲結果（whitopia_news.json 格式）"""
+    return load(path, NEWS_FILE, skipped)
+
+
+def load_analysis(path, skipped=None):
+    """讀取分析結果"""
+    return load(path, ANALYSIS_FILE, skipped)
+
+
+def main(argv=None):
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Whitopia.jp 結果文件驗證及格式轉換")
+    parser.add_argument('input', help="結果文件（.json 或 .msgpack）")
+    parser.add_argument('--kind', choices=('news', 'analysis'), default=None,
+                        help="文件類型（預設按是否有 analysis_time 判斷）")
+    parser.add_argument('--output', help="轉換後的文件（按副檔名選擇 JSON 或 MessagePack）")
+    args = parser.parse_args(argv)
+
+    kind = args.kind
+    if kind is None:
+        data = load(args.input)
+        kind = 'analysis' if isinstance(data, dict) and 'analysis_time' in data else 'news'
+
+    codec = codec_for(args.input)
+    skipped = []
+    start = time.perf_counter()
+    try:
+        data = load(args.input, ANALYSIS_FILE if kind == 'analysis' else NEWS_FILE, skipped)
+    except SchemaError as e:
+        print(f"❌ {args.input} 不符合 schema: {e}")
+        raise SystemExit(1)
+    elapsed = (time.perf_counter() - start) * 1000
+    print(f"✅ {args.input} 符合 {kind} schema 第 {data.get(SCHEMA_VERSION_KEY, 1)} 版"
+          f"（{codec.name}，{elapsed:.1f} ms）")
+    if skipped:
+        print(f"⚠️ 跳過 {len(skipped)} 個不符合 schema 的項目（轉換時不會寫出）:")
+        for message in skipped:
+            print(f"   {message}")
+
+    if args.output:
+        dump(data, args.output)
+        print(f"💾 已轉換為 {args.output}（{os.path.getsize(args.output)} 位元組，"
+              f"原文件 {os.path.getsize(args.input)} 位元組）")
+
+
+if __name__ == "__main__":
+    main()
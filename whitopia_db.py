@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Whitopia.jp 開業歷史資料庫
+把爬蟲的新聞項目及分析出的店鋪記錄寫入本地 SQLite，
+重複爬取時以唯一鍵更新（upsert），統計以索引上的 SQL 聚合計算
+"""
+
+import hashlib
+import sqlite3
+from datetime import datetime
+
+from whitopia_records import date_bounds
+from whitopia_stream import news_item_key
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS news_items (
+    id INTEGER PRIMARY KEY,
+    item_key TEXT NOT NULL UNIQUE,
+    date TEXT NOT NULL DEFAULT '',
+    title TEXT NOT NULL DEFAULT '',
+    content TEXT NOT NULL DEFAULT '',
+    url TEXT NOT NULL DEFAULT '',
+    match_keyword TEXT NOT NULL DEFAULT '',
+    store_related INTEGER NOT NULL DEFAULT 0,
+    first_seen TEXT NOT NULL,
+    last_seen TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_news_items_date ON news_items (date);
+
+CREATE TABLE IF NOT EXISTS store_openings (
+    id INTEGER PRIMARY KEY,
+    opening_key TEXT NOT NULL UNIQUE,
+    store_name TEXT NOT NULL DEFAULT '',
+    prefecture TEXT NOT NULL DEFAULT '',
+    city TEXT NOT NULL DEFAULT '',
+    date TEXT NOT NULL DEFAULT '',
+    match_keyword TEXT NOT NULL DEFAULT '',
+    url TEXT NOT NULL DEFAULT '',
+    full_text TEXT NOT NULL DEFAULT '',
+    first_seen TEXT NOT NULL,
+    last_seen TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_store_openings_date ON store_openings (date);
+CREATE INDEX IF NOT EXISTS idx_store_openings_prefecture ON store_openings (prefecture, date);
+CREATE INDEX IF NOT EXISTS idx_store_openings_store_name ON store_openings (store_name);
+'''
+
+# 舊版資料庫缺少的欄位：(資料表, 欄位, 欄位定義)，開啟時以 ALTER TABLE 補上
+MIGRATIONS = (
+    ('store_openings', 'city', "TEXT NOT NULL DEFAULT ''"),
+)
+
+# 依賴遷移後欄位的索引（須在遷移之後建立）
+MIGRATED_INDEXES = '''
+CREATE INDEX IF NOT EXISTS idx_store_openings_city ON store_openings (prefecture, city);
+'''
+
+
+def opening_key(store):
+    """店鋪記錄的唯一鍵：店名 + 開業日期；沒有店名時使用原文的雜湊"""
+    if store.get('store_name'):
+        return f"{store['store_name']}|{store.get('date', '')}"
+    text = store.get('full_text') or store.get('raw_content', '')
+    return 'text:' + hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+class WhitopiaDB:
+    """店鋪開業歷史的 SQLite 資料庫"""
+
+    def __init__(self, db_file='whitopia.db'):
+        self.db_file = db_file
+        self.conn = sqlite3.connect(db_file)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.executescript(SCHEMA)
+        self.migrate()
+
+    def migrate(self):
+        """為舊版建立的資料庫補上新增的欄位（已有資料的欄位值為預設值）"""
+        with self.conn:
+            for table, column, definition in MIGRATIONS:
+                columns = {row['name'] for row in self.conn.execute(f'PRAGMA table_info({table})')}
+                if column not in columns:
+                    self.conn.execute(f'ALTER TABLE {table} ADD COLUMN {column} {definition}')
+        self.conn.executescript(MIGRATED_INDEXES)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def upsert_news_items(self, news_items, seen_time=None):
+        """寫入新聞項目；已存在的項目只更新內容和最後出現時間"""
+        seen_time = seen_time or datetime.now().isoformat()
+        rows = [
+            (news_item_key(item), item.get('date', ''), item.get('title', ''),
+             item.get('content', ''), item.get('url', ''), item.get('match_keyword', ''),
+             1 if item.get('match_keyword') or item.get('store_related') else 0,
+             seen_time, seen_time)
+            for item in news_items if item
+        ]
+        with self.conn:
+            self.conn.executemany('''
+                INSERT INTO news_items (item_key, date, title, content, url, match_keyword,
+                                        store_related, first_seen, last_seen)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (item_key) DO UPDATE SET
+                    content = excluded.content,
+                    match_keyword = excluded.match_keyword,
+                    store_related = excluded.store_related,
+                    last_seen = excluded.last_seen
+            ''', rows)
+        return len(rows)
+
+    def upsert_store_openings(self, store_openings, seen_time=None):
+        """寫入店鋪記錄；同一店鋪同一開業日期只保留一筆"""
+        seen_time = seen_time or datetime.now().isoformat()
+        rows = [
+            (opening_key(store), store.get('store_name', ''), store.get('prefecture', ''),
+             store.get('city') or store.get('location', ''),
+             store.get('date', ''), store.get('match_keyword', ''), store.get('url', ''),
+             store.get('full_text') or store.get('raw_content', ''), seen_time, seen_time)
+            for store in store_openings
+        ]
+        with self.conn:
+            self.conn.executemany('''
+                INSERT INTO store_openings (opening_key, store_name, prefecture, city, date,
+                                            match_keyword, url, full_text, first_seen, last_seen)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (opening_key) DO UPDATE SET
+                    prefecture = CASE WHEN excluded.prefecture != '' THEN excluded.prefecture ELSE prefecture END,
+                    city = CASE WHEN excluded.city != '' THEN excluded.city ELSE city END,
+                    match_keyword = excluded.match_keyword,
+                    url = excluded.url,
+                    full_text = excluded.full_text,
+                    last_seen = excluded.last_seen
+            ''', rows)
+        return len(rows)
+
+    def monthly_stats(self):
+        """按月份統計開業數量"""
+        rows = self.conn.execute('''
+            SELECT substr(date, 1, 7) AS month, COUNT(*) AS count
+            FROM store_openings
+            WHERE date != ''
+            GROUP BY month
+            ORDER BY month DESC
+        ''')
+        return {row['month']: row['count'] for row in rows}
+
+    def prefecture_stats(self):
+        """按都道府縣統計開業數量"""
+        rows = self.conn.execute('''
+            SELECT prefecture, COUNT(*) AS count
+            FROM store_openings
+            WHERE prefecture != ''
+            GROUP BY prefecture
+            ORDER BY count DESC
+        ''')
+        return {row['prefecture']: row['count'] for row in rows}
+
+    def count_identified(self):
+        """已識別店名的店鋪數量"""
+        return self.conn.execute("SELECT COUNT(*) FROM store_openings WHERE store_name != ''").fetchone()[0]
+
+    def query_openings(self, prefecture=None, since=None, until=None, store_name=None, limit=None, city=None):
+        """
+        按條件查詢店鋪記錄（最新的在前）
+
+        since / until 為 YYYY-MM 或 YYYY-MM-DD，包含兩端
+        """
+        conditions = []
+        params = []
+        if prefecture:
+            conditions.append('prefecture = ?')
+            params.append(prefecture)
+        if city:
+            conditions.append('city = ?')
+            params.append(city)
+        if store_name:
+            conditions.append('store_name = ?')
+            params.append(store_name)
+        low, high = date_bounds(since, until)
+        if low:
+            conditions.append('date >= ?')
+            params.append(low)
+        if high:
+            conditions.append('date <= ?')
+            params.append(high)
+
+        sql = 'SELECT store_name, prefecture, city, date, match_keyword, url FROM store_openings'
+        if conditions:
+            sql += ' WHERE ' + ' AND '.join(conditions)
+        sql += ' ORDER BY date DESC'
+        if limit:
+            sql += ' LIMIT ?'
+            params.append(limit)
+        return [dict(row) for row in self.conn.execute(sql, params)]
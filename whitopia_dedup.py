@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Whitopia.jp 新聞項目去重
+日期文字行備用解析產生的項目常帶有上一則公告的片段，同一則開業公告在不同快照中
+也會以略有不同的文字重複出現。本模組以三層檢查把它們合併成一筆：
+1. 去除前綴片段後的規範文字完全相同（雜湊）
+2. 相同的店名 + 開業日期
+3. SimHash 近似重複（以分段索引查找候選，每個項目只比較少數候選）
+店名和日期來自呼叫者已有（或已快取）的提取結果，索引本身不做提取
+"""
+
+import hashlib
+import re
+
+DATE_IN_TEXT_PATTERN = re.compile(r'(\d{4})[年/.-](\d{1,2})[月/.-](\d{1,2})日?')
+WHITESPACE_PATTERN = re.compile(r'\s+')
+
+SIMHASH_BITS = 64
+SHINGLE_SIZE = 3
+
+
+def trim_leading_fragment(text, date):
+    """從項目自身的日期開始截取，去掉混入的上一則公告片段"""
+    if date:
+        for match in DATE_IN_TEXT_PATTERN.finditer(text):
+            year, month, day = match.groups()
+            if f"{year}-{month.zfill(2)}-{day.zfill(2)}" == date:
+                return text[match.start():]
+    return text
+
+
+def canonical_text(item):
+    """項目的規範文字：去掉前綴片段並移除空白"""
+    text = trim_leading_fragment(item.get('content') or item.get('title', ''), item.get('date'))
+    return WHITESPACE_PATTERN.sub('', text)
+
+
+def simhash(text, shingle_size=SHINGLE_SIZE):
+    """以字元 n-gram 計算 64 位 SimHash"""
+    if len(text) <= shingle_size:
+        shingles = [text]
+    else:
+        shingles = [text[i:i + shingle_size] for i in range(len(text) - shingle_size + 1)]
+
+    # 把每個 n-gram 的雜湊轉成 64 個字元的位元字串，按列統計 1 的數量
+    bit_strings = [
+        format(int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest(), 'big'), '064b')
+        for shingle in shingles
+    ]
+    half = len(bit_strings) / 2
+    value = 0
+    for column in zip(*bit_strings):
+        value = (value << 1) | (column.count('1') > half)
+    return value
+
+
+def hamming_distance(a, b):
+    return bin(a ^ b).count('1')
+
+
+class NearDuplicateIndex:
+    """
+    新聞項目去重索引
+
+    SimHash 分成 bands 段，任一段完全相同的項目才作為候選再計算漢明距離；
+    max_distance < bands 時可保證找到所有距離不超過 max_distance 的項目。
+    只保存每則公告的文字雜湊、SimHash 及店名/日期，不保存項目本身
+    """
+
+    def __init__(self, max_distance=3, bands=4):
+        if max_distance >= bands:
+            raise ValueError("max_distance 必須小於 bands")
+        self.max_distance = max_distance
+        self.bands = bands
+        self.band_bits = SIMHASH_BITS // bands
+        self.band_mask = (1 << self.band_bits) - 1
+        self.exact = set()
+        self.openings = set()
+        self.band_tables = [{} for _ in range(bands)]
+        self.duplicates = 0
+
+    def _band_values(self, value):
+        return [(value >> (i * self.band_bits)) & self.band_mask for i in range(self.bands)]
+
+    def _compatible(self, entry, opening):
+        """已識別出的店名和日期不同時，即使文字相似也不是同一則公告"""
+        for known, value in zip(entry[1:], opening):
+            if known and value and known != value:
+                return False
+        return True
+
+    def _find(self, text, digest, opening):
+        """是否為已知公告的重複；返回 (是否重複, SimHash)，SimHash 只在需要時計算"""
+        if digest in self.exact:
+            return True, None
+
+        if all(opening) and opening in self.openings:
+            return True, None
+
+        value = simhash(text)
+        for table, band in zip(self.band_tables, self._band_values(value)):
+            for entry in table.get(band, ()):
+                if hamming_distance(entry[0], value) <= self.max_distance and self._compatible(entry, opening):
+                    return True, value
+        return False, value
+
+    def add(self, item, fields=None):
+        """
+        加入一個項目；是新公告則返回 True，是重複則返回 False
+
+        只有指紋（文字雜湊及 SimHash）使用去掉前綴片段的規範文字，項目本身不會被修改
+
+        fields 為該項目的提取結果（只使用 store_name 及 date），用於合併同一開業公告，
+        並避免把店名或日期不同的相似公告誤判為重複；省略時只比較文字
+        """
+        text = canonical_text(item)
+        digest = hashlib.sha1(text.encode('utf-8')).digest()
+        opening = (fields.get('store_name', ''), fields.get('date', '')) if fields else ('', '')
+
+        duplicate, value = self._find(text, digest, opening)
+        self.exact.add(digest)
+        if duplicate:
+            self.duplicates += 1
+            return False
+
+        if all(opening):
+            self.openings.add(opening)
+        entry = (value,) + opening
+        for table, band in zip(self.band_tables, self._band_values(value)):
+            table.setdefault(band, []).append(entry)
+        return True
+
+
+def dedupe_records(news_items, extract, index=None):
+    """
+    逐項提取並去重，返回每則公告的提取結果（生成器）
+
+    extract 為 項目 → 記錄 的函數（如 extract_record 或提取快取的 extract），
+    每個項目只提取一次，提取結果同時用於判斷重複；提取使用原始項目，記錄的全文保持不變
+    """
+    index = index or NearDuplicateIndex()
+    for item in news_items:
+        if not item:
+            continue
+        record = extract(item)
+        if index.add(item, record):
+            yield record
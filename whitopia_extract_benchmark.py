@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+提取引擎微基準測試
+比較舊的逐個模式搜尋與 whitopia_extract 的處理速度（項目/秒）
+"""
+
+import argparse
+import random
+import re
+import time
+
+from whitopia_extract import STORE_KEYWORD_AUTOMATON, extract_record, extract_store_info
+
+LEGACY_KEYWORDS = [
+    '開店', '開業', 'オープン', 'OPEN', 'open', '新店',
+    '店舗', '出店', '開設', 'グランドオープン', 'プレオープン',
+    '新規', '新しい', '開始', 'スタート'
+]
+
+STORES = [('美野島', '福岡県'), ('高松伏石', '香川県'), ('高松鶴市', '香川県'),
+          ('丸亀', '香川県'), ('徳島', '徳島県'), ('松山', '愛媛県')]
+
+OTHER_NEWS = [
+    '年末年始の営業時間についてご案内いたします。平素より格別のご高配を賜り誠にありがとうございます。',
+    '台風接近に伴う臨時休業のお知らせ。ご不便をおかけしますが何卒ご了承ください。',
+    'ホームページをリニューアルしました。今後ともよろしくお願いいたします。',
+]
+
+
+def legacy_filter(news_items):
+    """舊版 filter_store_opening_news"""
+    store_news = []
+    for item in news_items:
+        text = (item.get('title', '') + ' ' + item.get('content', '')).lower()
+        for keyword in LEGACY_KEYWORDS:
+            if keyword.lower() in text:
+                item['match_keyword'] = keyword
+                store_news.append(item)
+                break
+    return store_news
+
+
+def legacy_extract_store_info(text):
+    """舊版 ImprovedWhitopiaAnalyzer.extract_store_info"""
+    store_info = {'store_name': '', 'prefecture': '', 'date': '', 'full_text': text}
+    clean_text = re.sub(r'\s+', '', text)
+
+    store_name_patterns = [
+        r'「(ホワイトピア[^」]+店)」',
+        r'(ホワイトピア[^が]+店)が',
+        r'(ホワイトピア[^！]+店)！',
+        r'(ホワイトピア\w+店)'
+    ]
+    for pattern in store_name_patterns:
+        match = re.search(pattern, clean_text)
+        if match:
+            store_info['store_name'] = match.group(1)
+            break
+
+    prefecture_patterns = [
+        r'新たに([^県]+県)に',
+        r'([^県]+県)にOPEN',
+        r'が新たに([^県]+県)',
+        r'「[^」]+」が新たに([^県]+県)'
+    ]
+    for pattern in prefecture_patterns:
+        match = re.search(pattern, clean_text)
+        if match:
+            store_info['prefecture'] = match.group(1)
+            break
+
+    date_patterns = [
+        r'(\d{4}-\d{2}-\d{2})',
+        r'(\d{4})年(\d{1,2})月(\d{1,2})日',
+        r'(\d{4})/(\d{1,2})/(\d{1,2})'
+    ]
+    for pattern in date_patterns:
+        match = re.search(pattern, text)
+        if match:
+            if len(match.groups()) == 1:
+                store_info['date'] = match.group(1)
+            else:
+                year, month, day = match.groups()
+                store_info['date'] = f"{year}-{month.zfill(2)}-{day.zfill(2)}"
+            break
+
+    return store_info
+
+
+def legacy_pipeline(news_items):
+    """舊版：過濾後逐項提取（同樣列出所有匹配的關鍵詞，輸出欄位才與新版相當）"""
+    records = []
+    for item in legacy_filter(news_items):
+        text = item.get('content', '') + ' ' + item.get('title', '')
+        record = legacy_extract_store_info(text)
+        if not record['date'] and item.get('date'):
+            record['date'] = item['date']
+        lowered = text.lower()
+        record['match_keywords'] = [keyword for keyword in LEGACY_KEYWORDS if keyword.lower() in lowered]
+        records.append(record)
+    return records
+
+
+def new_filter(news_items):
+    store_news = []
+    for item in news_items:
+        keyword = STORE_KEYWORD_AUTOMATON.first(item.get('title', '') + ' ' + item.get('content', ''))
+        if keyword:
+            item['match_keyword'] = keyword
+            store_news.append(item)
+    return store_news
+
+
+def new_extract(news_items):
+    return [extract_store_info(item.get('content', '') + ' ' + item.get('title', '')) for item in news_items]
+
+
+def legacy_extract(news_items):
+    return [legacy_extract_store_info(item.get('content', '') + ' ' + item.get('title', '')) for item in news_items]
+
+
+def new_pipeline(news_items):
+    return [extract_record(item) for item in new_filter(news_items)]
+
+
+def make_items(count, store_ratio=0.5, seed=0):
+    """產生模擬的新聞項目"""
+    rng = random.Random(seed)
+    items = []
+    for i in range(count):
+        date = f"2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"
+        if rng.random() < store_ratio:
+            name, prefecture = rng.choice(STORES)
+            text = (f"詳細はこちらから→ホワイトピア{rng.choice(STORES)[0]}店{date}"
+                    f"ホワイトピア{name}店がOPEN！「ホワイトピア{name}店」が新たに{prefecture}にOPENしました！")
+        else:
+            text = f"{date}{rng.choice(OTHER_NEWS)}"
+        items.append({'date': date, 'title': text, 'content': text, 'url': 'https://www.whitopia.jp'})
+    return items
+
+
+def measure(funcs, items, repeat):
+    """
+    返回每個函數最佳一次的處理速度（項目/秒）
+
+    各函數輪流執行，避免機器負載的變化只影響其中一方
+    """
+    best = [float('inf')] * len(funcs)
+    for _ in range(repeat):
+        for index, func in enumerate(funcs):
+            batch = [dict(item) for item in items]
+            start = time.perf_counter()
+            func(batch)
+            best[index] = min(best[index], time.perf_counter() - start)
+    return [len(items) / elapsed for elapsed in best]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="提取引擎微基準測試")
+    parser.add_argument('--items', type=int, default=20000, help="模擬項目數量")
+    parser.add_argument('--repeat', type=int, default=10, help="重複次數（取最佳）")
+    parser.add_argument('--store-ratio', type=float, default=0.5, help="店鋪開業新聞所佔比例")
+    args = parser.parse_args()
+
+    items = make_items(args.items, args.store_ratio)
+    store_items = legacy_filter([dict(item) for item in items])
+
+    # 確認新舊結果一致
+    assert [i['match_keyword'] for i in new_filter([dict(i) for i in items])] == \
+        [i['match_keyword'] for i in store_items]
+    assert [record['match_keywords'] for record in new_pipeline([dict(i) for i in items])] == \
+        [record['match_keywords'] for record in legacy_pipeline([dict(i) for i in items])]
+    # 新版另外提取市區町村，只比較舊版也有的欄位
+    assert [{key: record[key] for key in legacy} for record, legacy in
+            zip(new_extract(store_items), legacy_extract(store_items))] == legacy_extract(store_items)
+
+    print(f"項目數量: {len(items)}（店鋪相關 {len(store_items)}）")
+    print(f"{'階段':<12}{'舊版 (項目/秒)':>16}{'新版 (項目/秒)':>16}{'倍數':>8}")
+    for name, old, new, data in [
+        ('關鍵詞過濾', legacy_filter, new_filter, items),
+        ('店鋪信息提取', legacy_extract, new_extract, store_items),
+        ('過濾+提取', legacy_pipeline, new_pipeline, items),
+    ]:
+        old_rate, new_rate = measure((old, new), data, args.repeat)
+        print(f"{name:<12}{old_rate:>16,.0f}{new_rate:>16,.0f}{new_rate / old_rate:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
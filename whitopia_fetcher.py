@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Whitopia.jp 並發抓取引擎
+以執行緒池批量抓取詳細頁面，支援並發上限與每個主機的請求速率限制
+"""
+
+import threading
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+
+
+class HostRateLimiter:
+    """每個主機的請求速率限制（每秒最多 rate 個請求）"""
+
+    def __init__(self, rate_per_host=2.0):
+        self.min_interval = 1.0 / rate_per_host if rate_per_host else 0.0
+        self._next_slot = {}
+        self._lock = threading.Lock()
+
+    def wait(self, url):
+        """等待直到該主機可以發出下一個請求"""
+        if not self.min_interval:
+            return
+        host = urllib.parse.urlsplit(url).netloc
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self.min_interval
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
+
+
+class ConcurrentFetcher:
+    """以執行緒池並發執行抓取函數，結果按輸入順序返回"""
+
+    def __init__(self, fetch_func, max_workers=8):
+        self.fetch_func = fetch_func
+        self.max_workers = max(1, max_workers)
+
+    def fetch_all(self, urls):
+        """並發抓取所有 URL，返回與輸入順序一致的結果列表"""
+        urls = list(urls)
+        if not urls:
+            return []
+
+        # 相同的 URL 只抓取一次
+        unique_urls = list(dict.fromkeys(urls))
+        workers = min(self.max_workers, len(unique_urls))
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = dict(zip(unique_urls, executor.map(self.fetch_func, unique_urls)))
+
+        return [results[url] for url in urls]
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Whitopia.jp HTTP 回應錄製
+把爬蟲實際收到的回應（狀態碼、驗證標頭及內容）按 URL 路徑保存到錄製目錄，
+之後由本地替身伺服器（whitopia_standin.py）重播，不需連接真實網站即可測試爬蟲
+"""
+
+import hashlib
+import json
+import os
+import threading
+from urllib.parse import urlsplit
+
+from whitopia_cache import tee_content
+
+# 錄製時保存的回應標頭
+RECORDED_HEADERS = ('Content-Type', 'ETag', 'Last-Modified', 'Retry-After', 'Location')
+
+
+def fixture_key(url):
+    """錄製項目的鍵：路徑加查詢字串（不含主機，重播時主機不同）"""
+    parts = urlsplit(url)
+    path = parts.path or '/'
+    return path + ('?' + parts.query if parts.query else '')
+
+
+class FixtureArchive:
+    """錄製目錄：index.json 記錄每個路徑的回應信息，內容另存為 .body 文件"""
+
+    def __init__(self, fixture_dir):
+        self.fixture_dir = fixture_dir
+        self.index_file = os.path.join(fixture_dir, 'index.json')
+        self._lock = threading.Lock()
+        os.makedirs(fixture_dir, exist_ok=True)
+        try:
+            with open(self.index_file, 'r', encoding='utf-8') as f:
+                self.index = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.index = {}
+
+    def _save_index(self):
+        tmp_file = self.index_file + '.tmp'
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(self.index, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_file, self.index_file)
+
+    def record(self, url, status, headers, content):
+        """保存一個回應（同一路徑再次錄製時覆蓋）"""
+        key = fixture_key(url)
+        body_file = hashlib.sha1(key.encode('utf-8')).hexdigest() + '.body'
+        with self._lock:
+            with open(os.path.join(self.fixture_dir, body_file), 'wb') as f:
+                f.write(content)
+            self.index[key] = {
+                'url': url,
+                'status': status,
+                'headers': {name: headers[name] for name in RECORDED_HEADERS if headers.get(name)},
+                'body': body_file,
+                'size': len(content)
+            }
+            self._save_index()
+
+    def lookup(self, path):
+        """返回 (錄製信息, 內容位元組)；沒有錄製時返回 (None, None)"""
+        entry = self.index.get(path)
+        if entry is None and path.endswith('/') and len(path) > 1:
+            entry = self.index.get(path.rstrip('/'))
+        elif entry is None:
+            entry = self.index.get(path + '/')
+        if entry is None:
+            return None, None
+        with open(os.path.join(self.fixture_dir, entry['body']), 'rb') as f:
+            return entry, f.read()
+
+    def __len__(self):
+        return len(self.index)
+
+
+class FixtureRecorder:
+    """
+    以 requests 的 response hook 錄製 session 收到的每個回應
+
+    304 回應沒有內容，不錄製；錄製時應停用回應快取，否則未變更的頁面不會被錄下。
+    串流請求的成功回應不在 hook 中讀取內容，呼叫者以 iter_content() 完整讀取後才錄製
+    （提早停止讀取的頁面不錄製）
+    """
+
+    def __init__(self, archive):
+        self.archive = archive
+
+    def attach(self, session):
+        session.hooks.setdefault('response', []).append(self.hook)
+
+    def hook(self, response, *args, **kwargs):
+        if response.status_code == 304:
+            return response
+        # 重定向的每一步都會經過 hook，連同 Location 一起錄製，重播時同樣重定向
+        url = response.url
+        if kwargs.get('stream') and response.ok and not response.is_redirect:
+            self.record_when_read(response)
+        else:
+            # 讀取 content 後 requests 仍可以 iter_content() 分塊返回同一內容
+            self.archive.record(url, response.status_code, response.headers, response.content)
+        return response
+
+    def record_when_read(self, response):
+        """讓 response.iter_content() 在內容完整讀取後才錄製"""
+        iter_content = response.iter_content
+
+        def record(content):
+            self.archive.record(response.url, response.status_code, response.headers, content)
+
+        def recording_iter_content(chunk_size=1, decode_unicode=False):
+            chunks = iter_content(chunk_size, decode_unicode)
+            return chunks if decode_unicode else tee_content(chunks, [record])
+
+        response.iter_content = recording_iter_content
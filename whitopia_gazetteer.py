@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Whitopia.jp 地名辭典
+從隨附的 CSV 載入 47 個都道府縣及全部市區町村，也可再載入其他 CSV 補充地名。
+一次掃描文字即可找出都道府縣和市區町村，
+並以地名詞幹的字典樹把「高松伏石店」等店名對應到所在城市
+"""
+
+import os
+import re
+from functools import lru_cache
+
+# 全部市區町村（1741 個，由日本郵便的郵便番号データ整理：政令指定都市的區合併為所屬的市，
+# 町村去掉所屬的郡）
+MUNICIPALITIES_CSV = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'whitopia_municipalities.csv')
+
+# 店名中常見、但不是市區町村名的地名（地名: 都道府縣 市區町村）
+AREA_ALIASES = '''
+美野島: 福岡県 福岡市
+博多: 福岡県 福岡市
+天神: 福岡県 福岡市
+梅田: 大阪府 大阪市
+難波: 大阪府 大阪市
+'''
+
+# 店名對應城市時使用的地名詞幹的最短長度（避免「津」等單字誤配）
+MIN_STEM_LENGTH = 2
+
+# store_city 記住的店名數量上限
+MAX_STORE_CITIES = 4096
+
+MUNICIPALITY_SUFFIXES = ('市', '区', '町', '村')
+
+# 所有都道府縣及市區町村名稱的最後一個字
+NAME_END_PATTERN = re.compile('[都道府県市区町村]')
+
+
+def build_trie_pattern(words, ignore_ascii_case=False):
+    """
+    把詞語建成字典樹再轉成正則表達式（同一位置優先匹配最長的詞）
+
+    ignore_ascii_case=True 時英文字母不區分大小寫（詞語須為小寫），不需要先把文字轉成小寫
+    """
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = True
+    return compile_trie(trie, ignore_ascii_case) or r'(?!)'
+
+
+def compile_trie(node, ignore_ascii_case=False, depth=0):
+    branches = []
+    for char, child in sorted(node.items()):
+        if not char:
+            continue
+        rest = compile_trie(child, ignore_ascii_case, depth + 1)
+        if ignore_ascii_case and char.isascii() and char.isalpha():
+            if depth == 0:
+                # 第一個字元保持為字面字元，正則引擎才能按開頭字元快速跳過不可能匹配的位置
+                branches.append(re.escape(char) + rest)
+                branches.append(re.escape(char.upper()) + rest)
+            else:
+                branches.append(f'[{char}{char.upper()}]' + rest)
+        else:
+            branches.append(re.escape(char) + rest)
+    if not branches:
+        return ''
+    body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+    return '(?:' + body + ')?' if '' in node else body
+
+
+def municipality_stem(city):
+    """去掉市區町村後綴的詞幹（高松市 → 高松）"""
+    if city.endswith(MUNICIPALITY_SUFFIXES) and len(city) > 1:
+        return city[:-1]
+    return city
+
+
+class Gazetteer:
+    """
+    地名辭典
+
+    prefectures: 都道府縣集合；cities: 市區町村 → 所在都道府縣列表（同名城市可能在多個都道府縣）；
+    aliases: 地名 → [(都道府縣, 市區町村)]
+    """
+
+    def __init__(self):
+        self.prefectures = set()
+        self.cities = {}
+        self.aliases = {}
+        self._names = None
+        self._stem_pattern = None
+
+    def add_city(self, prefecture, city):
+        self.prefectures.add(prefecture)
+        if city:
+            prefectures = self.cities.setdefault(city, [])
+            if prefecture not in prefectures:
+                prefectures.append(prefecture)
+        self._names = self._stem_pattern = None
+
+    def add_alias(self, alias, prefecture, city):
+        targets = self.aliases.setdefault(alias, [])
+        if (prefecture, city) not in targets:
+            targets.append((prefecture, city))
+        self._names = self._stem_pattern = None
+
+    def load_text(self, text):
+        """載入「都道府縣: 市區町村 ...」格式的列表"""
+        for line in text.strip().splitlines():
+            prefecture, _, cities = line.partition(':')
+            prefecture = prefecture.strip()
+            self.prefectures.add(prefecture)
+            for city in cities.split():
+                self.add_city(prefecture, city)
+
+    def load_aliases(self, text):
+        for line in text.strip().splitlines():
+            alias, _, target = line.partition(':')
+            prefecture, city = target.split()
+            self.add_alias(alias.strip(), prefecture, city)
+
+    def load_csv(self, path):
+        """
+        從 CSV 載入市區町村：每行為 都道府縣,市區町村[,別名]（可有標頭行）
+        """
+        import csv
+
+        with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+            for row in csv.reader(f):
+                if len(row) < 2 or not row[0].strip().endswith(('都', '道', '府', '県')):
+                    continue
+                prefecture, city = row[0].strip(), row[1].strip()
+                self.add_city(prefecture, city)
+                if len(row) > 2 and row[2].strip():
+                    self.add_alias(row[2].strip(), prefecture, city)
+
+    def version(self):
+        """辭典內容的雜湊（辭典改變時使快取的提取結果失效）"""
+        import hashlib
+
+        digest = hashlib.sha1()
+        for prefecture in sorted(self.prefectures):
+            digest.update(prefecture.encode('utf-8') + b'\x00')
+        for city in sorted(self.cities):
+            digest.update((city + ':' + ','.join(self.cities[city])).encode('utf-8') + b'\x00')
+        for alias in sorted(self.aliases):
+            digest.update((alias + ':' + repr(self.aliases[alias])).encode('utf-8') + b'\x00')
+        return digest.hexdigest()[:16]
+
+    def _compile(self):
+        self._names = self.prefectures | set(self.cities)
+        # 按最後一個字分組的地名長度（由長到短），每個結尾字只嘗試可能的長度
+        end_lengths = {}
+        for name in self._names:
+            end_lengths.setdefault(name[-1], set()).add(len(name))
+        self._end_lengths = {end: sorted(lengths, reverse=True) for end, lengths in end_lengths.items()}
+        prefecture_lengths = {}
+        for prefecture in self.prefectures:
+            prefecture_lengths.setdefault(prefecture[-1], set()).add(len(prefecture))
+        self._prefecture_lengths = [(end, sorted(lengths, reverse=True))
+                                    for end, lengths in prefecture_lengths.items()]
+        self._store_cities = {}
+        self._stems = {}
+        for city, prefectures in self.cities.items():
+            stem = municipality_stem(city)
+            if len(stem) >= MIN_STEM_LENGTH:
+                for prefecture in prefectures:
+                    self._stems.setdefault(stem, []).append((prefecture, city))
+        for alias, targets in self.aliases.items():
+            self._stems.setdefault(alias, []).extend(targets)
+        self._stem_pattern = re.compile(build_trie_pattern(self._stems))
+
+    def mentions(self, text):
+        """
+        一次掃描文字，返回 [(位置, 地名)]
+
+        地名都以「都道府県市区町村」之一結尾，只在這些字的位置向前查找最長的地名，
+        比在每個位置嘗試全部地名的正則快得多；與前一個地名重疊的不計
+        """
+        if self._names is None:
+            self._compile()
+        names = self._names
+        end_lengths = self._end_lengths
+        found = []
+        last_end = 0
+        for match in NAME_END_PATTERN.finditer(text):
+            end = match.end()
+            for length in end_lengths.get(match.group(), ()):
+                start = end - length
+                if start >= last_end and text[start:end] in names:
+                    found.append((start, text[start:end]))
+                    last_end = end
+                    break
+        return found
+
+    def prefecture_mentions(self, text):
+        """
+        只找出文字中的都道府縣，返回 [(位置, 都道府縣)]
+
+        都道府縣只有「都道府県」四種結尾字，以 str.find 逐個結尾字查找，比掃描全部地名快
+        """
+        if self._names is None:
+            self._compile()
+        prefectures = self.prefectures
+        found = []
+        find = text.find
+        for end_char, lengths in self._prefecture_lengths:
+            position = find(end_char)
+            while position >= 0:
+                end = position + 1
+                for length in lengths:
+                    start = end - length
+                    if start >= 0 and text[start:end] in prefectures:
+                        found.append((start, text[start:end]))
+                        break
+                position = find(end_char, end)
+        found.sort()
+        return found
+
+    def store_city(self, store_name, prefecture=''):
+        """
+        從店名找出所在城市（如 ホワイトピア高松伏石店 → 香川県 高松市）
+
+        同名地名在多個都道府縣時，以已知的都道府縣決定；無法決定時返回 None。
+        店名重複出現的次數很多，結果按 (店名, 都道府縣) 記住
+        """
+        if not store_name:
+            return None
+        if self._names is None:
+            self._compile()
+        key = (store_name, prefecture)
+        if key in self._store_cities:
+            return self._store_cities[key]
+        found = None
+        for match in self._stem_pattern.finditer(store_name):
+            candidates = self._stems[match.group()]
+            if prefecture:
+                candidates = [candidate for candidate in candidates if candidate[0] == prefecture]
+            if len(candidates) == 1:
+                found = candidates[0]
+                break
+        if len(self._store_cities) >= MAX_STORE_CITIES:
+            self._store_cities.clear()
+        self._store_cities[key] = found
+        return found
+
+    def resolve(self, text, store_name='', anchor=0):
+        """
+        找出文字中的都道府縣和市區町村，返回 {'prefecture': ..., 'city': ...}
+
+        文字中可能混有其他公告的片段，優先使用 anchor（店名出現的位置）之後的地名；
+        城市優先由店名決定，其次為文字中的地名；沒有提到都道府縣時由城市推斷。
+        多數店名已能決定城市，只在店名無法決定時才掃描文字中的市區町村
+        """
+        prefecture_mentions = self.prefecture_mentions(text)
+
+        prefecture = ''
+        after_anchor = [name for position, name in prefecture_mentions if position >= anchor]
+        if after_anchor:
+            prefecture = after_anchor[0]
+        elif prefecture_mentions:
+            prefecture = prefecture_mentions[0][1]
+
+        city = ''
+        found = self.store_city(store_name, prefecture)
+        if found is None:
+            city_mentions = [(position, name) for position, name in self.mentions(text)
+                             if name not in self.prefectures]
+            city_mentions.sort(key=lambda mention: mention[0] < anchor)
+            for position, name in city_mentions:
+                candidates = [(city_prefecture, name) for city_prefecture in self.cities[name]]
+                if prefecture:
+                    candidates = [candidate for candidate in candidates if candidate[0] == prefecture]
+                if len(candidates) == 1:
+                    found = candidates[0]
+                    break
+        if found is not None:
+            city = found[1]
+            prefecture = prefecture or found[0]
+
+        return {'prefecture': prefecture, 'city': city}
+
+
+def default_gazetteer():
+    gazetteer = Gazetteer()
+    gazetteer.load_csv(MUNICIPALITIES_CSV)
+    gazetteer.load_aliases(AREA_ALIASES)
+    return gazetteer
+
+
+@lru_cache(maxsize=None)
+def shared_gazetteer():
+    """
+    共用的預設地名辭典：第一次使用時才載入 CSV，之後都返回同一個實例
+
+    匯入模組時不載入，不需要地名的子命令不必付出解析 CSV 的時間
+    """
+    return default_gazetteer()
+
+
+def __getattr__(name):
+    # 相容舊的 DEFAULT_GAZETTEER 常數：讀取時才載入
+    if name == 'DEFAULT_GAZETTEER':
+        return shared_gazetteer()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Whitopia.jp 增量 HTML 文字提取
+把分塊讀取的回應內容逐塊送入增量 HTML 解析器，跳過 script/style 的內容，
+每個區塊元素（段落、列表項目、標題等）結束時即輸出其文字，不建立完整的文件樹。
+讀取的位元組數有上限，並可在已找到需要的信息（如店名和開業日期）時提早停止
+"""
+
+import codecs
+from html.parser import HTMLParser
+
+from whitopia_extract import STORE_NAME_PATTERNS, WHITESPACE_PATTERN, extract_date, first_match
+
+# 詳細頁面最多讀取的位元組數
+DEFAULT_MAX_BYTES = 2 * 1024 * 1024
+
+CHUNK_SIZE = 16 * 1024
+
+# 內容不輸出的元素
+SKIP_TAGS = frozenset(('script', 'style', 'noscript', 'template', 'svg'))
+
+# 開始或結束時結束當前文字區塊的元素
+BLOCK_TAGS = frozenset((
+    'address', 'article', 'aside', 'blockquote', 'br', 'dd', 'div', 'dl', 'dt', 'figcaption', 'figure',
+    'footer', 'form', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'header', 'hr', 'li', 'main', 'nav', 'ol',
+    'p', 'pre', 'section', 'table', 'td', 'th', 'tr', 'ul', 'body', 'html', 'title'
+))
+
+
+class TextBlockParser(HTMLParser):
+    """增量 HTML 解析器：收集區塊元素的文字，完成的區塊放入 self.blocks"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.blocks = []
+        self._parts = []
+        self._skip_depth = 0
+
+    def _flush(self):
+        if self._parts:
+            text = ' '.join(''.join(self._parts).split())
+            self._parts = []
+            if text:
+                self.blocks.append(text)
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIP_TAGS:
+            self._skip_depth += 1
+        elif tag in BLOCK_TAGS:
+            self._flush()
+
+    def handle_startendtag(self, tag, attrs):
+        if tag in BLOCK_TAGS:
+            self._flush()
+
+    def handle_endtag(self, tag):
+        if tag in SKIP_TAGS:
+            self._skip_depth = max(0, self._skip_depth - 1)
+        elif tag in BLOCK_TAGS:
+            self._flush()
+
+    def handle_data(self, data):
+        if not self._skip_depth:
+            self._parts.append(data)
+
+    def close(self):
+        super().close()
+        self._flush()
+
+
+def iter_text_blocks(chunks, max_bytes=DEFAULT_MAX_BYTES, encoding='utf-8'):
+    """
+    從位元組分塊逐個返回文字區塊
+
+    讀取超過 max_bytes 後不再讀取（已讀部分的區塊仍會返回）；
+    呼叫者不再迭代時，chunks 不會被繼續讀取
+    """
+    decoder = codecs.getincrementaldecoder(encoding or 'utf-8')(errors='replace')
+    parser = TextBlockParser()
+    total = 0
+    for chunk in chunks:
+        if not chunk:
+            continue
+        if max_bytes is not None and total + len(chunk) > max_bytes:
+            chunk = chunk[:max_bytes - total]
+        total += len(chunk)
+        parser.feed(decoder.decode(chunk))
+        yield from parser.blocks
+        parser.blocks.clear()
+        if max_bytes is not None and total >= max_bytes:
+            break
+    parser.feed(decoder.decode(b'', final=True))
+    parser.close()
+    yield from parser.blocks
+
+
+def extract_text(chunks, max_bytes=DEFAULT_MAX_BYTES, stop=None, encoding='utf-8'):
+    """
+    提取全部文字區塊，以換行連接
+
+    stop(block) 返回 True 時提早停止（該區塊仍包含在結果中）
+    """
+    blocks = []
+    for block in iter_text_blocks(chunks, max_bytes, encoding):
+        blocks.append(block)
+        if stop and stop(block):
+            break
+    return '\n'.join(blocks)
+
+
+class OpeningDetailsFound:
+    """
+    提早停止的條件：已找到店名及日期
+
+    每個區塊只檢查一次，不重新掃描之前的文字
+    """
+
+    def __init__(self, store_name_patterns=STORE_NAME_PATTERNS):
+        self.store_name_patterns = store_name_patterns
+        self.store_name = ''
+        self.date = ''
+
+    def __call__(self, block):
+        if not self.store_name:
+            match = first_match(self.store_name_patterns, WHITESPACE_PATTERN.sub('', block))
+            if match:
+                self.store_name = match.group(1)
+        if not self.date:
+            self.date = extract_date(block)
+        return bool(self.store_name and self.date)
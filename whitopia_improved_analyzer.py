@@ -5,187 +5,120 @@ Whitopia.jp 店鋪開業信息分析器 (改進版)
 更好地分析和整理店鋪開業的詳細信息
 """
 
-import json
-import re
 from datetime import datetime
 
+from whitopia_extract import extract_record, extract_store_info
+from whitopia_records import RecordResult, StoreOpening, TextStore
+from whitopia_render import ConsoleRenderer, JsonRenderer, MarkdownRenderer, render_all
+from whitopia_stream import JsonlWriter, NewsSource, OpeningStats
+
 class ImprovedWhitopiaAnalyzer:
-    def __init__(self, json_file='whitopia_news.json'):
+    def __init__(self, json_file='whitopia_news.json', db=None, extract_cache=None, dedupe=True, metrics=None,
+                 quiet=False):
         self.json_file = json_file
+        if metrics is None:
+            from whitopia_metrics import NULL_METRICS
+            metrics = NULL_METRICS
+        self.metrics = metrics
+        self.quiet = quiet
+        self.meta = {}
+        self.dedupe = dedupe
+        self.db = db
+        self.extract_cache = extract_cache
         self.store_openings = []
     
+    def log(self, message):
+        """輸出進度信息（安靜模式下不輸出）"""
+        if not self.quiet:
+            print(message)
+    
     def load_data(self):
-        """載入JSON數據"""
+        """載入爬蟲結果（支援 JSON、MessagePack 及串流 JSONL 格式）"""
         try:
-            with open(self.json_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            with self.metrics.timer('whitopia_analyze_seconds', stage='load'):
+                return NewsSource(self.json_file)
         except FileNotFoundError:
             print(f"找不到文件: {self.json_file}")
             return None
-        except json.JSONDecodeError:
-            print(f"JSON格式錯誤: {self.json_file}")
+        except ValueError as e:
+            # JSON 無法解碼或不符合 schema（SchemaError）
+            print(f"格式錯誤: {self.json_file}（{e}）")
             return None
     
     def extract_store_info(self, text):
         """從文字中提取店鋪信息"""
-        store_info = {
-            'store_name': '',
-            'prefecture': '',
-            'date': '',
-            'full_text': text
-        }
-        
-        # 清理文字，移除多餘的空白和換行
-        clean_text = re.sub(r'\s+', '', text)
-        
-        # 提取店鋪名稱 - 更精確的模式
-        store_name_patterns = [
-            r'「(ホワイトピア[^」]+店)」',
-            r'(ホワイトピア[^が]+店)が',
-            r'(ホワイトピア[^！]+店)！',
-            r'(ホワイトピア\w+店)'
-        ]
-        
-        for pattern in store_name_patterns:
-            match = re.search(pattern, clean_text)
-            if match:
-                store_info['store_name'] = match.group(1)
-                break
-        
-        # 提取都道府縣信息 - 更精確的模式
-        prefecture_patterns = [
-            r'新たに([^県]+県)に',
-            r'([^県]+県)にOPEN',
-            r'が新たに([^県]+県)',
-            r'「[^」]+」が新たに([^県]+県)'
-        ]
-        
-        for pattern in prefecture_patterns:
-            match = re.search(pattern, clean_text)
-            if match:
-                store_info['prefecture'] = match.group(1)
-                break
-        
-        # 提取日期
-        date_patterns = [
-            r'(\d{4}-\d{2}-\d{2})',
-            r'(\d{4})年(\d{1,2})月(\d{1,2})日',
-            r'(\d{4})/(\d{1,2})/(\d{1,2})'
-        ]
-        
-        for pattern in date_patterns:
-            match = re.search(pattern, text)
-            if match:
-                if len(match.groups()) == 1:
-                    store_info['date'] = match.group(1)
-                else:
-                    year, month, day = match.groups()
-                    store_info['date'] = f"{year}-{month.zfill(2)}-{day.zfill(2)}"
-                break
-        
-        return store_info
+        return extract_store_info(text)
     
-    def analyze_store_openings(self):
-        """分析店鋪開業信息"""
-        data = self.load_data()
-        if not data:
-            return
+    def iter_store_openings(self, source):
+        """逐項提取店鋪記錄（有提取快取時只重新提取新增或改變的項目）"""
+        items = source.iter_store_news()
         
-        print("=" * 70)
-        print("🏪 Whitopia.jp 店鋪開業信息詳細分析")
-        print("=" * 70)
-        print(f"📊 分析時間: {datetime.now().strftime('%Y年%m月%d日 %H:%M:%S')}")
-        print(f"📅 數據抓取時間: {data.get('scrape_time', '未知')}")
-        print(f"📈 總共找到項目: {data.get('total_items', 0)} 個")
-        print(f"🏬 店鋪相關項目: {data.get('store_related_items', 0)} 個")
-        print()
+        extract = self.extract_cache.extract if self.extract_cache else extract_record
         
-        store_openings = []
+        # 合併同一則公告的重複或近似重複項目（以提取結果的店名和日期輔助判斷）
+        dedupe_index = None
+        if self.dedupe:
+            from whitopia_dedup import NearDuplicateIndex, dedupe_records
+
+            dedupe_index = NearDuplicateIndex()
+            yield from dedupe_records(items, extract, dedupe_index)
+        else:
+            for item in items:
+                yield extract(item)
+        
+        if dedupe_index and dedupe_index.duplicates:
+            self.metrics.inc('whitopia_duplicates_total', dedupe_index.duplicates)
+            self.log(f"🧹 合併了 {dedupe_index.duplicates} 個重複的公告項目")
+        
+        if self.extract_cache:
+            self.extract_cache.save()
+            stats = self.extract_cache.stats()
+            self.metrics.inc('whitopia_extract_cache_total', stats['reused'], result='reused')
+            self.metrics.inc('whitopia_extract_cache_total', stats['recomputed'], result='recomputed')
+            self.log(f"♻️ 提取快取: 重用 {stats['reused']} 個，重新提取 {stats['recomputed']} 個")
+    
+    def analyze(self):
+        """
+        分析店鋪開業信息，只返回結構化結果（不輸出、不寫文件）
+        
+        結果包含按日期排序的完整記錄列表，記憶體用量隨店鋪項目數量增長（全文放在暫存文件中，
+        每筆只保留緊湊記錄）；只有 analyze_stream() 的記憶體用量不隨項目數量增長
+        """
+        source = self.load_data()
+        if not source:
+            return None
         
-        for item in data.get('store_news', []):
-            full_text = item.get('content', '') + ' ' + item.get('title', '')
-            store_info = self.extract_store_info(full_text)
-            
-            # 如果沒有從內容中提取到日期，使用項目的日期
-            if not store_info['date'] and item.get('date'):
-                store_info['date'] = item['date']
-            
-            store_info['match_keyword'] = item.get('match_keyword', '')
-            store_info['url'] = item.get('url', '')
-            
-            store_openings.append(store_info)
+        # 記錄的全文放在暫存文件中，輸出時才讀取；每次分析的結果使用自己的 TextStore，
+        # 暫存文件在結果不再被引用時關閉
+        texts = TextStore()
+        
+        store_openings = []
+        stats = OpeningStats()
+        with self.metrics.timer('whitopia_analyze_seconds', stage='extract'):
+            for store in self.iter_store_openings(source):
+                stats.add(store)
+                store_openings.append(StoreOpening.from_dict(store, texts))
+        self.metrics.inc('whitopia_store_openings_total', len(store_openings))
+        self.meta = dict(source.meta)
         
         # 按日期排序（最新的在前）
-        store_openings.sort(key=lambda x: x['date'] if x['date'] else '0000-00-00', reverse=True)
-        
-        print("🗓️ 店鋪開業時間表:")
-        print("=" * 70)
-        
-        for i, store in enumerate(store_openings, 1):
-            if store['date']:
-                try:
-                    date_obj = datetime.strptime(store['date'], '%Y-%m-%d')
-                    formatted_date = date_obj.strftime('%Y年%m月%d日')
-                    weekday = ['月', '火', '水', '木', '金', '土', '日'][date_obj.weekday()]
-                    date_display = f"{formatted_date} ({weekday})"
-                except:
-                    date_display = store['date']
-            else:
-                date_display = "日期未知"
-            
-            print(f"🏪 {i}. {store['store_name'] or '店名未知'}")
-            print(f"   📅 開業日期: {date_display}")
-            print(f"   📍 所在地區: {store['prefecture'] or '地區未知'}")
-            print(f"   🔍 關鍵詞: {store['match_keyword']}")
-            print(f"   🔗 URL: {store['url']}")
-            
-            # 顯示原始文字的關鍵部分
-            key_text = store['full_text'][:150].replace('\n', ' ')
-            print(f"   📝 內容摘要: {key_text}...")
-            print("-" * 70)
-        
-        # 統計分析
-        print("\n📊 統計分析:")
-        print("=" * 70)
-        
-        # 按月份統計
-        monthly_stats = {}
-        prefecture_stats = {}
-        
-        for store in store_openings:
-            if store['date']:
-                try:
-                    month = store['date'][:7]  # YYYY-MM
-                    monthly_stats[month] = monthly_stats.get(month, 0) + 1
-                except:
-                    pass
-            
-            if store['prefecture']:
-                prefecture_stats[store['prefecture']] = prefecture_stats.get(store['prefecture'], 0) + 1
-        
-        print("📅 按月份統計:")
-        for month, count in sorted(monthly_stats.items(), reverse=True):
-            try:
-                month_obj = datetime.strptime(month + '-01', '%Y-%m-%d')
-                month_display = month_obj.strftime('%Y年%m月')
-                print(f"   {month_display}: {count} 家店鋪")
-            except:
-                print(f"   {month}: {count} 家店鋪")
-        
-        print("\n📍 按地區統計:")
-        for prefecture, count in sorted(prefecture_stats.items(), key=lambda x: x[1], reverse=True):
-            print(f"   {prefecture}: {count} 家店鋪")
-        
-        # 生成摘要報告
-        print(f"\n📋 摘要報告:")
-        print("=" * 70)
-        total_stores = len([s for s in store_openings if s['store_name']])
-        print(f"✅ 成功識別店鋪數量: {total_stores} 家")
-        print(f"📍 涉及地區數量: {len(prefecture_stats)} 個都道府縣")
-        print(f"📅 開業時間跨度: {min(monthly_stats.keys()) if monthly_stats else '未知'} 至 {max(monthly_stats.keys()) if monthly_stats else '未知'}")
-        
-        # 保存詳細分析結果
-        analysis_result = {
+        store_openings.sort(key=lambda x: x.date_ordinal, reverse=True)
+        
+        monthly_stats = stats.monthly_stats
+        prefecture_stats = stats.prefecture_stats
+        total_stores = stats.identified
+        
+        # 使用資料庫時，寫入本次記錄並以 SQL 聚合統計全部歷史
+        if self.db:
+            with self.metrics.timer('whitopia_analyze_seconds', stage='db'):
+                self.db.upsert_store_openings(store_openings)
+                monthly_stats = self.db.monthly_stats()
+                prefecture_stats = self.db.prefecture_stats()
+                total_stores = self.db.count_identified()
+            self.meta['db_file'] = self.db.db_file
+        
+        # RecordResult 輸出時把記錄展開成包含全文的 dict，可以直接以 json.dumps 保存
+        analysis_result = RecordResult({
             'analysis_time': datetime.now().isoformat(),
             'total_stores': total_stores,
             'store_openings': store_openings,
@@ -199,15 +132,111 @@ class ImprovedWhitopiaAnalyzer:
                     'end': max(monthly_stats.keys()) if monthly_stats else None
                 }
             }
-        }
+        })
         
-        with open('whitopia_detailed_analysis.json', 'w', encoding='utf-8') as f:
-            json.dump(analysis_result, f, ensure_ascii=False, indent=2)
+        if self.extract_cache:
+            analysis_result['extract_cache'] = self.extract_cache.stats()
         
-        print(f"\n💾 詳細分析結果已保存到 whitopia_detailed_analysis.json")
+        return analysis_result
+    
+    def default_renderers(self):
+        """終端輸出（安靜模式下省略）及 whitopia_detailed_analysis.json"""
+        renderers = [JsonRenderer('whitopia_detailed_analysis.json', quiet=self.quiet)]
+        if not self.quiet:
+            renderers.insert(0, ConsoleRenderer())
+        return renderers
+    
+    def analyze_store_openings(self, renderers=None):
+        """
+        分析店鋪開業信息並輸出
+        
+        renderers 預設為終端輸出及 whitopia_detailed_analysis.json；安靜模式下只保存 JSON
+        """
+        analysis_result = self.analyze()
+        if analysis_result is None:
+            return
+        
+        if renderers is None:
+            renderers = self.default_renderers()
+        with self.metrics.timer('whitopia_analyze_seconds', stage='render'):
+            render_all(renderers, analysis_result, self.meta)
+        
+        return analysis_result
+    
+    def analyze_stream(self, output_file='whitopia_detailed_analysis.jsonl'):
+        """
+        串流分析：逐項提取並寫出店鋪記錄，只在記憶體中保留統計，
+        適合項目數量很大的爬蟲結果
+        """
+        source = self.load_data()
+        if not source:
+            return
+        
+        stats = OpeningStats()
+        with JsonlWriter(output_file, {'analysis_time': datetime.now().isoformat()}) as writer:
+            with self.metrics.timer('whitopia_analyze_seconds', stage='extract'):
+                for store in self.iter_store_openings(source):
+                    stats.add(store)
+                    writer.write(store)
+            self.metrics.inc('whitopia_store_openings_total', stats.total)
+            
+            analysis_result = {
+                'total_stores': stats.identified,
+                'monthly_stats': stats.monthly_stats,
+                'prefecture_stats': stats.prefecture_stats,
+                'summary': stats.summary()
+            }
+            writer.write_summary(analysis_result)
+        
+        self.meta = dict(source.meta)
+        self.log(f"📈 總共找到項目: {source.meta.get('total_items', 0)} 個")
+        self.log(f"🏬 店鋪相關項目: {stats.total} 個")
+        self.log(f"✅ 成功識別店鋪數量: {stats.identified} 家")
+        self.log(f"💾 店鋪記錄已逐行保存到 {output_file}")
         
         return analysis_result
 
+def main(argv=None):
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Whitopia.jp 店鋪開業信息分析器 (改進版)")
+    parser.add_argument('json_file', nargs='?', default='whitopia_news.json', help="爬蟲結果（.json 或 .jsonl）")
+    parser.add_argument('--stream', action='store_true', help="串流分析，只輸出 JSONL 記錄與統計（記憶體用量不隨項目數量增長）")
+    parser.add_argument('--db', metavar='FILE', help="把店鋪記錄寫入 SQLite 歷史資料庫，並統計全部歷史")
+    parser.add_argument('--no-extract-cache', action='store_true', help="不使用提取快取，重新提取全部項目")
+    parser.add_argument('--no-dedupe', action='store_true', help="不合併重複的公告項目")
+    parser.add_argument('--quiet', action='store_true', help="安靜模式，不輸出時間表及統計，只保存結果")
+    parser.add_argument('--report', nargs='?', const='whitopia_report.md', metavar='FILE',
+                        help="同時輸出 Markdown 報告（預設 whitopia_report.md）")
+    parser.add_argument('--metrics', metavar='BASENAME', help="記錄執行指標，結束時寫出 BASENAME.json 及 BASENAME.prom")
+    args = parser.parse_args(argv)
+    
+    db = None
+    if args.db:
+        from whitopia_db import WhitopiaDB
+        db = WhitopiaDB(args.db)
+    extract_cache = None
+    if not args.no_extract_cache:
+        from whitopia_incremental import ExtractionCache
+        extract_cache = ExtractionCache(quiet=args.quiet)
+    metrics = None
+    if args.metrics:
+        from whitopia_metrics import Metrics
+        metrics = Metrics()
+    analyzer = ImprovedWhitopiaAnalyzer(args.json_file, db=db, extract_cache=extract_cache,
+                                        dedupe=not args.no_dedupe, metrics=metrics, quiet=args.quiet)
+    if args.stream:
+        analyzer.analyze_stream()
+    else:
+        renderers = analyzer.default_renderers()
+        if args.report:
+            renderers.append(MarkdownRenderer(args.report, quiet=args.quiet))
+        analyzer.analyze_store_openings(renderers)
+    
+    if metrics:
+        metrics.write(args.metrics)
+        print(f"💾 執行指標已保存到 {args.metrics}.json 及 {args.metrics}.prom")
+
+
 if __name__ == "__main__":
-    analyzer = ImprovedWhitopiaAnalyzer()
-    analyzer.analyze_store_openings()
\ No newline at end of file
+    main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Whitopia.jp 增量提取快取
+以新聞項目內容（content + title）的指紋為鍵保存提取結果，
+只對新增或內容改變的項目重新提取；提取規則改變時快取自動失效
+"""
+
+import hashlib
+import json
+import os
+
+from whitopia_extract import build_record, extract_fields, item_text, rules_version
+
+
+class ExtractionCache:
+    """內容指紋 → 提取結果的持久化快取"""
+
+    def __init__(self, cache_file='whitopia_extract_cache.json', max_entries=100000, quiet=False):
+        self.cache_file = cache_file
+        self.max_entries = max_entries
+        self.quiet = quiet
+        self.rules_version = rules_version()
+        self.entries = {}
+        self.reused = 0
+        self.recomputed = 0
+        self.load()
+
+    def load(self):
+        """載入快取；規則版本不同時丟棄全部舊結果"""
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return
+
+        if data.get('rules_version') != self.rules_version:
+            if not self.quiet:
+                print("提取規則已改變，快取的提取結果全部失效")
+            return
+        self.entries = data.get('entries', {})
+
+    def save(self):
+        """保存快取（超出上限時丟棄最久未使用的項目）"""
+        if len(self.entries) > self.max_entries:
+            keys = list(self.entries)[-self.max_entries:]
+            self.entries = {key: self.entries[key] for key in keys}
+
+        tmp_file = self.cache_file + '.tmp'
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump({'rules_version': self.rules_version, 'entries': self.entries}, f, ensure_ascii=False)
+        os.replace(tmp_file, self.cache_file)
+
+    def fingerprint(self, item):
+        """項目內容的指紋"""
+        text = item.get('content', '') + '\x00' + item.get('title', '')
+        return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+    def extract(self, item):
+        """提取店鋪記錄：內容未變的項目直接使用快取結果"""
+        key = self.fingerprint(item)
+        fields = self.entries.pop(key, None)
+        if fields is None:
+            fields = extract_fields(item_text(item))
+            self.recomputed += 1
+        else:
+            self.reused += 1
+
+        # 重新插入到最後，保持最近使用的順序
+        self.entries[key] = fields
+        return build_record(item, fields)
+
+    def stats(self):
+        return {'reused': self.reused, 'recomputed': self.recomputed}
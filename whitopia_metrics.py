@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Whitopia.jp 執行指標
+記錄網絡請求、解析、過濾及分析各階段的計數器和直方圖，
+執行結束時輸出 JSON 及 Prometheus textfile 格式。
+未啟用時使用 NULL_METRICS，所有記錄操作都是空操作
+"""
+
+import json
+import os
+import threading
+import time
+
+# 耗時直方圖的上限（秒）
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# 回應大小直方圖的上限（位元組）
+BYTES_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+
+def label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def format_labels(key):
+    if not key:
+        return ''
+    return '{' + ','.join(f'{name}="{value}"' for name, value in key) + '}'
+
+
+class Histogram:
+    """累積分桶直方圖"""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'sum': self.sum,
+            'buckets': {str(bound): count for bound, count in zip(self.buckets, self.counts)}
+        }
+
+
+class Timer:
+    """計時上下文，結束時把耗時記錄到直方圖"""
+
+    def __init__(self, metrics, name, labels):
+        self.metrics = metrics
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.observe(self.name, time.perf_counter() - self.start, **self.labels)
+
+
+class Metrics:
+    """計數器和直方圖（執行緒安全）"""
+
+    enabled = True
+
+    def __init__(self):
+        self.counters = {}
+        self.histograms = {}
+        self.started = time.time()
+        self._lock = threading.Lock()
+
+    def inc(self, name, value=1, **labels):
+        """計數器加上 value"""
+        key = (name, label_key(labels))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, value, buckets=SECONDS_BUCKETS, **labels):
+        """把一個值記錄到直方圖"""
+        key = (name, label_key(labels))
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram(buckets)
+            histogram.observe(value)
+
+    def timer(self, name, **labels):
+        """計時 with 區塊，耗時記錄到 name 直方圖"""
+        return Timer(self, name, labels)
+
+    def to_dict(self):
+        with self._lock:
+            counters = {}
+            for (name, key), value in sorted(self.counters.items()):
+                counters.setdefault(name, {})[format_labels(key)] = value
+            histograms = {}
+            for (name, key), histogram in sorted(self.histograms.items()):
+                histograms.setdefault(name, {})[format_labels(key)] = histogram.to_dict()
+        return {
+            'started': self.started,
+            'duration_seconds': time.time() - self.started,
+            'counters': counters,
+            'histograms': histograms
+        }
+
+    def to_prometheus(self):
+        """轉換成 Prometheus 文字格式"""
+        lines = []
+        with self._lock:
+            last_name = None
+            for (name, key), value in sorted(self.counters.items()):
+                if name != last_name:
+                    lines.append(f'# TYPE {name} counter')
+                    last_name = name
+                lines.append(f'{name}{format_labels(key)} {value}')
+
+            last_name = None
+            for (name, key), histogram in sorted(self.histograms.items()):
+                if name != last_name:
+                    lines.append(f'# TYPE {name} histogram')
+                    last_name = name
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    lines.append(f'{name}_bucket{format_labels(key + (("le", bound),))} {count}')
+                lines.append(f'{name}_bucket{format_labels(key + (("le", "+Inf"),))} {histogram.count}')
+                lines.append(f'{name}_sum{format_labels(key)} {histogram.sum}')
+                lines.append(f'{name}_count{format_labels(key)} {histogram.count}')
+        return '\n'.join(lines) + '\n'
+
+    def write(self, basename):
+        """
+        寫出 basename.json 及 basename.prom
+
+        .prom 先寫臨時文件再替換，node_exporter 的 textfile collector 不會讀到寫了一半的文件
+        """
+        with open(basename + '.json', 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+
+        tmp_file = basename + '.prom.tmp'
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            f.write(self.to_prometheus())
+        os.replace(tmp_file, basename + '.prom')
+
+
+class NullTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+NULL_TIMER = NullTimer()
+
+
+class NullMetrics:
+    """未啟用指標時使用，所有操作都不做任何事"""
+
+    enabled = False
+
+    def inc(self, name, value=1, **labels):
+        pass
+
+    def observe(self, name, value, buckets=SECONDS_BUCKETS, **labels):
+        pass
+
+    def timer(self, name, **labels):
+        return NULL_TIMER
+
+    def write(self, basename):
+        pass
+
+
+NULL_METRICS = NullMetrics()
@@ -0,0 +1,356 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Whitopia.jp 緊湊記錄類型
+新聞項目和店鋪開業記錄以 __slots__ 類保存，建立後不可修改：都道府縣、關鍵詞等重複的字串經過駐留，
+日期保存為序數，只在輸出時才轉回字串；全文另外寫入 TextStore，記錄只保存位置和長度，需要時才讀取。
+記錄提供 get() 及 [] 讀取，可以代替原來的 dict 傳給統計、輸出及資料庫；
+包含記錄的結果以 RecordResult 返回，可以直接以 json.dumps 輸出。
+每筆記錄的記憶體用量以 python whitopia_records.py 測量
+"""
+
+import sys
+from datetime import date as Date
+from functools import lru_cache
+
+
+def intern_text(value):
+    """駐留重複出現的短字串（空值返回空字串）"""
+    return sys.intern(value) if value else ''
+
+
+def pack_date(value):
+    """
+    把 YYYY-MM-DD 轉成日期序數；空白為 0，
+    無法解析的字串原樣保留（駐留），不會遺失原始值
+    """
+    if not value:
+        return 0
+    try:
+        return Date.fromisoformat(value).toordinal()
+    except ValueError:
+        return sys.intern(value)
+
+
+@lru_cache(maxsize=4096)
+def unpack_date(value):
+    """pack_date 的逆轉換"""
+    if isinstance(value, str):
+        return value
+    return Date.fromordinal(value).isoformat() if value else ''
+
+
+def date_bounds(since=None, until=None):
+    """
+    把 YYYY-MM 或 YYYY-MM-DD 的範圍轉成可直接與 YYYY-MM-DD 字串比較的上下限（包含兩端）
+
+    月份上限包含整個月；省略的一端返回 None
+    """
+    high = None
+    if until:
+        high = until + '-99' if len(until) == 7 else until
+    return since or None, high
+
+
+class TextStore:
+    """
+    全文的外部存放處
+
+    文字以 UTF-8 追加寫入暫存文件（或指定的文件），記錄只保存 (位置, 長度)；
+    讀取時才從文件取回，記憶體中不保留全文
+    """
+
+    def __init__(self, path=None):
+        if path:
+            self._file = open(path, 'w+b')
+        else:
+            import tempfile
+            self._file = tempfile.TemporaryFile()
+        self._end = 0
+
+    def add(self, text):
+        """保存文字，返回 (位置, 長度)"""
+        if not text:
+            return 0, 0
+        data = text.encode('utf-8')
+        self._file.seek(self._end)
+        self._file.write(data)
+        offset = self._end
+        self._end += len(data)
+        return offset, len(data)
+
+    def get(self, offset, length):
+        if not length:
+            return ''
+        self._file.seek(offset)
+        return self._file.read(length).decode('utf-8')
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class Record:
+    """
+    記錄的共用部分：不可修改的 __slots__ 類，以欄位名稱讀取，與原來的 dict 相容
+
+    TEXT_FIELDS 中的欄位保存在 TextStore，記錄只保存每個欄位的 (位置, 長度)；
+    值為 None 的選填欄位視為不存在
+    """
+
+    __slots__ = ('_texts', '_spans')
+
+    # 一般欄位及保存在 TextStore 中的文字欄位
+    FIELDS = ()
+    TEXT_FIELDS = ()
+
+    def _set(self, name, value):
+        object.__setattr__(self, name, value)
+
+    def _set_texts(self, texts, values):
+        self._set('_texts', texts)
+        self._set('_spans', tuple(texts.add(value) for value in values))
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} 不可修改")
+
+    __delattr__ = __setattr__
+
+    def text(self, field):
+        """從 TextStore 讀取一個文字欄位"""
+        return self._texts.get(*self._spans[self.TEXT_FIELDS.index(field)])
+
+    def value(self, field):
+        """一般欄位的值（日期轉回字串）；選填欄位不存在時為 None"""
+        return getattr(self, field)
+
+    def has_text(self, field):
+        """文字欄位是否存在（預設總是存在）"""
+        return True
+
+    def __getitem__(self, key):
+        if key in self.TEXT_FIELDS and self.has_text(key):
+            return self.text(key)
+        if key in self.FIELDS:
+            value = self.value(key)
+            if value is not None:
+                return value
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __contains__(self, key):
+        if key in self.TEXT_FIELDS:
+            return self.has_text(key)
+        return key in self.FIELDS and self.value(key) is not None
+
+    def keys(self):
+        return [key for key in self.FIELDS + self.TEXT_FIELDS if key in self]
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.keys())
+
+    def to_dict(self, include_text=False):
+        """轉成 dict（日期為字串、元組為列表）；include_text 時包含文字欄位"""
+        data = {}
+        for field in self.FIELDS:
+            value = self.value(field)
+            if value is not None:
+                data[field] = list(value) if isinstance(value, tuple) else value
+        if include_text:
+            for field in self.TEXT_FIELDS:
+                if self.has_text(field):
+                    data[field] = self.text(field)
+        return data
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+    def __eq__(self, other):
+        if isinstance(other, Record):
+            other = other.to_dict(include_text=True)
+        if not isinstance(other, dict):
+            return NotImplemented
+        return self.to_dict(include_text=True) == other
+
+    __hash__ = None
+
+    def __reduce__(self):
+        # TextStore 的文件無法 pickle，以包含全文的 dict 傳輸（如傳給其他進程）
+        return dict, (self.to_dict(include_text=True),)
+
+
+class NewsItem(Record):
+    """新聞項目；content 及 detail_content 保存在 TextStore 中"""
+
+    __slots__ = ('title', '_date', 'url', 'match_keyword', 'store_related', 'site', 'duplicates')
+
+    FIELDS = ('date', 'title', 'url', 'match_keyword', 'store_related', 'site', 'duplicates')
+    TEXT_FIELDS = ('content', 'detail_content')
+
+    def __init__(self, title, date, url, content, texts, match_keyword=None, store_related=None,
+                 site=None, duplicates=None, detail_content=''):
+        self._set('title', title)
+        self._set('_date', pack_date(date))
+        self._set('url', url)
+        self._set('match_keyword', intern_text(match_keyword) if match_keyword is not None else None)
+        self._set('store_related', store_related)
+        self._set('site', intern_text(site) if site is not None else None)
+        self._set('duplicates', duplicates)
+        self._set_texts(texts, (content, detail_content))
+
+    @classmethod
+    def from_dict(cls, item, texts):
+        """從爬蟲結果的 dict 建立項目（未出現的選填欄位保持不存在）"""
+        return cls(item.get('title', ''), item.get('date', ''), item.get('url', ''), item.get('content', ''),
+                   texts, item.get('match_keyword'), item.get('store_related'), item.get('site'),
+                   item.get('duplicates'), item.get('detail_content', ''))
+
+    @property
+    def date(self):
+        return unpack_date(self._date)
+
+    def has_text(self, field):
+        # detail_content 只在抓取了詳細頁面時才存在
+        return field != 'detail_content' or bool(self._spans[1][1])
+
+
+class StoreOpening(Record):
+    """店鋪開業記錄；full_text 保存在 TextStore 中"""
+
+    __slots__ = ('store_name', 'prefecture', 'city', '_date', 'url', 'match_keyword', 'match_keywords')
+
+    FIELDS = ('store_name', 'prefecture', 'city', 'date', 'url', 'match_keyword', 'match_keywords')
+    TEXT_FIELDS = ('full_text',)
+
+    def __init__(self, store_name, prefecture, city, date, url, match_keyword, match_keywords,
+                 full_text, texts):
+        self._set('store_name', store_name)
+        self._set('prefecture', intern_text(prefecture))
+        self._set('city', intern_text(city))
+        self._set('_date', pack_date(date))
+        self._set('url', url)
+        self._set('match_keyword', intern_text(match_keyword))
+        self._set('match_keywords', tuple(intern_text(keyword) for keyword in match_keywords))
+        self._set_texts(texts, (full_text,))
+
+    @classmethod
+    def from_dict(cls, record, texts):
+        """從 extract_record() 返回的 dict 建立記錄"""
+        return cls(record.get('store_name', ''), record.get('prefecture', ''), record.get('city', ''),
+                   record.get('date', ''), record.get('url', ''), record.get('match_keyword', ''),
+                   record.get('match_keywords', ()), record.get('full_text', ''), texts)
+
+    @property
+    def date(self):
+        return unpack_date(self._date)
+
+    @property
+    def date_ordinal(self):
+        """日期序數（沒有日期或無法解析時為 0），可直接用於排序"""
+        return self._date if isinstance(self._date, int) else 0
+
+
+class RecordResult(dict):
+    """
+    包含記錄列表的結果 dict（如分析結果的 store_openings）
+
+    json 編碼器對 dict 子類別呼叫 items()，這裡把記錄列表換成包含全文的 dict，
+    因此結果可以直接以 json.dumps 輸出；以 [] 讀取時仍得到記錄本身
+    """
+
+    __slots__ = ()
+
+    def items(self):
+        return [(key, expand_records(value)) for key, value in super().items()]
+
+
+def to_json(value):
+    """
+    編碼器的 default：把記錄轉成包含全文的 dict
+
+    orjson 以 OPT_PASSTHROUGH_SUBCLASS 把 dict 子類別（RecordResult）交給這裡，其他子類別也轉成原生類型
+    """
+    if isinstance(value, Record):
+        return value.to_dict(include_text=True)
+    if isinstance(value, dict):
+        return dict(value.items())
+    for type_ in (str, int, float, list, tuple):
+        if isinstance(value, type_):
+            return type_(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def expand_records(value):
+    """
+    把記錄換成包含全文的 dict，供不經 default 的編碼器（msgspec）及 RecordResult 使用
+
+    記錄只出現在結果的頂層列表中（如 store_openings），只檢查這一層，其他內容原樣返回
+    """
+    if isinstance(value, Record):
+        return value.to_dict(include_text=True)
+    if isinstance(value, list):
+        if value and isinstance(value[0], Record):
+            return [item.to_dict(include_text=True) for item in value]
+        return value
+    if isinstance(value, dict):
+        return {key: expand_records(item) if isinstance(item, list) else item for key, item in value.items()}
+    return value
+
+
+def measure(build, count):
+    """以 tracemalloc 測量 build() 建立的 count 筆記錄的每筆記憶體用量（位元組）"""
+    import gc
+    import tracemalloc
+
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    records = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del records
+    return (after - before) / count
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+
+    from whitopia_benchmark import iter_news_items
+    from whitopia_extract import STORE_KEYWORD_AUTOMATON, extract_record
+
+    parser = argparse.ArgumentParser(description="比較 dict 與緊湊記錄類型的記憶體用量")
+    parser.add_argument('--count', type=int, default=100000, help="模擬的新聞項目數")
+    args = parser.parse_args()
+
+    items = [item for item in iter_news_items(args.count)
+             if STORE_KEYWORD_AUTOMATON.first(item['title'] + ' ' + item['content'])]
+    # 每次都從 JSON 重新解析，與實際載入時一樣每筆記錄有自己的字串
+    record_lines = [json.dumps(extract_record(item), ensure_ascii=False) for item in items]
+    item_lines = [json.dumps(item, ensure_ascii=False) for item in items]
+
+    with TextStore() as texts:
+        dict_size = measure(lambda: [json.loads(line) for line in record_lines], len(record_lines))
+        record_size = measure(lambda: [StoreOpening.from_dict(json.loads(line), texts) for line in record_lines],
+                              len(record_lines))
+        news_dict_size = measure(lambda: [json.loads(line) for line in item_lines], len(item_lines))
+        news_size = measure(lambda: [NewsItem.from_dict(json.loads(line), texts) for line in item_lines],
+                            len(item_lines))
+
+    print(f"店鋪記錄 {len(record_lines)} 筆: dict {dict_size:.0f} B/筆，StoreOpening {record_size:.0f} B/筆 "
+          f"（{record_size / dict_size:.0%}）")
+    print(f"新聞項目 {len(item_lines)} 筆: dict {news_dict_size:.0f} B/筆，NewsItem {news_size:.0f} B/筆 "
+          f"（{news_size / news_dict_size:.0%}）")
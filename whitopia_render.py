@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Whitopia.jp 結果輸出
+爬蟲和分析器只返回結構化結果，由這裡的輸出器按需要輸出到終端、JSON 或 Markdown 報告。
+日期的顯示格式只在輸出器需要時才計算
+"""
+
+from datetime import datetime
+from functools import lru_cache
+
+WEEKDAYS = ['月', '火', '水', '木', '金', '土', '日']
+
+
+@lru_cache(maxsize=4096)
+def format_date(date, weekday=True):
+    """把 YYYY-MM-DD 轉成 2025年07月25日 (金)；無法解析時原樣返回"""
+    if not date:
+        return "日期未知"
+    try:
+        date_obj = datetime.strptime(date, '%Y-%m-%d')
+    except ValueError:
+        return date
+    formatted = date_obj.strftime('%Y年%m月%d日')
+    if weekday:
+        formatted += f" ({WEEKDAYS[date_obj.weekday()]})"
+    return formatted
+
+
+@lru_cache(maxsize=1024)
+def format_month(month):
+    """把 YYYY-MM 轉成 2025年07月"""
+    try:
+        return datetime.strptime(month + '-01', '%Y-%m-%d').strftime('%Y年%m月')
+    except ValueError:
+        return month
+
+
+def sorted_months(monthly_stats):
+    return sorted(monthly_stats.items(), reverse=True)
+
+
+def sorted_prefectures(prefecture_stats):
+    return sorted(prefecture_stats.items(), key=lambda x: x[1], reverse=True)
+
+
+def format_place(store):
+    """都道府縣加市區町村（如 香川県 高松市）；都沒有時返回「地區未知」"""
+    place = ' '.join(part for part in (store.get('prefecture'), store.get('city')) if part)
+    return place or '地區未知'
+
+
+class JsonRenderer:
+    """把結果保存為 JSON 文件（記錄包含全文；.msgpack 文件保存為 MessagePack）"""
+
+    def __init__(self, path, quiet=False):
+        self.path = path
+        self.quiet = quiet
+
+    def render(self, result, meta=None):
+        from whitopia_codec import dump
+
+        dump(result, self.path)
+        if not self.quiet:
+            print(f"\n💾 結果已保存到 {self.path}")
+
+
+class ScrapeConsoleRenderer:
+    """在終端顯示爬蟲找到的店鋪相關新聞及前幾個新聞項目"""
+
+    def __init__(self, preview_items=10):
+        self.preview_items = preview_items
+
+    def render(self, result, meta=None):
+        store_news = result['store_news']
+        print("\n" + "=" * 50)
+        print("店鋪開業相關信息:")
+        print("=" * 50)
+
+        if store_news:
+            for i, item in enumerate(store_news, 1):
+                print(f"\n{i}. 日期: {item.get('date', '未知')}")
+                print(f"   標題: {item.get('title', '無標題')}")
+                print(f"   關鍵詞: {item.get('match_keyword', '無')}")
+                print(f"   URL: {item.get('url', '無')}")
+                print(f"   內容預覽: {item.get('content', '')[:200]}...")
+        else:
+            print("未找到明確的店鋪開業信息")
+
+        print("\n" + "=" * 50)
+        print("所有新聞項目:")
+        print("=" * 50)
+
+        for i, item in enumerate(result['all_news'][:self.preview_items], 1):
+            if item:
+                print(f"\n{i}. 日期: {item.get('date', '未知')}")
+                print(f"   標題: {item.get('title', '無標題')[:100]}")
+                print(f"   內容: {item.get('content', '')[:150]}...")
+
+
+class BasicConsoleRenderer:
+    """基本分析器的終端輸出"""
+
+    def render(self, result, meta=None):
+        meta = meta or {}
+        print("=" * 60)
+        print("Whitopia.jp 店鋪開業信息分析結果")
+        print("=" * 60)
+        print(f"分析時間: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+        print(f"數據來源: {meta.get('scrape_time', '未知')}")
+        print(f"總共找到 {meta.get('total_items', 0)} 個項目")
+        print(f"店鋪相關項目: {meta.get('store_related_items', 0)} 個")
+        print()
+
+        print("📅 店鋪開業時間表:")
+        print("-" * 60)
+
+        for i, store in enumerate(result['store_openings'], 1):
+            print(f"{i}. 開業日期: {format_date(store.get('date'), weekday=False)}")
+            print(f"   店鋪名稱: {store.get('store_name', '')}")
+            print(f"   所在地區: {store.get('prefecture', '')}")
+            print(f"   關鍵詞: {store.get('match_keyword', '')}")
+            print(f"   原始內容: {store.get('raw_content', '')[:100]}...")
+            print()
+
+        print("📊 統計分析:")
+        print("-" * 60)
+
+        print("按月份統計:")
+        for month, count in sorted_months(result['monthly_stats']):
+            print(f"  {month}: {count} 家店鋪")
+
+        print("\n按地區統計:")
+        for prefecture, count in sorted_prefectures(result['prefecture_stats']):
+            print(f"  {prefecture}: {count} 家店鋪")
+
+
+class ConsoleRenderer:
+    """改進版分析器的終端輸出（開業時間表、統計及摘要）"""
+
+    def render(self, result, meta=None):
+        meta = meta or {}
+        print("=" * 70)
+        print("🏪 Whitopia.jp 店鋪開業信息詳細分析")
+        print("=" * 70)
+        print(f"📊 分析時間: {datetime.now().strftime('%Y年%m月%d日 %H:%M:%S')}")
+        print(f"📅 數據抓取時間: {meta.get('scrape_time', '未知')}")
+        print(f"📈 總共找到項目: {meta.get('total_items', 0)} 個")
+        print(f"🏬 店鋪相關項目: {meta.get('store_related_items', 0)} 個")
+        print()
+
+        print("🗓️ 店鋪開業時間表:")
+        print("=" * 70)
+
+        for i, store in enumerate(result['store_openings'], 1):
+            print(f"🏪 {i}. {store['store_name'] or '店名未知'}")
+            print(f"   📅 開業日期: {format_date(store['date'])}")
+            print(f"   📍 所在地區: {format_place(store)}")
+            print(f"   🔍 關鍵詞: {store['match_keyword']}")
+            print(f"   🔗 URL: {store['url']}")
+
+            # 顯示原始文字的關鍵部分
+            key_text = store['full_text'][:150].replace('\n', ' ')
+            print(f"   📝 內容摘要: {key_text}...")
+            print("-" * 70)
+
+        print("\n📊 統計分析:")
+        print("=" * 70)
+        if meta.get('db_file'):
+            print(f"(統計涵蓋資料庫 {meta['db_file']} 中的全部歷史記錄)")
+
+        print("📅 按月份統計:")
+        for month, count in sorted_months(result['monthly_stats']):
+            print(f"   {format_month(month)}: {count} 家店鋪")
+
+        print("\n📍 按地區統計:")
+        for prefecture, count in sorted_prefectures(result['prefecture_stats']):
+            print(f"   {prefecture}: {count} 家店鋪")
+
+        summary = result['summary']
+        print(f"\n📋 摘要報告:")
+        print("=" * 70)
+        print(f"✅ 成功識別店鋪數量: {summary['total_identified_stores']} 家")
+        print(f"📍 涉及地區數量: {summary['prefectures_count']} 個都道府縣")
+        print(f"📅 開業時間跨度: {summary['date_range']['start'] or '未知'} 至 {summary['date_range']['end'] or '未知'}")
+
+
+REPORT_WEEKDAYS = ['星期一', '星期二', '星期三', '星期四', '星期五', '星期六', '星期日']
+
+
+@lru_cache(maxsize=4096)
+def format_report_date(date):
+    """報告用的日期格式：2025年07月07日（星期一）"""
+    if not date:
+        return "日期未知"
+    try:
+        date_obj = datetime.strptime(date, '%Y-%m-%d')
+    except ValueError:
+        return date
+    return f"{date_obj.strftime('%Y年%m月%d日')}（{REPORT_WEEKDAYS[date_obj.weekday()]}）"
+
+
+class MarkdownRenderer:
+    """把分析結果寫成與 whitopia_report.md 相同結構的 Markdown 報告"""
+
+    def __init__(self, path='whitopia_report.md', source_url='https://www.whitopia.jp', quiet=False):
+        self.path = path
+        self.source_url = source_url
+        self.quiet = quiet
+
+    def render(self, result, meta=None):
+        meta = meta or {}
+        store_openings = result['store_openings']
+        monthly_stats = result['monthly_stats']
+        prefecture_stats = sorted_prefectures(result['prefecture_stats'])
+        months = sorted(monthly_stats)
+        identified = result.get('summary', {}).get('total_identified_stores',
+                                                    sum(1 for store in store_openings if store.get('store_name')))
+        analysis_time = result.get('analysis_time', '')[:10]
+
+        lines = [
+            "# Whitopia.jp 店鋪開業信息分析報告",
+            "",
+            "## 📋 執行摘要",
+            "",
+            "### 🔍 分析結果概覽",
+            f"- **分析時間**: {format_date(analysis_time, weekday=False) if analysis_time else '未知'}",
+            f"- **數據來源**: {self.source_url}",
+            f"- **成功識別店鋪**: {identified} 家",
+            f"- **涉及地區**: {len(prefecture_stats)} 個都道府縣"
+            + (f"（{'、'.join(prefecture for prefecture, _ in prefecture_stats)}）" if prefecture_stats else ""),
+            f"- **時間跨度**: {format_month(months[0]) + ' - ' + format_month(months[-1]) if months else '未知'}",
+            "",
+            "---",
+            "",
+            "## 🏪 店鋪開業詳細信息",
+        ]
+
+        for i, store in enumerate(store_openings, 1):
+            lines += [
+                "",
+                f"### {i}. {store['store_name'] or '店名未知'}",
+                f"- **📅 開業日期**: {format_report_date(store['date'])}",
+                f"- **📍 所在地區**: {format_place(store)}",
+                f"- **🔍 關鍵詞**: {store['match_keyword']}",
+            ]
+            if store.get('url'):
+                lines.append(f"- **🔗 URL**: {store['url']}")
+
+        lines += ["", "---", "", "## 📊 統計分析", "", "### 按月份統計",
+                  "| 月份 | 開業店鋪數 |", "|------|-----------|"]
+        for month, count in sorted_months(monthly_stats):
+            lines.append(f"| {format_month(month)} | {count} 家 |")
+
+        lines += ["", "### 按地區統計", "| 都道府縣 | 店鋪數量 |", "|----------|----------|"]
+        for prefecture, count in prefecture_stats:
+            lines.append(f"| {prefecture} | {count} 家 |")
+
+        with open(self.path, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(lines) + '\n')
+        if not self.quiet:
+            print(f"📝 報告已保存到 {self.path}")
+
+
+def render_all(renderers, result, meta=None):
+    for renderer in renderers:
+        renderer.render(result, meta)
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Whitopia.jp 重試策略
+指數退避加隨機抖動、分開的連接/讀取超時、Retry-After 支援，
+以及按主機的斷路器：網站持續失敗時後續請求立即失敗，不再等待超時
+"""
+
+import random
+import threading
+import time
+import urllib.parse
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+import requests
+
+# 可以重試的 HTTP 狀態碼（請求過多及伺服器暫時錯誤）
+RETRY_STATUSES = frozenset((429, 500, 502, 503, 504))
+
+
+class CircuitOpenError(requests.RequestException):
+    """主機的斷路器已打開，請求未發出"""
+
+
+def parse_retry_after(value):
+    """解析 Retry-After（秒數或 HTTP 日期），返回等待秒數；無法解析時返回 None"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+class RetryPolicy:
+    """
+    一次請求的重試策略
+
+    第 n 次重試前等待 0 ~ min(backoff_max, backoff_base * 2**n) 之間的隨機秒數（full jitter）；
+    回應帶有 Retry-After 時改為等待它指定的時間（不超過 max_retry_after）
+    """
+
+    def __init__(self, max_attempts=3, backoff_base=1.0, backoff_max=30.0,
+                 connect_timeout=5.0, read_timeout=15.0, retry_statuses=RETRY_STATUSES,
+                 respect_retry_after=True, max_retry_after=120.0):
+        self.max_attempts = max(1, max_attempts)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.retry_statuses = frozenset(retry_statuses)
+        self.respect_retry_after = respect_retry_after
+        self.max_retry_after = max_retry_after
+
+    @property
+    def timeout(self):
+        """requests 的 (連接超時, 讀取超時)"""
+        return (self.connect_timeout, self.read_timeout)
+
+    def is_retryable(self, error):
+        """連接錯誤及超時可以重試；HTTP 錯誤只有 retry_statuses 中的狀態碼可以重試"""
+        if isinstance(error, CircuitOpenError):
+            return False
+        response = getattr(error, 'response', None)
+        if response is not None:
+            return response.status_code in self.retry_statuses
+        return isinstance(error, (requests.ConnectionError, requests.Timeout))
+
+    def delay(self, attempt, response=None):
+        """第 attempt 次（從 0 開始）失敗後的等待秒數；返回 (秒數, 是否來自 Retry-After)"""
+        if self.respect_retry_after and response is not None:
+            retry_after = parse_retry_after(response.headers.get('Retry-After'))
+            if retry_after is not None:
+                return min(retry_after, self.max_retry_after), True
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt)), False
+
+
+def is_host_failure(error):
+    """表示主機本身有問題的錯誤（計入斷路器）；404 等客戶端錯誤不計入"""
+    response = getattr(error, 'response', None)
+    if response is not None:
+        return response.status_code == 429 or response.status_code >= 500
+    return isinstance(error, (requests.ConnectionError, requests.Timeout))
+
+
+class CircuitBreaker:
+    """
+    按主機的斷路器
+
+    連續失敗 failure_threshold 次後打開，reset_timeout 秒內對該主機的請求立即失敗；
+    之後放行一個試探請求（半開），成功則關閉，失敗則再次打開
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=60.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._hosts = {}
+        self._lock = threading.Lock()
+
+    def _state(self, host):
+        return self._hosts.setdefault(host, {'failures': 0, 'opened_at': None, 'probing': False})
+
+    def check(self, url):
+        """
+        請求前檢查；斷路器打開時拋出 CircuitOpenError
+
+        返回 True 表示這次請求是半開狀態的試探請求：呼叫者必須以 record_success、
+        record_failure 或 release_probe 結束它，否則該主機會一直被拒絕
+        """
+        host = urllib.parse.urlsplit(url).netloc
+        with self._lock:
+            state = self._state(host)
+            if state['opened_at'] is None:
+                return False
+            remaining = state['opened_at'] + self.reset_timeout - time.monotonic()
+            if remaining > 0 or state['probing']:
+                raise CircuitOpenError(f"{host} 的斷路器已打開，{max(0, remaining):.0f} 秒後重試")
+            state['probing'] = True
+            return True
+
+    def release_probe(self, url):
+        """
+        試探請求沒有得到結果（如本地錯誤或中斷）時放棄它，不計為成功或失敗；
+        下一個請求可以再次試探
+        """
+        host = urllib.parse.urlsplit(url).netloc
+        with self._lock:
+            state = self._hosts.get(host)
+            if state is not None:
+                state['probing'] = False
+
+    def record_success(self, url):
+        host = urllib.parse.urlsplit(url).netloc
+        with self._lock:
+            self._hosts[host] = {'failures': 0, 'opened_at': None, 'probing': False}
+
+    def record_failure(self, url):
+        host = urllib.parse.urlsplit(url).netloc
+        with self._lock:
+            state = self._state(host)
+            state['failures'] += 1
+            if state['probing'] or state['failures'] >= self.failure_threshold:
+                state['opened_at'] = time.monotonic()
+                state['probing'] = False
+
+    def open_hosts(self):
+        with self._lock:
+            return [host for host, state in self._hosts.items() if state['opened_at'] is not None]
+
+
+class RetryStats:
+    """重試統計（執行緒安全）"""
+
+    FIELDS = ('requests', 'attempts', 'retries', 'retry_after_waits', 'sleep_seconds',
+              'giveups', 'circuit_rejections')
+
+    def __init__(self):
+        self._counts = dict.fromkeys(self.FIELDS, 0)
+        self._lock = threading.Lock()
+
+    def add(self, field, value=1):
+        with self._lock:
+            self._counts[field] += value
+
+    def as_dict(self):
+        with self._lock:
+            counts = dict(self._counts)
+        counts['sleep_seconds'] = round(counts['sleep_seconds'], 3)
+        return counts
+
+    def __repr__(self):
+        return repr(self.as_dict())
@@ -6,93 +6,601 @@ Whitopia.jp お知らせ爬蟲
 """
 
 import requests
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
+import contextlib
+import hashlib
 import re
 import json
 from datetime import datetime
 import time
 import urllib.parse
+import os
+from requests.adapters import HTTPAdapter
+
+from whitopia_cache import ResponseCache, tee_content
+from whitopia_codec import dump, load_news
+from whitopia_extract import STORE_KEYWORD_AUTOMATON, extract_date
+from whitopia_fetcher import ConcurrentFetcher, HostRateLimiter
+from whitopia_htmltext import CHUNK_SIZE, DEFAULT_MAX_BYTES, OpeningDetailsFound, extract_text
+from whitopia_metrics import BYTES_BUCKETS, NULL_METRICS
+from whitopia_render import JsonRenderer, ScrapeConsoleRenderer, render_all
+from whitopia_retry import CircuitBreaker, CircuitOpenError, RetryPolicy, RetryStats, is_host_failure
+from whitopia_stream import JsonlWriter, news_item_key
+
+# 分頁鏈接常見的文字
+NEXT_PAGE_TEXTS = ('次へ', '次のページ', '次へ>', '次へ »', '»', '›', '>', 'Next', 'next')
+
+# 進度文件中保留的已見項目鍵數量上限
+MAX_SEEN_KEYS = 500
+
+# 列表解析邏輯的版本：修改解析方式時遞增，使快取的解析結果失效
+PARSE_LOGIC_VERSION = 2
+
+# 常見的新聞/公告選擇器
+NEWS_SELECTORS = [
+    '.news-item', '.news-list li', '.information-item',
+    '.notice-item', '.announcement-item', 'article',
+    '.post', '.entry', '.item'
+]
+
+# 記錄網站使用「日期文字行」備用解析方式的標記
+TEXT_FALLBACK = '__text__'
+
+NEWS_DATE_PATTERN = re.compile(r'(\d{4})[年/.-](\d{1,2})[月/.-](\d{1,2})')
+
+# 優先使用 lxml 解析器（比純 Python 的 html.parser 快得多）
+try:
+    import lxml  # noqa: F401
+    DEFAULT_PARSER = 'lxml'
+except ImportError:
+    DEFAULT_PARSER = 'html.parser'
+
+
+def selector_strainer(selector):
+    """為選擇器建立 SoupStrainer，只解析選擇器需要的子樹；無法轉換時返回 None"""
+    if not selector or selector == TEXT_FALLBACK:
+        return None
+    first = selector.split()[0]
+    if re.fullmatch(r'\.[\w-]+', first):
+        return SoupStrainer(attrs={'class': first[1:]})
+    if re.fullmatch(r'[a-z][a-z0-9]*', first):
+        return SoupStrainer(first)
+    return None
+
+
+class StreamedResponse:
+    """
+    串流回應：代理 requests 的 Response，close() 時同時釋放請求佔用的連接名額
+    
+    on_body() 登記的 callback 在內容被 iter_content() 完整讀取後以完整內容呼叫（如寫入快取）；
+    on_close() 登記的 callback 在 close() 時以已讀取的位元組數呼叫一次（包括提早停止讀取的部分內容）
+    """
+    
+    def __init__(self, response, slot):
+        object.__setattr__(self, '_response', response)
+        object.__setattr__(self, '_slot', slot)
+        object.__setattr__(self, '_body_callbacks', [])
+        object.__setattr__(self, '_close_callbacks', [])
+        object.__setattr__(self, '_bytes_read', [0])
+    
+    def on_body(self, callback):
+        self._body_callbacks.append(callback)
+    
+    def on_close(self, callback):
+        self._close_callbacks.append(callback)
+    
+    def iter_content(self, chunk_size=1, decode_unicode=False):
+        chunks = self._count(self._response.iter_content(chunk_size, decode_unicode))
+        if self._body_callbacks and not decode_unicode:
+            return tee_content(chunks, self._body_callbacks)
+        return chunks
+    
+    def _count(self, chunks):
+        counter = self._bytes_read
+        for chunk in chunks:
+            counter[0] += len(chunk)
+            yield chunk
+    
+    def __getattr__(self, name):
+        return getattr(self._response, name)
+    
+    def __setattr__(self, name, value):
+        setattr(self._response, name, value)
+    
+    def close(self):
+        callbacks = self._close_callbacks[:]
+        del self._close_callbacks[:]
+        try:
+            self._response.close()
+        finally:
+            self._slot.close()
+            for callback in callbacks:
+                callback(self._bytes_read[0])
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+
+DEFAULT_BASE_URL = "https://www.whitopia.jp"
 
 class WhitopiaScraper:
-    def __init__(self):
-        self.base_url = "https://www.whitopia.jp"
+    def __init__(self, max_workers=8, rate_per_host=2.0, cache=None, parser=None,
+                 selector_memory_file='whitopia_selectors.json', metrics=None, quiet=False,
+                 retry_policy=None, circuit_breaker=None, detail_max_bytes=DEFAULT_MAX_BYTES,
+                 detail_early_stop=False, base_url=DEFAULT_BASE_URL):
+        # base_url 可指向本地替身伺服器（whitopia_standin.py）作離線測試
+        self.base_url = base_url.rstrip('/')
+        self.archive_url = self.base_url + "/news/"
+        self.max_workers = max_workers
         self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         })
         
-    def get_page(self, url, retries=3):
-        """獲取網頁內容"""
-        for attempt in range(retries):
+        # 連接池大小與並發數一致，讓並發請求可以重用 keep-alive 連接
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.rate_limiter = HostRateLimiter(rate_per_host)
+        self.cache = cache
+        self.parser = parser or DEFAULT_PARSER
+        self.news_selectors = NEWS_SELECTORS
+        self.selector_memory_file = selector_memory_file
+        self.selector_memory = self.load_selector_memory()
+        self.metrics = metrics or NULL_METRICS
+        self.quiet = quiet
+        self.last_error = None
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.circuit_breaker = circuit_breaker or CircuitBreaker()
+        self.retry_stats = RetryStats()
+        self.detail_max_bytes = detail_max_bytes
+        self.detail_early_stop = detail_early_stop
+    
+    def log(self, message):
+        """輸出進度及錯誤信息（安靜模式下不輸出；錯誤另見 last_error、retry_stats 及執行指標）"""
+        if not self.quiet:
+            print(message)
+        
+    def connection_slot(self, url):
+        """
+        一個請求佔用的連接名額（預設不限制），子類別可覆蓋以限制並發連接數
+        
+        只在發送請求及讀取回應內容期間持有，重試前的等待及速率限制的等待都不佔用
+        """
+        return contextlib.nullcontext()
+    
+    def send(self, url, timeout, headers=None, stream=False):
+        """
+        在連接名額內發送一次請求
+        
+        stream=False 時 requests 在返回前已讀取完整內容，名額隨即釋放；
+        stream=True 時返回 StreamedResponse，名額保留到呼叫者 close() 時才釋放
+        """
+        with contextlib.ExitStack() as slot:
+            slot.enter_context(self.connection_slot(url))
+            with self.metrics.timer('whitopia_http_request_seconds'):
+                response = self.session.get(url, timeout=timeout, headers=headers or {}, stream=stream)
+            if stream:
+                return StreamedResponse(response, slot.pop_all())
+            return response
+    
+    def get_page(self, url, retries=None, policy=None, stream=False):
+        """
+        獲取網頁內容
+        
+        policy 可為單次請求指定重試策略（預設 self.retry_policy），retries 覆蓋其最大嘗試次數；
+        stream=True 時不讀取回應內容，由呼叫者以 iter_content() 分塊讀取並負責 close()，
+        新下載的內容在完整讀取後才寫入快取（提早停止讀取時不寫入）
+        """
+        policy = policy or self.retry_policy
+        attempts = retries or policy.max_attempts
+        self.retry_stats.add('requests')
+        for attempt in range(attempts):
+            response = None
+            probe = False
             try:
-                response = self.session.get(url, timeout=10)
+                probe = self.circuit_breaker.check(url)
+                self.rate_limiter.wait(url)
+                self.retry_stats.add('attempts')
+                headers = self.cache.conditional_headers(url) if self.cache else {}
+                response = self.send(url, policy.timeout, headers, stream)
+                self.metrics.inc('whitopia_http_requests_total', status=response.status_code)
+                
+                # 304: 頁面未變更，直接使用快取內容
+                if response.status_code == 304 and headers:
+                    response.close()
+                    cached = self.cache.revalidated_response(url)
+                    if cached:
+                        self.circuit_breaker.record_success(url)
+                        return cached
+                    response = self.send(url, policy.timeout, stream=stream)
+                    self.metrics.inc('whitopia_http_requests_total', status=response.status_code)
+                
                 response.raise_for_status()
+                self.circuit_breaker.record_success(url)
                 response.encoding = 'utf-8'
+                if stream:
+                    # 串流內容在呼叫者 close() 時才知道實際讀取的大小
+                    response.on_close(lambda size: self.metrics.observe(
+                        'whitopia_http_response_bytes', size, buckets=BYTES_BUCKETS))
+                    if self.cache:
+                        response.on_body(lambda content: self.cache.store(url, response, content))
+                    return response
+                self.metrics.observe('whitopia_http_response_bytes', len(response.content), buckets=BYTES_BUCKETS)
+                if self.cache:
+                    self.cache.store(url, response)
                 return response
+            except CircuitOpenError as e:
+                self.log(f"跳過請求: {e}")
+                self.retry_stats.add('circuit_rejections')
+                self.metrics.inc('whitopia_http_errors_total', error=type(e).__name__)
+                raise
             except requests.RequestException as e:
-                print(f"嘗試 {attempt + 1} 失敗: {e}")
-                if attempt < retries - 1:
-                    time.sleep(2)
+                # 串流回應出錯時先關閉，釋放連接名額後才等待重試
+                if stream and response is not None:
+                    response.close()
+                self.log(f"嘗試 {attempt + 1} 失敗: {e}")
+                self.metrics.inc('whitopia_http_errors_total', error=type(e).__name__)
+                if is_host_failure(e):
+                    self.circuit_breaker.record_failure(url)
                 else:
+                    # 404 等客戶端錯誤表示主機正常回應
+                    self.circuit_breaker.record_success(url)
+                if attempt == attempts - 1 or not policy.is_retryable(e):
+                    self.retry_stats.add('giveups')
                     raise
+                
+                delay, from_retry_after = policy.delay(attempt, getattr(e, 'response', None))
+                self.retry_stats.add('retries')
+                self.retry_stats.add('sleep_seconds', delay)
+                if from_retry_after:
+                    self.retry_stats.add('retry_after_waits')
+                self.metrics.inc('whitopia_http_retries_total')
+                time.sleep(delay)
+            except BaseException:
+                # 試探請求因其他錯誤（如讀取快取失敗或中斷）沒有結果時放棄它，
+                # 否則斷路器會一直拒絕該主機
+                if probe:
+                    self.circuit_breaker.release_probe(url)
+                raise
     
     def scrape_news_list(self):
         """抓取お知らせ列表"""
-        print("正在抓取主頁面...")
+        return list(self.iter_news_list())
+    
+    def iter_news_list(self):
+        """
+        逐項抓取お知らせ列表：每解析出一個項目就返回，不等整頁解析完
+        
+        頁面未變更時返回上次的解析結果；抓取或解析失敗時記錄錯誤並停止
+        """
+        self.log("正在抓取主頁面...")
         
         try:
             response = self.get_page(self.base_url)
-            soup = BeautifulSoup(response.text, 'html.parser')
+            version = self.parse_version(self.base_url)
             
-            # 尋找お知らせ相關的元素
-            news_items = []
+            # 頁面未變更時直接使用上次的解析結果
+            if getattr(response, 'not_modified', False):
+                cached_items = self.cache.get_parsed(self.base_url, version)
+                if cached_items is not None:
+                    self.log("頁面未變更，使用快取的解析結果")
+                    yield from cached_items
+                    return
             
-            # 常見的新聞/公告選擇器
-            selectors = [
-                '.news-item', '.news-list li', '.information-item',
-                '.notice-item', '.announcement-item', 'article',
-                '.post', '.entry', '.item'
-            ]
+            # 只有使用快取時才需要保留整個列表
+            parsed = [] if self.cache else None
+            count = 0
+            for item in self.timed_items(self.iter_list_page_items(response.text, self.base_url), 'list'):
+                count += 1
+                if parsed is not None:
+                    parsed.append(item)
+                yield item
+            self.metrics.inc('whitopia_news_items_total', count)
+            if self.cache:
+                self.cache.store_parsed(self.base_url, parsed, version)
             
-            # 嘗試不同的選擇器
-            for selector in selectors:
-                items = soup.select(selector)
-                if items:
-                    print(f"找到 {len(items)} 個項目使用選擇器: {selector}")
-                    for item in items:
-                        news_items.append(self.parse_news_item(item))
+        except Exception as e:
+            self.log(f"抓取失敗: {e}")
+            self.last_error = e
+    
+    def timed_items(self, items, page, elapsed=0.0):
+        """逐項返回 items，只把產生項目（解析）的時間記錄到 whitopia_parse_seconds，不包括呼叫者處理項目的時間"""
+        iterator = iter(items)
+        try:
+            while True:
+                start = time.perf_counter()
+                try:
+                    item = next(iterator)
+                except StopIteration:
                     break
+                finally:
+                    elapsed += time.perf_counter() - start
+                yield item
+        finally:
+            self.metrics.observe('whitopia_parse_seconds', elapsed, page=page)
+    
+    def iter_list_page_items(self, html, page_url):
+        """解析列表頁並逐項返回；已知網站使用的選擇器時，先只解析該選擇器需要的子樹"""
+        remembered = self.selector_memory.get(self.site_key(page_url))
+        strainer = selector_strainer(remembered)
+        if strainer is not None:
+            found = False
+            soup = BeautifulSoup(html, self.parser, parse_only=strainer)
+            for item in self.iter_selected_items(soup, page_url, [remembered]):
+                found = True
+                yield item
+            if found:
+                return
+        
+        yield from self.iter_page_items(BeautifulSoup(html, self.parser), page_url)
+    
+    def parse_version(self, page_url):
+        """
+        列表解析規則的版本：由 PARSE_LOGIC_VERSION、解析器、選擇器列表、
+        網站記住的選擇器及日期模式計算，任何一項改變都使快取的解析結果失效
+        """
+        parts = [str(PARSE_LOGIC_VERSION), self.parser, NEWS_DATE_PATTERN.pattern,
+                 self.selector_memory.get(self.site_key(page_url)) or '']
+        parts.extend(self.news_selectors)
+        return hashlib.sha1('\x00'.join(parts).encode('utf-8')).hexdigest()[:16]
+    
+    def parse_news_list(self, soup, page_url):
+        """從已解析的頁面中提取新聞項目"""
+        return list(self.iter_page_items(soup, page_url))
+    
+    def iter_page_items(self, soup, page_url):
+        """從已解析的頁面中逐項提取新聞項目"""
+        site = self.site_key(page_url)
+        remembered = self.selector_memory.get(site)
+        
+        # 先嘗試上次成功的選擇器，省去逐個探測
+        found = False
+        if remembered != TEXT_FALLBACK:
+            selectors = self.news_selectors
+            if remembered:
+                selectors = [remembered] + [sel for sel in self.news_selectors if sel != remembered]
+            for item in self.iter_selected_items(soup, page_url, selectors):
+                found = True
+                yield item
+        if found:
+            return
+        
+        # 如果沒有找到特定結構，嘗試尋找包含日期和文字的元素
+        for item in self.iter_news_text(soup, page_url):
+            if not found:
+                found = True
+                self.remember_selector(site, TEXT_FALLBACK)
+            yield item
+        if not found and remembered == TEXT_FALLBACK:
+            # 網站結構可能已改變，重新探測所有選擇器
+            yield from self.iter_selected_items(soup, page_url, self.news_selectors)
+    
+    def iter_selected_items(self, soup, page_url, selectors):
+        """依次嘗試選擇器，使用第一個找到項目的選擇器並記住它，逐項返回解析結果"""
+        for selector in selectors:
+            items = soup.select(selector)
+            if items:
+                self.log(f"找到 {len(items)} 個項目使用選擇器: {selector}")
+                self.remember_selector(self.site_key(page_url), selector)
+                for item in items:
+                    # 解析失敗的項目（None）不返回，結果文件中不會出現 null
+                    parsed = self.parse_news_item(item, page_url)
+                    if parsed is not None:
+                        yield parsed
+                return
+    
+    def iter_news_text(self, soup, page_url):
+        """備用解析：把頁面文字中包含日期的行作為新聞項目"""
+        self.log("嘗試尋找包含日期的文字...")
+        all_text = soup.get_text()
+        
+        # 尋找所有包含日期的行
+        for line in all_text.split('\n'):
+            line = line.strip()
+            if len(line) > 10 and NEWS_DATE_PATTERN.search(line):
+                yield {
+                    'date': self.extract_date(line),
+                    'title': line,
+                    'content': line,
+                    'url': page_url
+                }
+    
+    def site_key(self, url):
+        """選擇器記錄按網站（主機名）區分"""
+        return urllib.parse.urlsplit(url).netloc
+    
+    def load_selector_memory(self):
+        """載入每個網站上次成功使用的選擇器"""
+        if not self.selector_memory_file:
+            return {}
+        try:
+            with open(self.selector_memory_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+    
+    def remember_selector(self, site, selector):
+        """記住網站使用的選擇器，下次直接使用"""
+        if self.selector_memory.get(site) == selector:
+            return
+        self.selector_memory[site] = selector
+        if self.selector_memory_file:
+            with open(self.selector_memory_file, 'w', encoding='utf-8') as f:
+                json.dump(self.selector_memory, f, ensure_ascii=False, indent=2)
+    
+    def find_next_page(self, soup, page_url):
+        """尋找列表頁的下一頁鏈接"""
+        link = soup.select_one('a[rel~="next"], link[rel~="next"], .next a, a.next, .nextpostslink')
+        if not link:
+            for a in soup.find_all('a', href=True):
+                if a.get_text().strip() in NEXT_PAGE_TEXTS:
+                    link = a
+                    break
+        
+        if link and link.get('href'):
+            next_url = urllib.parse.urljoin(page_url, link['href'])
+            if next_url != page_url:
+                return next_url
+        return None
+    
+    def news_item_key(self, item):
+        """新聞項目的唯一鍵"""
+        return news_item_key(item)
+    
+    def load_checkpoint(self, checkpoint_file):
+        """載入爬取進度"""
+        try:
+            with open(checkpoint_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except json.JSONDecodeError:
+            self.log(f"進度文件格式錯誤，將重新開始: {checkpoint_file}")
+            return {}
+    
+    def save_checkpoint(self, checkpoint, checkpoint_file):
+        """保存爬取進度（先寫臨時文件再替換，避免中斷時損壞）"""
+        tmp_file = checkpoint_file + '.tmp'
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(checkpoint, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_file, checkpoint_file)
+    
+    def crawl_news_archive(self, archive_url=None, checkpoint_file='whitopia_checkpoint.json', max_pages=100):
+        """
+        逐頁爬取お知らせ列表/歸檔頁，並將進度保存到 checkpoint_file
+        
+        - 中斷後再次執行時，從上次未完成的頁面繼續
+        - 遇到之前已完成的爬取中見過的項目時提前停止
+        返回本次爬取找到的新項目
+        """
+        return list(self.iter_news_archive(archive_url, checkpoint_file, max_pages))
+    
+    def iter_news_archive(self, archive_url=None, checkpoint_file='whitopia_checkpoint.json', max_pages=100):
+        """
+        與 crawl_news_archive 相同，但每解析出一個新項目就返回
+        
+        從中斷處繼續時，先返回上次已找到的項目；每頁的進度在該頁項目全部返回後才保存
+        """
+        checkpoint = self.load_checkpoint(checkpoint_file)
+        seen_keys = set(checkpoint.get('seen_keys', []))
+        run = checkpoint.get('in_progress')
+        
+        if run:
+            self.log(f"從第 {run['page']} 頁繼續上次未完成的爬取: {run['next_url']}")
+        else:
+            run = {
+                'started': datetime.now().isoformat(),
+                'page': 1,
+                'next_url': archive_url or self.archive_url,
+                'items': []
+            }
+        run_keys = set(self.news_item_key(item) for item in run['items'])
+        yield from run['items']
+        
+        reached_seen = False
+        pages_fetched = 0
+        while run['next_url'] and pages_fetched < max_pages:
+            page_url = run['next_url']
+            self.log(f"正在抓取第 {run['page']} 頁: {page_url}")
             
-            # 如果沒有找到特定結構，嘗試尋找包含日期和文字的元素
-            if not news_items:
-                print("嘗試尋找包含日期的文字...")
-                date_pattern = r'(\d{4})[年/.-](\d{1,2})[月/.-](\d{1,2})'
-                all_text = soup.get_text()
-                
-                # 尋找所有包含日期的行
-                lines = all_text.split('\n')
-                for line in lines:
-                    line = line.strip()
-                    if re.search(date_pattern, line) and len(line) > 10:
-                        news_items.append({
-                            'date': self.extract_date(line),
-                            'title': line,
-                            'content': line,
-                            'url': self.base_url
-                        })
+            response = self.get_page(page_url)
+            start = time.perf_counter()
+            soup = BeautifulSoup(response.text, self.parser)
+            page_items = self.timed_items(self.iter_page_items(soup, page_url), 'archive',
+                                          time.perf_counter() - start)
+            pages_fetched += 1
             
-            return news_items
+            count = 0
+            for item in page_items:
+                count += 1
+                if not item:
+                    continue
+                key = self.news_item_key(item)
+                if key in seen_keys:
+                    reached_seen = True
+                    break
+                # 新項目發佈後舊項目會被擠到下一頁，同一次爬取中的重複項目直接跳過
+                if key not in run_keys:
+                    run_keys.add(key)
+                    run['items'].append(item)
+                    yield item
+            page_items.close()
+            self.metrics.inc('whitopia_news_items_total', count)
             
-        except Exception as e:
-            print(f"抓取失敗: {e}")
-            return []
+            run['last_page_url'] = page_url
+            run['next_url'] = None if reached_seen else self.find_next_page(soup, page_url)
+            if run['next_url']:
+                run['page'] += 1
+            
+            checkpoint['in_progress'] = run
+            self.save_checkpoint(checkpoint, checkpoint_file)
+        
+        if run['next_url']:
+            self.log(f"已達頁數上限 {max_pages}，下次執行將從第 {run['page']} 頁繼續")
+            return
+        
+        if reached_seen:
+            self.log("遇到已爬取過的項目，提前停止")
+        
+        # 完成本次爬取：記錄最新項目並合併已見過的鍵
+        new_items = run['items']
+        dated = [item for item in new_items if item.get('date')]
+        if dated:
+            newest = max(dated, key=lambda x: x['date'])
+            checkpoint['last_seen_date'] = newest['date']
+            checkpoint['last_seen_url'] = newest['url']
+        
+        new_keys = [self.news_item_key(item) for item in new_items]
+        checkpoint['seen_keys'] = (new_keys + [k for k in checkpoint.get('seen_keys', []) if k not in run_keys])[:MAX_SEEN_KEYS]
+        checkpoint['last_page'] = run['page']
+        checkpoint['last_page_url'] = run.get('last_page_url')
+        checkpoint['last_run'] = datetime.now().isoformat()
+        checkpoint.pop('in_progress', None)
+        self.save_checkpoint(checkpoint, checkpoint_file)
+        
+        self.log(f"歸檔爬取完成，共 {len(new_items)} 個新項目")
+    
+    def run_archive_crawl(self, output_file='whitopia_archive.json', checkpoint_file='whitopia_checkpoint.json', max_pages=100):
+        """執行歸檔爬取，並把新項目合併到 output_file（.msgpack 保存為 MessagePack）"""
+        self.log("=" * 50)
+        self.log("Whitopia.jp お知らせ 歸檔爬取開始")
+        self.log("=" * 50)
+        
+        new_items = self.crawl_news_archive(checkpoint_file=checkpoint_file, max_pages=max_pages)
+        
+        # 無法解碼或不符合 schema 的歸檔引發 ValueError，不會被新結果覆蓋
+        try:
+            archive = load_news(output_file)
+        except FileNotFoundError:
+            archive = {}
+        archived = archive.get('all_news', [])
+        
+        known = set(self.news_item_key(item) for item in archived)
+        news_items = [item for item in new_items if self.news_item_key(item) not in known] + archived
+        store_news = self.filter_store_opening_news(news_items)
+        
+        results = {
+            'scrape_time': datetime.now().isoformat(),
+            'total_items': len(news_items),
+            'store_related_items': len(store_news),
+            'all_news': news_items,
+            'store_news': store_news
+        }
+        
+        dump(results, output_file)
+        
+        self.log(f"\n新增 {len(new_items)} 個項目，歸檔共 {len(news_items)} 個項目，已保存到 {output_file}")
+        return results
     
-    def parse_news_item(self, item):
+    def parse_news_item(self, item, page_url=None):
         """解析單個新聞項目"""
         try:
             # 提取日期
             date_text = ""
-            date_elements = item.find_all(text=re.compile(r'\d{4}[年/.-]\d{1,2}[月/.-]\d{1,2}'))
+            date_elements = item.find_all(text=NEWS_DATE_PATTERN)
             if date_elements:
                 date_text = date_elements[0].strip()
             
@@ -108,134 +616,229 @@ class WhitopiaScraper:
             link = ""
             link_elem = item.find('a')
             if link_elem and link_elem.get('href'):
-                link = urllib.parse.urljoin(self.base_url, link_elem['href'])
+                link = urllib.parse.urljoin(page_url or self.base_url, link_elem['href'])
             
             return {
                 'date': self.extract_date(date_text + " " + title),
                 'title': title,
                 'content': item.get_text().strip(),
-                'url': link or self.base_url
+                'url': link or page_url or self.base_url
             }
             
         except Exception as e:
-            print(f"解析項目失敗: {e}")
+            self.log(f"解析項目失敗: {e}")
             return None
     
     def extract_date(self, text):
         """從文字中提取日期"""
-        date_patterns = [
-            r'(\d{4})[年](\d{1,2})[月](\d{1,2})[日]',
-            r'(\d{4})[/](\d{1,2})[/](\d{1,2})',
-            r'(\d{4})[-](\d{1,2})[-](\d{1,2})',
-            r'(\d{4})[.](\d{1,2})[.](\d{1,2})'
-        ]
-        
-        for pattern in date_patterns:
-            match = re.search(pattern, text)
-            if match:
-                year, month, day = match.groups()
-                try:
-                    return f"{year}-{month.zfill(2)}-{day.zfill(2)}"
-                except:
-                    continue
-        
-        return ""
+        return extract_date(text)
     
-    def filter_store_opening_news(self, news_items):
+    def filter_store_opening_news(self, news_items, automaton=STORE_KEYWORD_AUTOMATON):
         """過濾出店鋪開業相關的新聞"""
-        store_keywords = [
-            '開店', '開業', 'オープン', 'OPEN', 'open', '新店',
-            '店舗', '出店', '開設', 'グランドオープン', 'プレオープン',
-            '新規', '新しい', '開始', 'スタート'
-        ]
-        
         store_news = []
-        for item in news_items:
-            if not item:
-                continue
+        with self.metrics.timer('whitopia_filter_seconds'):
+            for item in news_items:
+                if not item:
+                    continue
                 
-            text = (item.get('title', '') + ' ' + item.get('content', '')).lower()
-            
-            for keyword in store_keywords:
-                if keyword.lower() in text:
+                keyword = automaton.first(item.get('title', '') + ' ' + item.get('content', ''))
+                if keyword:
                     item['match_keyword'] = keyword
                     store_news.append(item)
-                    break
         
+        self.metrics.inc('whitopia_store_news_total', len(store_news))
         return store_news
     
     def scrape_detailed_page(self, url):
-        """抓取詳細頁面內容"""
+        """
+        抓取詳細頁面內容
+        
+        分塊讀取回應並增量提取文字（跳過腳本和樣式），最多讀取 detail_max_bytes；
+        detail_early_stop 時找到店名及開業日期後即停止讀取
+        """
         try:
-            response = self.get_page(url)
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            # 移除腳本和樣式
-            for script in soup(["script", "style"]):
-                script.decompose()
-            
-            content = soup.get_text()
-            return content.strip()
+            response = self.get_page(url, stream=True)
+            try:
+                with self.metrics.timer('whitopia_parse_seconds', page='detail'):
+                    stop = OpeningDetailsFound() if self.detail_early_stop else None
+                    return extract_text(response.iter_content(CHUNK_SIZE), self.detail_max_bytes, stop,
+                                        response.encoding)
+            finally:
+                # 提早停止時關閉連接，不讀取剩餘內容
+                response.close()
             
         except Exception as e:
-            print(f"抓取詳細頁面失敗 {url}: {e}")
+            self.log(f"抓取詳細頁面失敗 {url}: {e}")
+            self.last_error = e
             return ""
     
-    def run_scraper(self):
-        """執行爬蟲"""
-        print("=" * 50)
-        print("Whitopia.jp お知らせ 爬蟲開始")
-        print("=" * 50)
+    def scrape_detailed_pages(self, urls, max_workers=None):
+        """並發抓取多個詳細頁面，結果按輸入順序返回"""
+        fetcher = ConcurrentFetcher(self.scrape_detailed_page, max_workers or self.max_workers)
+        return fetcher.fetch_all(urls)
+    
+    def fetch_news_details(self, news_items):
+        """為有獨立鏈接的新聞項目抓取詳細頁面內容"""
+        items = [item for item in news_items
+                 if item and item.get('url') and item['url'] != self.base_url]
+        if not items:
+            return news_items
+        
+        self.log(f"正在並發抓取 {len(items)} 個詳細頁面...")
+        details = self.scrape_detailed_pages([item['url'] for item in items])
+        for item, detail in zip(items, details):
+            item['detail_content'] = detail
         
-        # 抓取新聞列表
+        return news_items
+    
+    def scrape(self, fetch_details=False):
+        """抓取並過濾新聞，只返回結構化結果（不輸出、不寫文件）"""
         news_items = self.scrape_news_list()
-        print(f"\n總共找到 {len(news_items)} 個項目")
+        self.log(f"\n總共找到 {len(news_items)} 個項目")
         
         # 過濾店鋪開業相關新聞
         store_news = self.filter_store_opening_news(news_items)
-        print(f"找到 {len(store_news)} 個可能與店鋪開業相關的項目")
+        self.log(f"找到 {len(store_news)} 個可能與店鋪開業相關的項目")
         
-        # 保存結果
-        results = {
+        # 抓取店鋪相關新聞的詳細頁面
+        if fetch_details:
+            self.fetch_news_details(store_news)
+        
+        return {
             'scrape_time': datetime.now().isoformat(),
             'total_items': len(news_items),
             'store_related_items': len(store_news),
             'all_news': news_items,
             'store_news': store_news
         }
+    
+    def default_renderers(self):
+        """終端輸出（安靜模式下省略）及 whitopia_news.json"""
+        renderers = [JsonRenderer('whitopia_news.json', quiet=self.quiet)]
+        if not self.quiet:
+            renderers.insert(0, ScrapeConsoleRenderer())
+        return renderers
+    
+    def run_scraper(self, fetch_details=False, db=None, renderers=None):
+        """
+        執行爬蟲
         
-        # 輸出結果
-        print("\n" + "=" * 50)
-        print("店鋪開業相關信息:")
-        print("=" * 50)
-        
-        if store_news:
-            for i, item in enumerate(store_news, 1):
-                print(f"\n{i}. 日期: {item.get('date', '未知')}")
-                print(f"   標題: {item.get('title', '無標題')}")
-                print(f"   關鍵詞: {item.get('match_keyword', '無')}")
-                print(f"   URL: {item.get('url', '無')}")
-                print(f"   內容預覽: {item.get('content', '')[:200]}...")
-        else:
-            print("未找到明確的店鋪開業信息")
-        
-        print("\n" + "=" * 50)
-        print("所有新聞項目:")
-        print("=" * 50)
+        renderers 預設為終端輸出及 whitopia_news.json；安靜模式下只保存 JSON
+        """
+        self.log("=" * 50)
+        self.log("Whitopia.jp お知らせ 爬蟲開始")
+        self.log("=" * 50)
         
-        for i, item in enumerate(news_items[:10], 1):  # 只顯示前10個
-            if item:
-                print(f"\n{i}. 日期: {item.get('date', '未知')}")
-                print(f"   標題: {item.get('title', '無標題')[:100]}")
-                print(f"   內容: {item.get('content', '')[:150]}...")
+        results = self.scrape(fetch_details)
         
-        # 保存到JSON文件
-        with open('whitopia_news.json', 'w', encoding='utf-8') as f:
-            json.dump(results, f, ensure_ascii=False, indent=2)
+        if renderers is None:
+            renderers = self.default_renderers()
+        render_all(renderers, results)
         
-        print(f"\n結果已保存到 whitopia_news.json")
+        # 寫入歷史資料庫
+        if db:
+            db.upsert_news_items(results['all_news'], results['scrape_time'])
+            self.log(f"新聞項目已寫入資料庫 {db.db_file}")
+        if self.cache:
+            self.log(f"快取統計: {self.cache.stats}")
+        self.log(f"重試統計: {self.retry_stats}")
         return results
 
+    def run_scraper_stream(self, output_file='whitopia_news.jsonl', automaton=STORE_KEYWORD_AUTOMATON,
+                           archive=False, checkpoint_file='whitopia_checkpoint.json', max_pages=100):
+        """
+        串流模式：每解析一個項目就寫出一行 JSON，
+        店鋪相關項目以 store_related 標記，不再另外複製一份
+        
+        archive=True 時逐頁爬取歸檔頁（與 crawl_news_archive 相同的進度及提前停止規則）
+        """
+        self.log("=" * 50)
+        self.log("Whitopia.jp お知らせ 爬蟲開始（串流模式）")
+        self.log("=" * 50)
+        
+        if archive:
+            news_items = self.iter_news_archive(checkpoint_file=checkpoint_file, max_pages=max_pages)
+        else:
+            news_items = self.iter_news_list()
+        
+        store_related = 0
+        with JsonlWriter(output_file, {'scrape_time': datetime.now().isoformat()}) as writer:
+            for item in news_items:
+                if not item:
+                    continue
+                
+                keyword = automaton.first(item.get('title', '') + ' ' + item.get('content', ''))
+                if keyword:
+                    item['match_keyword'] = keyword
+                    item['store_related'] = True
+                    store_related += 1
+                
+                writer.write(item)
+        
+        self.log(f"\n總共找到 {writer.count} 個項目，其中 {store_related} 個可能與店鋪開業相關")
+        self.log(f"結果已逐行保存到 {output_file}")
+        return {'total_items': writer.count, 'store_related_items': store_related}
+
+def main(argv=None):
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Whitopia.jp お知らせ爬蟲")
+    parser.add_argument('--details', action='store_true', help="並發抓取店鋪相關新聞的詳細頁面")
+    parser.add_argument('--workers', type=int, default=8, help="並發抓取的執行緒數")
+    parser.add_argument('--rate', type=float, default=2.0, help="每個主機每秒最多請求數")
+    parser.add_argument('--archive', action='store_true', help="逐頁爬取お知らせ歸檔，可中斷後繼續")
+    parser.add_argument('--archive-file', default='whitopia_archive.json',
+                        help="歸檔文件（.msgpack 保存為 MessagePack）")
+    parser.add_argument('--max-pages', type=int, default=100, help="歸檔爬取每次最多抓取的頁數")
+    parser.add_argument('--cache-dir', default='.whitopia_cache', help="HTTP 回應快取目錄")
+    parser.add_argument('--no-cache', action='store_true', help="不使用 HTTP 回應快取")
+    parser.add_argument('--jsonl', metavar='FILE', help="串流模式，逐項寫出 JSONL 到 FILE（與 --archive 同用時串流歸檔爬取）")
+    parser.add_argument('--db', metavar='FILE', help="把新聞項目寫入 SQLite 歷史資料庫")
+    parser.add_argument('--parser', choices=['lxml', 'html.parser'], default=DEFAULT_PARSER, help="HTML 解析器")
+    parser.add_argument('--max-attempts', type=int, default=3, help="每個請求的最大嘗試次數")
+    parser.add_argument('--connect-timeout', type=float, default=5.0, help="連接超時（秒）")
+    parser.add_argument('--read-timeout', type=float, default=15.0, help="讀取超時（秒）")
+    parser.add_argument('--detail-max-bytes', type=int, default=DEFAULT_MAX_BYTES, help="每個詳細頁面最多讀取的位元組數")
+    parser.add_argument('--detail-early-stop', action='store_true', help="詳細頁面找到店名及開業日期後即停止讀取")
+    parser.add_argument('--base-url', default=DEFAULT_BASE_URL, help="網站地址（可指向本地替身伺服器）")
+    parser.add_argument('--record', metavar='DIR', help="把收到的回應錄製到 DIR，供替身伺服器重播（建議同時使用 --no-cache）")
+    parser.add_argument('--quiet', action='store_true', help="安靜模式，不輸出進度及結果列表")
+    parser.add_argument('--metrics', metavar='BASENAME', help="記錄執行指標，結束時寫出 BASENAME.json 及 BASENAME.prom")
+    args = parser.parse_args(argv)
+    
+    cache = None if args.no_cache else ResponseCache(args.cache_dir)
+    metrics = None
+    if args.metrics:
+        from whitopia_metrics import Metrics
+        metrics = Metrics()
+    retry_policy = RetryPolicy(max_attempts=args.max_attempts, connect_timeout=args.connect_timeout,
+                               read_timeout=args.read_timeout)
+    scraper = WhitopiaScraper(max_workers=args.workers, rate_per_host=args.rate, cache=cache, parser=args.parser,
+                              metrics=metrics, quiet=args.quiet, retry_policy=retry_policy,
+                              detail_max_bytes=args.detail_max_bytes, detail_early_stop=args.detail_early_stop,
+                              base_url=args.base_url)
+    recorder = None
+    if args.record:
+        from whitopia_fixtures import FixtureArchive, FixtureRecorder
+        recorder = FixtureRecorder(FixtureArchive(args.record))
+        recorder.attach(scraper.session)
+    if args.jsonl:
+        scraper.run_scraper_stream(args.jsonl, archive=args.archive, max_pages=args.max_pages)
+    elif args.archive:
+        scraper.run_archive_crawl(output_file=args.archive_file, max_pages=args.max_pages)
+    else:
+        db = None
+        if args.db:
+            from whitopia_db import WhitopiaDB
+            db = WhitopiaDB(args.db)
+        scraper.run_scraper(fetch_details=args.details, db=db)
+    
+    if recorder:
+        print(f"錄製目錄 {args.record} 共有 {len(recorder.archive)} 個回應")
+    if metrics:
+        metrics.write(args.metrics)
+        print(f"執行指標已保存到 {args.metrics}.json 及 {args.metrics}.prom")
+
+
 if __name__ == "__main__":
-    scraper = WhitopiaScraper()
-    scraper.run_scraper()
\ No newline at end of file
+    main()
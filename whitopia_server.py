@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Whitopia.jp 開業信息查詢服務
+載入改進版分析器的結果，在記憶體中按都道府縣、月份及店名建立索引，
+以 HTTP/JSON 回答篩選及日期範圍查詢。分析結果文件更新後自動重新載入
+"""
+
+import bisect
+import json
+import os
+import threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+from whitopia_codec import load_analysis
+from whitopia_records import date_bounds
+from whitopia_stream import is_jsonl, iter_jsonl
+
+# 查詢結果返回的欄位（不含全文）
+RESULT_FIELDS = ('store_name', 'prefecture', 'city', 'date', 'match_keyword', 'url')
+
+
+class OpeningIndex:
+    """店鋪記錄及其索引（建立後不再修改，可在多個執行緒間共用）"""
+
+    def __init__(self, records):
+        # 按日期升序排列，日期範圍查詢以二分搜尋找出區間
+        self.records = sorted(
+            ({field: record.get(field) or '' for field in RESULT_FIELDS} for record in records),
+            key=lambda x: x['date']
+        )
+        self.dates = [record['date'] for record in self.records]
+        self.by_prefecture = {}
+        self.by_month = {}
+        self.by_store = {}
+        for i, record in enumerate(self.records):
+            if record['prefecture']:
+                self.by_prefecture.setdefault(record['prefecture'], []).append(i)
+            if record['date']:
+                self.by_month.setdefault(record['date'][:7], []).append(i)
+            if record['store_name']:
+                self.by_store.setdefault(record['store_name'], []).append(i)
+
+    def date_range(self, since=None, until=None):
+        """日期在範圍內的記錄位置 (start, end)"""
+        low, high = date_bounds(since, until)
+        start = bisect.bisect_left(self.dates, low) if low else 0
+        end = bisect.bisect_right(self.dates, high) if high else len(self.dates)
+        return start, end
+
+    def query(self, prefecture=None, month=None, store_name=None, since=None, until=None, limit=None):
+        """按條件查詢，最新的在前"""
+        start, end = self.date_range(since, until) if since or until else (0, len(self.records))
+
+        # 以最小的索引列表作為候選，再檢查其他條件
+        candidates = None
+        for index, key in ((self.by_prefecture, prefecture), (self.by_month, month), (self.by_store, store_name)):
+            if key:
+                positions = index.get(key, [])
+                if candidates is None or len(positions) < len(candidates):
+                    candidates = positions
+        if candidates is None:
+            positions = range(end - 1, start - 1, -1)
+        else:
+            positions = [i for i in reversed(candidates) if start <= i < end]
+
+        results = []
+        for i in positions:
+            record = self.records[i]
+            if prefecture and record['prefecture'] != prefecture:
+                continue
+            if month and record['date'][:7] != month:
+                continue
+            if store_name and record['store_name'] != store_name:
+                continue
+            results.append(record)
+            if limit and len(results) >= limit:
+                break
+        return results
+
+    def stats(self):
+        return {
+            'total_stores': len(self.records),
+            'monthly_stats': {month: len(positions) for month, positions in sorted(self.by_month.items(), reverse=True)},
+            'prefecture_stats': dict(sorted(((prefecture, len(positions)) for prefecture, positions in self.by_prefecture.items()),
+                                            key=lambda x: x[1], reverse=True))
+        }
+
+
+def load_records(path):
+    """讀取分析結果（.json / .msgpack 的 store_openings 或串流 .jsonl）"""
+    if is_jsonl(path):
+        return list(iter_jsonl(path))
+    return load_analysis(path).get('store_openings', [])
+
+
+class OpeningService:
+    """
+    持有目前的索引和查詢結果快取
+
+    每次請求時檢查文件的修改時間，文件更新後重建索引並清空快取
+    """
+
+    def __init__(self, path, cache_size=256):
+        self.path = path
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+        self.index = None
+        self.mtime = None
+        self.loads = 0
+        self._lock = threading.Lock()
+        self.reload_if_changed()
+
+    def reload_if_changed(self):
+        mtime = os.stat(self.path).st_mtime_ns
+        if mtime == self.mtime:
+            return False
+        with self._lock:
+            if mtime == self.mtime:
+                return False
+            self.index = OpeningIndex(load_records(self.path))
+            self.mtime = mtime
+            self.cache.clear()
+            self.loads += 1
+        print(f"已載入 {self.path}: {len(self.index.records)} 筆店鋪記錄")
+        return True
+
+    def handle(self, route, params):
+        """返回 (狀態碼, JSON 位元組)；相同的查詢直接返回快取的結果"""
+        try:
+            self.reload_if_changed()
+        except (OSError, ValueError) as e:
+            # 文件正在被替換或暫時無法讀取時繼續使用舊的索引
+            print(f"重新載入失敗，繼續使用舊數據: {e}")
+
+        key = (route, tuple(sorted(params.items())))
+        with self._lock:
+            body = self.cache.get(key)
+            if body is not None:
+                self.cache.move_to_end(key)
+                return 200, body
+            index = self.index
+
+        status, result = self.dispatch(index, route, params)
+        body = json.dumps(result, ensure_ascii=False).encode('utf-8')
+        if status == 200:
+            with self._lock:
+                self.cache[key] = body
+                if len(self.cache) > self.cache_size:
+                    self.cache.popitem(last=False)
+        return status, body
+
+    def dispatch(self, index, route, params):
+        if route == '/openings':
+            try:
+                limit = int(params['limit']) if params.get('limit') else None
+            except ValueError:
+                return 400, {'error': 'limit 必須是整數'}
+            results = index.query(
+                prefecture=params.get('prefecture'),
+                month=params.get('month'),
+                store_name=params.get('store'),
+                since=params.get('since'),
+                until=params.get('until'),
+                limit=limit
+            )
+            return 200, {'count': len(results), 'openings': results}
+        if route == '/stats':
+            return 200, index.stats()
+        if route == '/prefectures':
+            return 200, sorted(index.by_prefecture)
+        if route == '/months':
+            return 200, sorted(index.by_month, reverse=True)
+        if route == '/health':
+            return 200, {'status': 'ok', 'records': len(index.records), 'loads': self.loads}
+        return 404, {'error': f'未知的路徑: {route}'}
+
+
+class OpeningRequestHandler(BaseHTTPRequestHandler):
+    service = None
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        status, body = self.service.handle(url.path.rstrip('/') or '/', dict(parse_qsl(url.query)))
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def make_server(service, host='127.0.0.1', port=8080):
+    handler = type('Handler', (OpeningRequestHandler,), {'service': service})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Whitopia.jp 開業信息查詢服務")
+    parser.add_argument('input', nargs='?', default='whitopia_detailed_analysis.json',
+                        help="改進版分析器的結果（.json 或 .jsonl）")
+    parser.add_argument('--host', default='127.0.0.1', help="監聽地址")
+    parser.add_argument('--port', type=int, default=8080, help="監聽端口")
+    parser.add_argument('--cache-size', type=int, default=256, help="快取的查詢結果數量")
+    args = parser.parse_args(argv)
+
+    server = make_server(OpeningService(args.input, args.cache_size), args.host, args.port)
+    print(f"查詢服務已啟動: http://{args.host}:{args.port}/openings?prefecture=香川県&since=2025-06")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+多網站爬取
+從設定文件載入每個網站的定義（網址、列表選擇器、關鍵詞、店名模式及額外地名），
+以執行緒池同時爬取多個網站：全部網站共用一個連接數上限，每個網站另有自己的
+並發及速率限制。結果合併成一個輸出文件
+"""
+
+import contextlib
+import json
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from whitopia_codec import dump
+from whitopia_extract import STORE_KEYWORDS, STORE_NAME_PATTERNS, KeywordAutomaton, extract_record
+from whitopia_gazetteer import default_gazetteer, shared_gazetteer
+from whitopia_scraper import NEWS_SELECTORS, WhitopiaScraper
+
+DEFAULT_CONFIG_FILE = 'whitopia_sites.json'
+
+
+def compile_patterns(patterns, default):
+    if not patterns:
+        return default
+    return tuple(re.compile(pattern) for pattern in patterns)
+
+
+class SiteConfig:
+    """一個網站的定義；沒有指定的項目使用 Whitopia 的預設值"""
+
+    def __init__(self, name, base_url, selectors=None, keywords=None,
+                 store_name_patterns=None, gazetteer_csv=None,
+                 rate_per_host=1.0, max_connections=2):
+        self.name = name
+        self.base_url = base_url.rstrip('/')
+        self.selectors = list(selectors or NEWS_SELECTORS)
+        self.keywords = list(keywords or STORE_KEYWORDS)
+        self.automaton = KeywordAutomaton(self.keywords)
+        self.store_name_patterns = compile_patterns(store_name_patterns, STORE_NAME_PATTERNS)
+        self.gazetteer = shared_gazetteer()
+        if gazetteer_csv:
+            # 在內建地名之外加入本網站的地名（如店名中使用的地區名）
+            self.gazetteer = default_gazetteer()
+            self.gazetteer.load_csv(gazetteer_csv)
+        self.rate_per_host = rate_per_host
+        self.max_connections = max(1, max_connections)
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**data)
+
+    def extract_record(self, item):
+        """以本網站的關鍵詞及模式提取店鋪記錄"""
+        record = extract_record(item, self.automaton, self.store_name_patterns, self.gazetteer)
+        record['site'] = self.name
+        return record
+
+
+def load_sites(path=DEFAULT_CONFIG_FILE):
+    """載入設定文件：{"sites": [{"name": ..., "base_url": ..., ...}, ...]}"""
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    return [SiteConfig.from_dict(site) for site in data['sites']]
+
+
+class SiteScraper(WhitopiaScraper):
+    """
+    按網站定義設定的爬蟲
+
+    每個請求先取得網站自己的連接名額，再取得全局連接名額；名額只在發送請求及讀取
+    回應內容期間佔用，重試等待時已釋放
+    """
+
+    def __init__(self, site, budget, cache=None, parser=None, metrics=None):
+        # 多個網站同時寫入同一個選擇器記錄文件會互相覆蓋，只保留在記憶體中
+        super().__init__(max_workers=site.max_connections, rate_per_host=site.rate_per_host,
+                         cache=cache, parser=parser, selector_memory_file=None,
+                         metrics=metrics, quiet=True)
+        self.site = site
+        self.base_url = site.base_url
+        self.archive_url = site.base_url + '/news/'
+        self.news_selectors = site.selectors
+        self.budget = budget
+        self.site_slots = threading.BoundedSemaphore(site.max_connections)
+
+    @contextlib.contextmanager
+    def connection_slot(self, url):
+        with self.site_slots, self.budget:
+            yield
+
+    def filter_store_opening_news(self, news_items, automaton=None):
+        return super().filter_store_opening_news(news_items, automaton or self.site.automaton)
+
+
+class MultiSiteCrawler:
+    """並行爬取多個網站並合併結果"""
+
+    def __init__(self, sites, max_workers=4, max_connections=8, fetch_details=False,
+                 cache=None, parser=None, metrics=None):
+        self.sites = sites
+        self.max_workers = max(1, max_workers)
+        self.budget = threading.BoundedSemaphore(max(1, max_connections))
+        self.fetch_details = fetch_details
+        self.cache = cache
+        self.parser = parser
+        self.metrics = metrics
+
+    def crawl_site(self, site):
+        """爬取一個網站，返回該網站的結果（失敗時含 error）"""
+        try:
+            scraper = SiteScraper(site, self.budget, self.cache, self.parser, self.metrics)
+            results = scraper.scrape(self.fetch_details)
+        except Exception as e:
+            return {'site': site.name, 'base_url': site.base_url, 'error': str(e),
+                    'all_news': [], 'store_news': [], 'store_openings': []}
+
+        for item in results['all_news']:
+            if item:
+                item['site'] = site.name
+        if scraper.last_error is not None:
+            results['error'] = str(scraper.last_error)
+        results['site'] = site.name
+        results['base_url'] = site.base_url
+        results['store_openings'] = [site.extract_record(item) for item in results['store_news']]
+        return results
+
+    def run(self):
+        """爬取所有網站，返回合併後的結果"""
+        all_news = []
+        store_news = []
+        store_openings = []
+        site_summaries = []
+
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(self.sites) or 1)) as executor:
+            for result in executor.map(self.crawl_site, self.sites):
+                all_news.extend(result['all_news'])
+                store_news.extend(result['store_news'])
+                store_openings.extend(result['store_openings'])
+
+                summary = {
+                    'name': result['site'],
+                    'base_url': result['base_url'],
+                    'total_items': len(result['all_news']),
+                    'store_related_items': len(result['store_news']),
+                    'store_openings': len(result['store_openings'])
+                }
+                if 'error' in result:
+                    summary['error'] = result['error']
+                site_summaries.append(summary)
+
+        store_openings.sort(key=lambda x: x['date'] or '0000-00-00', reverse=True)
+        return {
+            'scrape_time': datetime.now().isoformat(),
+            'total_items': len(all_news),
+            'store_related_items': len(store_news),
+            'sites': site_summaries,
+            'all_news': all_news,
+            'store_news': store_news,
+            'store_openings': store_openings
+        }
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="多網站爬取")
+    parser.add_argument('--config', default=DEFAULT_CONFIG_FILE, help="網站設定文件")
+    parser.add_argument('--site', action='append', help="只爬取指定名稱的網站（可重複）")
+    parser.add_argument('--workers', type=int, default=4, help="同時爬取的網站數")
+    parser.add_argument('--max-connections', type=int, default=8, help="全部網站共用的最大連接數")
+    parser.add_argument('--details', action='store_true', help="抓取店鋪相關新聞的詳細頁面")
+    parser.add_argument('--cache-dir', default='.whitopia_cache', help="HTTP 回應快取目錄")
+    parser.add_argument('--no-cache', action='store_true', help="不使用 HTTP 回應快取")
+    parser.add_argument('--output', default='whitopia_multisite.json', help="合併結果的輸出文件（.msgpack 保存為 MessagePack）")
+    args = parser.parse_args(argv)
+
+    sites = load_sites(args.config)
+    if args.site:
+        sites = [site for site in sites if site.name in args.site]
+
+    cache = None
+    if not args.no_cache:
+        from whitopia_cache import ResponseCache
+        cache = ResponseCache(args.cache_dir)
+
+    print(f"正在爬取 {len(sites)} 個網站（最多 {args.max_connections} 個連接）...")
+    crawler = MultiSiteCrawler(sites, args.workers, args.max_connections, args.details, cache)
+    result = crawler.run()
+
+    dump(result, args.output)
+
+    for site in result['sites']:
+        status = f"失敗: {site['error']}" if 'error' in site else \
+            f"{site['total_items']} 個項目，{site['store_related_items']} 個店鋪相關"
+        print(f"  {site['name']}: {status}")
+    print(f"合併結果已保存到 {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Whitopia.jp 本地替身伺服器
+重播錄製的回應（whitopia_fixtures.py），或產生任意大小的模擬お知らせ歸檔（分頁列表及詳細頁面），
+並可注入延遲、錯誤（含 Retry-After）及 304 回應。爬蟲以 --base-url 指向它，
+即可離線、可重現地測試並發、快取及重試行為；--bench 直接在本進程內執行一次爬取並報告結果
+"""
+
+import hashlib
+import html
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+from whitopia_benchmark import make_news_item
+
+# 錄製內容中的真實網站地址，重播時改為替身伺服器的地址
+RECORDED_BASE_URL = 'https://www.whitopia.jp'
+
+
+def unit_value(seed, *parts):
+    """由種子及參數決定的 [0, 1) 之間的值（與執行緒的執行順序無關）"""
+    key = '|'.join(str(part) for part in (seed,) + parts)
+    return int.from_bytes(hashlib.sha1(key.encode('utf-8')).digest()[:8], 'big') / 2 ** 64
+
+
+class Faults:
+    """
+    注入的延遲及錯誤
+
+    每個路徑第 n 次請求的結果只由 (seed, 路徑, n) 決定，並發請求的先後順序不影響結果
+    """
+
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, error_status=503, retry_after=None, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.retry_after = retry_after
+        self.seed = seed
+
+    def delay(self, path, attempt):
+        return self.latency + self.jitter * unit_value(self.seed, 'latency', path, attempt)
+
+    def is_error(self, path, attempt):
+        return self.error_rate > 0 and unit_value(self.seed, 'error', path, attempt) < self.error_rate
+
+
+class SyntheticArchive:
+    """
+    模擬的お知らせ歸檔：count 個項目，每頁 page_size 個
+
+    / 及 /news/ 為第一頁，/news/page/N/ 為第 N 頁（有「次へ」鏈接），/news/<編號>/ 為詳細頁面；
+    detail_padding 為詳細頁面額外加入的腳本及文字位元組數，用於模擬大型活動頁面
+    """
+
+    def __init__(self, count, page_size=20, seed=0, detail_padding=0):
+        self.count = count
+        self.page_size = max(1, page_size)
+        self.seed = seed
+        self.detail_padding = detail_padding
+
+    @property
+    def page_count(self):
+        return max(1, -(-self.count // self.page_size))
+
+    def item(self, index):
+        item = make_news_item(random.Random(f"{self.seed}:{index}"), index)
+        item['url'] = f"/news/{index}/"
+        return item
+
+    def list_page(self, page):
+        if not 1 <= page <= self.page_count:
+            return None
+        start = (page - 1) * self.page_size
+        parts = ['<html><head><title>お知らせ</title><script>var x = 1;</script></head><body><main>']
+        for index in range(start, min(start + self.page_size, self.count)):
+            item = self.item(index)
+            parts.append(f'<div class="news-item"><span class="date">{item["date"]}</span>'
+                         f'<a href="{item["url"]}">{html.escape(item["title"])}</a>'
+                         f'<p>{html.escape(item["content"])}</p></div>')
+        if page < self.page_count:
+            parts.append(f'<a rel="next" href="/news/page/{page + 1}/">次へ</a>')
+        parts.append('</main></body></html>')
+        return ''.join(parts)
+
+    def detail_page(self, index):
+        if not 0 <= index < self.count:
+            return None
+        item = self.item(index)
+        parts = ['<html><head><title>お知らせ</title>']
+        if self.detail_padding:
+            parts.append(f'<script>var data = "{"x" * (self.detail_padding // 2)}";</script>')
+        parts.append(f'</head><body><article><h1>{html.escape(item["title"])}</h1>'
+                     f'<p>{item["date"]}</p><p>{html.escape(item["content"])}</p>')
+        if self.detail_padding:
+            parts.append('<p>' + 'ホワイトピアをご利用いただきありがとうございます。' * (self.detail_padding // 144) + '</p>')
+        parts.append('</article></body></html>')
+        return ''.join(parts)
+
+    def page(self, path):
+        """返回路徑對應的 HTML；不存在時返回 None"""
+        parts = [part for part in path.split('?')[0].split('/') if part]
+        if not parts or parts == ['news']:
+            return self.list_page(1)
+        if len(parts) == 3 and parts[:2] == ['news', 'page'] and parts[2].isdigit():
+            return self.list_page(int(parts[2]))
+        if len(parts) == 2 and parts[0] == 'news' and parts[1].isdigit():
+            return self.detail_page(int(parts[1]))
+        return None
+
+
+class StandinService:
+    """按路徑返回錄製或模擬的回應，並注入錯誤、延遲及 304"""
+
+    def __init__(self, fixtures=None, synthetic=None, faults=None, conditional=True):
+        self.fixtures = fixtures
+        self.synthetic = synthetic
+        self.faults = faults or Faults()
+        self.conditional = conditional
+        self._attempts = {}
+        self._lock = threading.Lock()
+        self.counts = {'requests': 0, 'ok': 0, 'errors': 0, 'not_modified': 0, 'not_found': 0, 'bytes': 0}
+
+    def count(self, field, value=1):
+        with self._lock:
+            self.counts[field] += value
+
+    def stats(self):
+        with self._lock:
+            return dict(self.counts)
+
+    def lookup(self, path, base_url):
+        """返回 (狀態碼, 標頭, 內容)；錄製的回應優先"""
+        if self.fixtures is not None:
+            entry, body = self.fixtures.lookup(path)
+            if entry is not None:
+                headers = dict(entry['headers'])
+                if 'Location' in headers:
+                    headers['Location'] = headers['Location'].replace(RECORDED_BASE_URL, base_url)
+                return entry['status'], headers, body.replace(RECORDED_BASE_URL.encode(), base_url.encode())
+        if self.synthetic is not None:
+            page = self.synthetic.page(path)
+            if page is not None:
+                return 200, {'Content-Type': 'text/html; charset=utf-8'}, page.encode('utf-8')
+        return 404, {'Content-Type': 'text/plain; charset=utf-8'}, b'not found'
+
+    def handle(self, path, request_headers, base_url):
+        with self._lock:
+            attempt = self._attempts.get(path, 0)
+            self._attempts[path] = attempt + 1
+            self.counts['requests'] += 1
+
+        delay = self.faults.delay(path, attempt)
+        if delay > 0:
+            time.sleep(delay)
+
+        if self.faults.is_error(path, attempt):
+            self.count('errors')
+            headers = {'Content-Type': 'text/plain; charset=utf-8'}
+            if self.faults.retry_after is not None:
+                headers['Retry-After'] = str(self.faults.retry_after)
+            return self.faults.error_status, headers, b'injected error'
+
+        status, headers, body = self.lookup(path, base_url)
+        if status == 404:
+            self.count('not_found')
+            return status, headers, body
+
+        if status == 200 and self.conditional:
+            headers.setdefault('ETag', '"' + hashlib.sha1(body).hexdigest()[:16] + '"')
+            if request_headers.get('If-None-Match') == headers['ETag'] or \
+                    (headers.get('Last-Modified') and request_headers.get('If-Modified-Since') == headers['Last-Modified']):
+                self.count('not_modified')
+                return 304, {'ETag': headers['ETag']}, b''
+
+        self.count('ok')
+        self.count('bytes', len(body))
+        return status, headers, body
+
+
+class StandinRequestHandler(BaseHTTPRequestHandler):
+    # 支援 keep-alive，讓爬蟲的連接池與真實網站一樣重用連接
+    protocol_version = 'HTTP/1.1'
+    service = None
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        path = url.path + ('?' + url.query if url.query else '')
+        base_url = f"http://{self.headers.get('Host') or '%s:%d' % self.server.server_address[:2]}"
+        status, headers, body = self.service.handle(path, self.headers, base_url)
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StandinHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # 爬蟲關閉閒置的 keep-alive 連接是正常情況，不輸出錯誤
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+def make_server(service, host='127.0.0.1', port=8081):
+    handler = type('Handler', (StandinRequestHandler,), {'service': service})
+    return StandinHTTPServer((host, port), handler)
+
+
+def run_benchmark(service, passes=2, max_workers=8, rate_per_host=0, max_pages=100, fetch_details=True,
+                  use_cache=True, max_attempts=3, backoff_base=0.05):
+    """
+    在背景執行緒啟動替身伺服器，以 WhitopiaScraper 爬取歸檔（及詳細頁面）passes 次
+
+    第二次以後的爬取使用同一個回應快取，可觀察條件請求及 304 的效果；返回每次的耗時及統計
+    """
+    import os
+    import tempfile
+
+    from whitopia_cache import ResponseCache
+    from whitopia_retry import RetryPolicy
+    from whitopia_scraper import WhitopiaScraper
+
+    server = make_server(service, port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    base_url = 'http://%s:%d' % server.server_address[:2]
+
+    results = []
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            cache = ResponseCache(os.path.join(tmp_dir, 'cache')) if use_cache else None
+            for run in range(1, passes + 1):
+                scraper = WhitopiaScraper(max_workers=max_workers, rate_per_host=rate_per_host, cache=cache,
+                                          selector_memory_file=None, quiet=True, base_url=base_url,
+                                          retry_policy=RetryPolicy(max_attempts=max_attempts, backoff_base=backoff_base))
+                before = service.stats()
+                start = time.perf_counter()
+                items = scraper.crawl_news_archive(
+                    checkpoint_file=os.path.join(tmp_dir, f'checkpoint{run}.json'), max_pages=max_pages)
+                store_news = scraper.filter_store_opening_news(items)
+                if fetch_details:
+                    scraper.fetch_news_details(store_news)
+                elapsed = time.perf_counter() - start
+                after = service.stats()
+                results.append({
+                    'pass': run,
+                    'seconds': round(elapsed, 3),
+                    'items': len(items),
+                    'store_items': len(store_news),
+                    'server': {field: after[field] - before[field] for field in after},
+                    'retry': scraper.retry_stats.as_dict(),
+                    'cache': dict(cache.stats) if cache else None
+                })
+    finally:
+        server.shutdown()
+        server.server_close()
+    return results
+
+
+def main(argv=None):
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="Whitopia.jp 本地替身伺服器")
+    parser.add_argument('--fixtures', metavar='DIR', help="重播的錄製目錄（爬蟲 --record 錄製）")
+    parser.add_argument('--synthetic', type=int, default=0, metavar='N', help="產生 N 個項目的模擬歸檔")
+    parser.add_argument('--page-size', type=int, default=20, help="模擬歸檔每頁的項目數")
+    parser.add_argument('--detail-padding', type=int, default=0, help="模擬詳細頁面額外的位元組數")
+    parser.add_argument('--latency', type=float, default=0.0, help="每個回應的固定延遲（秒）")
+    parser.add_argument('--jitter', type=float, default=0.0, help="額外的隨機延遲上限（秒）")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="返回錯誤的比例（0 ~ 1）")
+    parser.add_argument('--error-status', type=int, default=503, help="注入錯誤的狀態碼")
+    parser.add_argument('--retry-after', type=int, default=None, help="錯誤回應的 Retry-After 秒數")
+    parser.add_argument('--no-conditional', action='store_true', help="不支援條件請求（不返回 304）")
+    parser.add_argument('--seed', type=int, default=0, help="模擬內容及錯誤注入的種子")
+    parser.add_argument('--host', default='127.0.0.1', help="監聽地址")
+    parser.add_argument('--port', type=int, default=8081, help="監聽端口")
+    parser.add_argument('--bench', action='store_true', help="不持續服務，在本進程內執行爬取基準測試")
+    parser.add_argument('--passes', type=int, default=2, help="基準測試的爬取次數")
+    parser.add_argument('--workers', type=int, default=8, help="基準測試的並發數")
+    parser.add_argument('--rate', type=float, default=0, help="基準測試每個主機每秒最多請求數（0 為不限）")
+    parser.add_argument('--max-pages', type=int, default=100, help="基準測試最多爬取的列表頁數")
+    parser.add_argument('--no-details', action='store_true', help="基準測試不抓取詳細頁面")
+    parser.add_argument('--no-cache', action='store_true', help="基準測試不使用回應快取")
+    parser.add_argument('--output', metavar='FILE', help="把基準測試結果保存為 JSON")
+    args = parser.parse_args(argv)
+
+    fixtures = None
+    if args.fixtures:
+        from whitopia_fixtures import FixtureArchive
+        fixtures = FixtureArchive(args.fixtures)
+    synthetic = None
+    if args.synthetic or not fixtures:
+        synthetic = SyntheticArchive(args.synthetic or 200, args.page_size, args.seed, args.detail_padding)
+    faults = Faults(args.latency, args.jitter, args.error_rate, args.error_status, args.retry_after, args.seed)
+    service = StandinService(fixtures, synthetic, faults, conditional=not args.no_conditional)
+
+    if args.bench:
+        results = run_benchmark(service, args.passes, args.workers, args.rate, args.max_pages,
+                                not args.no_details, not args.no_cache)
+        for result in results:
+            server = result['server']
+            print(f"第 {result['pass']} 次: {result['seconds']:.3f} 秒，{result['items']} 個項目"
+                  f"（店鋪相關 {result['store_items']}），請求 {server['requests']} 個，"
+                  f"注入錯誤 {server['errors']} 個，304 {server['not_modified']} 個，"
+                  f"重試 {result['retry']['retries']} 次")
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                json.dump(results, f, ensure_ascii=False, indent=2)
+            print(f"基準測試結果已保存到 {args.output}")
+        return
+
+    server = make_server(service, args.host, args.port)
+    sources = []
+    if fixtures:
+        sources.append(f"錄製 {len(fixtures)} 個回應")
+    if synthetic:
+        sources.append(f"模擬 {synthetic.count} 個項目 / {synthetic.page_count} 頁")
+    print(f"替身伺服器已啟動: http://{args.host}:{args.port}/（{'，'.join(sources)}）")
+    print(f"爬蟲: python whitopia.py scrape --base-url http://{args.host}:{args.port} --rate 0")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    server.server_close()
+    print(f"請求統計: {service.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Whitopia.jp 命令行啟動時間基準測試
+在子進程中反覆啟動 whitopia 命令行並載入各子命令的模組，測量比空白直譯器多用的時間，
+並確認離線子命令沒有匯入網絡及 HTML 套件。
+測量前先編譯模組（避免 .pyc 過期時把編譯時間算進去），每次測量與空白直譯器交替執行，
+以每對的差取中位數，減少機器負載變化的影響
+"""
+
+import argparse
+import compileall
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+CLI_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# 離線子命令不應匯入的模組
+NETWORK_MODULES = ('requests', 'urllib3', 'bs4', 'lxml')
+
+# 常被腳本反覆呼叫的離線子命令（stats 的 NumPy 及 serve 的 http.server 本身載入較慢，需要時以 --commands 指定）
+OFFLINE_COMMANDS = ('analyze', 'report', 'batch')
+
+LOAD_COMMAND = (
+    "import sys, whitopia; whitopia.load_command({name!r}); "
+    "print(','.join(m for m in {modules!r} if m in sys.modules))"
+)
+
+
+def run_once(code):
+    """執行一次，返回 (耗時毫秒, 標準輸出)"""
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, '-c', code], cwd=CLI_DIR, capture_output=True, text=True)
+    elapsed = (time.perf_counter() - start) * 1000
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    return elapsed, result.stdout.strip()
+
+
+def run_python(code, repeat):
+    """執行 repeat 次，返回 (每次耗時毫秒的中位數, 最後一次的標準輸出)"""
+    times = []
+    output = ''
+    for _ in range(repeat):
+        elapsed, output = run_once(code)
+        times.append(elapsed)
+    return statistics.median(times), output
+
+
+def run_extra(code, repeat):
+    """與空白直譯器交替執行 repeat 次，返回 (額外時間毫秒的中位數, 最後一次的標準輸出)"""
+    extras = []
+    output = ''
+    for _ in range(repeat):
+        baseline, _ = run_once('pass')
+        elapsed, output = run_once(code)
+        extras.append(elapsed - baseline)
+    return statistics.median(extras), output
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Whitopia.jp 命令行啟動時間基準測試")
+    parser.add_argument('--repeat', type=int, default=20, help="每個項目的執行次數")
+    parser.add_argument('--budget', type=float, default=40.0, help="比空白直譯器多用的時間上限（毫秒）")
+    parser.add_argument('--commands', nargs='+', default=list(OFFLINE_COMMANDS), help="要測量的子命令")
+    args = parser.parse_args()
+
+    compileall.compile_dir(CLI_DIR, maxlevels=0, quiet=1)
+    baseline, _ = run_python('pass', args.repeat)
+    print(f"空白直譯器: {baseline:.1f} ms（以下為額外時間）")
+
+    failures = []
+    cases = [('--help', "import whitopia", ())]
+    for name in args.commands:
+        cases.append((name, LOAD_COMMAND.format(name=name, modules=NETWORK_MODULES), NETWORK_MODULES))
+
+    for label, code, forbidden in cases:
+        try:
+            extra, imported = run_extra(code, args.repeat)
+        except RuntimeError as e:
+            print(f"  {label:<10}無法載入: {e}")
+            continue
+        status = 'OK'
+        if forbidden and imported:
+            status = f'匯入了 {imported}'
+        elif extra > args.budget:
+            status = '超出上限'
+        if status != 'OK':
+            failures.append(label)
+        print(f"  {label:<10}{extra:>8.1f} ms  {status}")
+
+    if failures:
+        print(f"\n⚠️ 以下子命令的啟動不符合要求: {', '.join(failures)}")
+        return 1
+    print(f"\n✅ 所有子命令的額外啟動時間都在 {args.budget:.0f} ms 以內，且沒有匯入網絡套件")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Whitopia.jp 開業統計（向量化）
+把店鋪記錄載入為 NumPy 欄位陣列，以 bincount 計算按月、按週、按都道府縣及
+都道府縣×月份的統計，以及累計店鋪數、移動平均開業數和開業間隔。
+安裝了 pandas 時可以用 to_dataframe() 取得 DataFrame 作進一步分析
+"""
+
+import json
+
+import numpy as np
+
+from whitopia_codec import load_analysis
+from whitopia_stream import is_jsonl, iter_jsonl
+
+
+def factorize(values):
+    """把字串轉成整數代碼；返回 (代碼陣列, 類別列表)，空字串的代碼為 -1"""
+    index = {}
+    codes = np.fromiter(
+        (index.setdefault(value, len(index)) if value else -1 for value in values),
+        dtype=np.int64, count=len(values)
+    )
+    return codes, list(index)
+
+
+def to_day(date):
+    try:
+        return np.datetime64(date, 'D')
+    except ValueError:
+        return np.datetime64('NaT')
+
+
+def parse_dates(dates):
+    """
+    把 YYYY-MM-DD 字串轉成 datetime64[D] 陣列，空白或格式錯誤的日期為 NaT
+
+    不同的日期數量遠少於記錄數量，只轉換每個不同的字串一次
+    """
+    codes, labels = factorize(dates)
+    # 代碼 -1（空白日期）對應最後一個元素 NaT
+    converted = np.array([to_day(date) for date in labels] + [np.datetime64('NaT')], dtype='datetime64[D]')
+    return converted[codes]
+
+
+def bincount_dict(labels, codes, minlength=0):
+    """按代碼計數，返回 {標籤: 數量}（只含非零項）"""
+    counts = np.bincount(codes, minlength=minlength)
+    nonzero = np.flatnonzero(counts)
+    return {labels[i]: int(counts[i]) for i in nonzero}
+
+
+def interval_stats(days):
+    """間隔天數的統計"""
+    if len(days) == 0:
+        return {'count': 0, 'mean': None, 'median': None, 'min': None, 'max': None}
+    return {
+        'count': int(len(days)),
+        'mean': float(days.mean()),
+        'median': float(np.median(days)),
+        'min': int(days.min()),
+        'max': int(days.max())
+    }
+
+
+class OpeningFrame:
+    """店鋪記錄的欄位陣列"""
+
+    def __init__(self, dates, prefectures, store_names):
+        self.dates = parse_dates(dates)
+        self.prefecture_codes, self.prefectures = factorize(prefectures)
+        self.store_names = np.array(store_names, dtype=object)
+
+        self.valid = ~np.isnat(self.dates)
+        self.days = self.dates[self.valid].astype(np.int64)
+        self.months = self.dates[self.valid].astype('datetime64[M]').astype(np.int64)
+        self.first_month = int(self.months.min()) if len(self.months) else 0
+        self.month_count = int(self.months.max()) - self.first_month + 1 if len(self.months) else 0
+
+    @classmethod
+    def from_records(cls, records):
+        dates, prefectures, store_names = [], [], []
+        for record in records:
+            dates.append(record.get('date') or '')
+            prefectures.append(record.get('prefecture') or '')
+            store_names.append(record.get('store_name') or '')
+        return cls(dates, prefectures, store_names)
+
+    def __len__(self):
+        return len(self.dates)
+
+    def month_labels(self):
+        """從最早到最晚的連續月份（YYYY-MM）"""
+        months = np.arange(self.first_month, self.first_month + self.month_count).astype('datetime64[M]')
+        return [str(month) for month in months]
+
+    def month_series(self):
+        """連續月份的開業數（沒有開業的月份為 0）"""
+        return np.bincount(self.months - self.first_month, minlength=self.month_count)
+
+    def monthly_counts(self):
+        """按月份統計（與 OpeningStats.monthly_stats 相同）"""
+        return bincount_dict(self.month_labels(), self.months - self.first_month, self.month_count)
+
+    def weekly_counts(self):
+        """按週統計，鍵為該週星期一的日期"""
+        if not len(self.days):
+            return {}
+        # 1970-01-01 是星期四，(天數 + 3) % 7 為距離星期一的天數
+        weeks = self.days - (self.days + 3) % 7
+        first = int(weeks.min())
+        codes = (weeks - first) // 7
+        labels = [str(day) for day in np.arange(first, int(weeks.max()) + 1, 7).astype('datetime64[D]')]
+        return bincount_dict(labels, codes, len(labels))
+
+    def prefecture_counts(self):
+        """按都道府縣統計（與 OpeningStats.prefecture_stats 相同）"""
+        codes = self.prefecture_codes[self.prefecture_codes >= 0]
+        return bincount_dict(self.prefectures, codes, len(self.prefectures))
+
+    def prefecture_month_matrix(self):
+        """都道府縣×月份的開業數矩陣（行為 self.prefectures，列為 month_labels()）"""
+        codes = self.prefecture_codes[self.valid]
+        known = codes >= 0
+        flat = codes[known] * self.month_count + (self.months[known] - self.first_month)
+        counts = np.bincount(flat, minlength=len(self.prefectures) * self.month_count)
+        return counts.reshape(len(self.prefectures), self.month_count)
+
+    def prefecture_month_counts(self):
+        """按都道府縣及月份統計，返回 {都道府縣: {月份: 數量}}"""
+        matrix = self.prefecture_month_matrix()
+        labels = self.month_labels()
+        result = {}
+        for row, prefecture in enumerate(self.prefectures):
+            columns = np.flatnonzero(matrix[row])
+            if len(columns):
+                result[prefecture] = {labels[i]: int(matrix[row, i]) for i in columns}
+        return result
+
+    def cumulative_counts(self):
+        """每個月底的累計開業數"""
+        return dict(zip(self.month_labels(), self.month_series().cumsum().tolist()))
+
+    def rolling_rate(self, window=3):
+        """最近 window 個月的平均每月開業數"""
+        series = self.month_series()
+        if not len(series):
+            return {}
+        sums = np.convolve(series, np.ones(window, dtype=np.int64))[:len(series)]
+        # 最初幾個月不足 window 個月，以實際月數平均
+        months = np.minimum(np.arange(1, len(series) + 1), window)
+        return dict(zip(self.month_labels(), (sums / months).round(3).tolist()))
+
+    def intervals(self):
+        """相鄰兩次開業的間隔天數（全部及按都道府縣）"""
+        overall = interval_stats(np.diff(np.sort(self.days)))
+
+        codes = self.prefecture_codes[self.valid]
+        order = np.lexsort((self.days, codes))
+        sorted_codes = codes[order]
+        gaps = np.diff(self.days[order])
+        same = (sorted_codes[1:] == sorted_codes[:-1]) & (sorted_codes[1:] >= 0)
+        gap_codes = sorted_codes[1:][same]
+        gaps = gaps[same]
+
+        by_prefecture = {}
+        for code, prefecture in enumerate(self.prefectures):
+            prefecture_gaps = gaps[gap_codes == code]
+            if len(prefecture_gaps):
+                by_prefecture[prefecture] = interval_stats(prefecture_gaps)
+        return {'overall': overall, 'by_prefecture': by_prefecture}
+
+    def summary(self, window=3):
+        """所有統計"""
+        return {
+            'total_stores': len(self),
+            'dated_stores': int(self.valid.sum()),
+            'monthly_stats': self.monthly_counts(),
+            'weekly_stats': self.weekly_counts(),
+            'prefecture_stats': self.prefecture_counts(),
+            'prefecture_monthly_stats': self.prefecture_month_counts(),
+            'cumulative_stores': self.cumulative_counts(),
+            'rolling_rate': {'window_months': window, 'rates': self.rolling_rate(window)},
+            'intervals': self.intervals()
+        }
+
+    def to_dataframe(self):
+        """轉換成 pandas DataFrame（需要安裝 pandas）"""
+        # pandas 載入很慢，只在需要時才匯入
+        try:
+            import pandas as pd
+        except ImportError:
+            raise ImportError("to_dataframe() 需要安裝 pandas") from None
+        prefectures = np.array(self.prefectures + [''], dtype=object)
+        return pd.DataFrame({
+            'date': self.dates,
+            'prefecture': prefectures[self.prefecture_codes],
+            'store_name': self.store_names
+        })
+
+
+def load_openings(path):
+    """讀取改進版分析器的結果（.json / .msgpack 或串流 .jsonl）中的店鋪記錄"""
+    if is_jsonl(path):
+        return OpeningFrame.from_records(iter_jsonl(path))
+    data = load_analysis(path)
+    return OpeningFrame.from_records(data.get('store_openings', []))
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Whitopia.jp 開業統計（向量化）")
+    parser.add_argument('input', nargs='?', default='whitopia_detailed_analysis.json',
+                        help="分析結果（.json 或 .jsonl）")
+    parser.add_argument('--db', metavar='FILE', help="從 SQLite 歷史資料庫讀取全部店鋪記錄")
+    parser.add_argument('--window', type=int, default=3, help="移動平均的月數")
+    parser.add_argument('--output', default='whitopia_stats.json', help="輸出文件")
+    args = parser.parse_args(argv)
+
+    if args.db:
+        from whitopia_db import WhitopiaDB
+        with WhitopiaDB(args.db) as db:
+            frame = OpeningFrame.from_records(db.query_openings())
+    else:
+        frame = load_openings(args.input)
+
+    result = frame.summary(args.window)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+
+    intervals = result['intervals']['overall']
+    print(f"店鋪記錄: {result['total_stores']} 筆（有日期 {result['dated_stores']} 筆）")
+    print(f"月份: {len(result['monthly_stats'])} 個，都道府縣: {len(result['prefecture_stats'])} 個")
+    if intervals['count']:
+        print(f"開業間隔: 平均 {intervals['mean']:.1f} 天，中位數 {intervals['median']:.1f} 天")
+    print(f"統計結果已保存到 {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Whitopia.jp 串流輸入輸出
+以 JSON Lines 逐項寫出/讀取新聞項目，並以增量方式累計開業統計
+
+只有以 JSONL 為輸入的串流分析（改進版分析器的 --stream）記憶體用量不隨項目數量增長；
+一般的 analyze() 需要按日期排序並輸出完整記錄列表，記錄數量仍然留在記憶體中
+"""
+
+import json
+
+from whitopia_records import NewsItem, TextStore
+
+HEADER_KEY = '_header'
+SUMMARY_KEY = '_summary'
+
+
+class JsonlWriter:
+    """逐行寫出 JSON 記錄，第一行為標頭"""
+
+    def __init__(self, path, header=None):
+        self.path = path
+        self.count = 0
+        self._file = open(path, 'w', encoding='utf-8')
+        if header is not None:
+            self._write({HEADER_KEY: header})
+
+    def _write(self, record):
+        self._file.write(json.dumps(record, ensure_ascii=False))
+        self._file.write('\n')
+
+    def write(self, record):
+        self._write(record)
+        self.count += 1
+
+    def write_summary(self, summary):
+        """在最後一行寫出摘要（讀取記錄時會跳過）"""
+        self._write({SUMMARY_KEY: summary})
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def news_item_key(item):
+    """新聞項目的唯一鍵（列表頁項目常共用同一個 URL，因此加上日期和標題）"""
+    return f"{item.get('url', '')}|{item.get('date', '')}|{item.get('title', '')}"
+
+
+def is_jsonl(path):
+    return path.endswith('.jsonl')
+
+
+def read_header(path):
+    """讀取 JSONL 文件的標頭；舊格式 JSON 文件返回 None"""
+    if not is_jsonl(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        first_line = f.readline()
+    if not first_line.strip():
+        return None
+    record = json.loads(first_line)
+    return record.get(HEADER_KEY)
+
+
+def iter_jsonl(path):
+    """逐行讀取 JSONL 記錄（跳過標頭和空行）"""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            if HEADER_KEY in record or SUMMARY_KEY in record:
+                continue
+            yield record
+
+
+def iter_news_items(path, store_only=False):
+    """
+    逐項讀取新聞項目
+
+    支援串流格式（.jsonl，店鋪相關項目以 store_related 標記）
+    及舊的 whitopia_news.json 格式（all_news / store_news 兩個列表，也可以是 .msgpack）
+    """
+    if is_jsonl(path):
+        for item in iter_jsonl(path):
+            if not store_only or item.get('store_related'):
+                yield item
+        return
+
+    from whitopia_codec import load_news
+
+    data = load_news(path)
+    yield from data.get('store_news' if store_only else 'all_news', [])
+
+
+class NewsSource:
+    """
+    爬蟲結果的讀取來源
+
+    舊格式 JSON（或 .msgpack）一次載入並按 schema 驗證；JSONL 則逐行讀取，
+    項目數量在讀取過程中累計到 meta
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._data = None
+        if is_jsonl(path):
+            self.meta = dict(read_header(path) or {})
+        else:
+            from whitopia_codec import load_news
+
+            data = load_news(path)
+            self.meta = {key: value for key, value in data.items()
+                         if key not in ('all_news', 'store_news')}
+            # 只保留店鋪相關項目，以緊湊記錄保存，內容放在暫存文件中
+            self._texts = TextStore()
+            self._data = [NewsItem.from_dict(item, self._texts) for item in data.get('store_news', [])]
+
+    def iter_store_news(self):
+        """逐項返回店鋪相關的新聞項目"""
+        if self._data is not None:
+            yield from self._data
+            return
+
+        total = store_related = 0
+        for item in iter_jsonl(self.path):
+            total += 1
+            if item.get('store_related'):
+                store_related += 1
+                yield item
+        self.meta['total_items'] = total
+        self.meta['store_related_items'] = store_related
+
+
+class OpeningStats:
+    """增量累計店鋪開業統計"""
+
+    def __init__(self):
+        self.total = 0
+        self.identified = 0
+        self.monthly_stats = {}
+        self.prefecture_stats = {}
+
+    def add(self, store):
+        self.total += 1
+        if store.get('store_name'):
+            self.identified += 1
+
+        if store.get('date'):
+            month = store['date'][:7]  # YYYY-MM
+            self.monthly_stats[month] = self.monthly_stats.get(month, 0) + 1
+
+        if store.get('prefecture'):
+            self.prefecture_stats[store['prefecture']] = self.prefecture_stats.get(store['prefecture'], 0) + 1
+
+    def merge(self, other):
+        """合併另一份統計"""
+        self.total += other.total
+        self.identified += other.identified
+        for month, count in other.monthly_stats.items():
+            self.monthly_stats[month] = self.monthly_stats.get(month, 0) + count
+        for prefecture, count in other.prefecture_stats.items():
+            self.prefecture_stats[prefecture] = self.prefecture_stats.get(prefecture, 0) + count
+
+    def date_range(self):
+        if not self.monthly_stats:
+            return None, None
+        return min(self.monthly_stats), max(self.monthly_stats)
+
+    def summary(self):
+        start, end = self.date_range()
+        return {
+            'total_identified_stores': self.identified,
+            'prefectures_count': len(self.prefecture_stats),
+            'date_range': {
+                'start': start,
+                'end': end
+            }
+        }
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Whitopia.jp 監視模式
+常駐執行並重用同一個爬蟲（連接保持 keep-alive），按自適應間隔輪詢お知らせ頁面：
+頁面有變化後縮短間隔，長時間沒有變化則逐步延長。
+只把新增或內容改變的公告作為事件輸出到終端、JSONL 文件或回調函數
+"""
+
+import hashlib
+import json
+import sys
+import threading
+from datetime import datetime
+
+from whitopia_extract import STORE_KEYWORD_AUTOMATON
+from whitopia_stream import news_item_key
+
+# 記住的公告數量上限（超過時忘記最舊的）
+MAX_KNOWN_ITEMS = 5000
+
+
+def item_fingerprint(item):
+    text = item.get('title', '') + '\n' + item.get('content', '')
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+class StdoutSink:
+    """把事件逐行以 JSON 輸出到標準輸出"""
+
+    def __call__(self, event):
+        print(json.dumps(event, ensure_ascii=False), flush=True)
+
+
+class JsonlSink:
+    """把事件追加到 JSONL 文件"""
+
+    def __init__(self, path):
+        self.path = path
+
+    def __call__(self, event):
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(event, ensure_ascii=False))
+            f.write('\n')
+
+
+class AdaptiveInterval:
+    """輪詢間隔：有變化時回到最短間隔，沒有變化時乘以 backoff，直到最長間隔"""
+
+    def __init__(self, min_interval=60, max_interval=1800, backoff=1.5):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.current = min_interval
+
+    def update(self, changed):
+        if changed:
+            self.current = self.min_interval
+        else:
+            self.current = min(self.current * self.backoff, self.max_interval)
+        return self.current
+
+
+class NewsWatcher:
+    """
+    輪詢お知らせ頁面並輸出變化
+
+    sinks 為可呼叫物件的列表，每個事件呼叫一次：
+    {'event': 'new' 或 'changed', 'detected_at': ..., 'item': 新聞項目}
+    """
+
+    def __init__(self, scraper, sinks, interval=None, store_only=False,
+                 state_file=None, automaton=STORE_KEYWORD_AUTOMATON):
+        self.scraper = scraper
+        self.sinks = sinks
+        self.interval = interval or AdaptiveInterval()
+        self.store_only = store_only
+        self.state_file = state_file
+        self.automaton = automaton
+        # 是否已有基準：狀態文件存在（即使沒有任何公告）或已成功輪詢過一次
+        self.baseline_established = False
+        self.known = self.load_state()
+        self.polls = 0
+        self.events = 0
+        self._stop = threading.Event()
+
+    def load_state(self):
+        """載入上次執行時已知的公告（鍵 → 內容指紋）"""
+        if not self.state_file:
+            return {}
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                known = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+        self.baseline_established = True
+        return known
+
+    def save_state(self):
+        if self.state_file:
+            with open(self.state_file, 'w', encoding='utf-8') as f:
+                json.dump(self.known, f, ensure_ascii=False)
+
+    def diff(self, news_items):
+        """返回新增或改變的 (事件類型, 項目)，並更新已知公告"""
+        changes = []
+        for item in news_items:
+            if not item:
+                continue
+            key = news_item_key(item)
+            fingerprint = item_fingerprint(item)
+            previous = self.known.get(key)
+            if previous == fingerprint:
+                continue
+            changes.append(('new' if previous is None else 'changed', item))
+            self.known.pop(key, None)
+            self.known[key] = fingerprint
+
+        # 只保留最近的公告
+        for key in list(self.known)[:max(0, len(self.known) - MAX_KNOWN_ITEMS)]:
+            del self.known[key]
+        return changes
+
+    def emit(self, event_type, item):
+        keyword = self.automaton.first(item.get('title', '') + ' ' + item.get('content', ''))
+        if keyword:
+            item['match_keyword'] = keyword
+        elif self.store_only:
+            return
+        event = {'event': event_type, 'detected_at': datetime.now().isoformat(), 'item': item}
+        for sink in self.sinks:
+            sink(event)
+        self.events += 1
+
+    def poll(self, emit=True):
+        """輪詢一次，返回是否有變化；抓取失敗時引發該錯誤（已知公告不變）"""
+        self.polls += 1
+        self.scraper.last_error = None
+        news_items = self.scraper.scrape_news_list()
+        if self.scraper.last_error is not None:
+            raise self.scraper.last_error
+        changes = self.diff(news_items)
+        if changes:
+            self.save_state()
+            if emit:
+                for event_type, item in changes:
+                    self.emit(event_type, item)
+        return bool(changes)
+
+    def establish_baseline(self, emit=False):
+        """
+        以第一次成功的輪詢建立基準（即使頁面沒有任何公告），之後的輪詢才輸出變化；
+        emit=True 時基準中的公告也輸出事件。抓取失敗時記錄錯誤，下次輪詢再試
+        """
+        try:
+            self.poll(emit=emit)
+        except Exception as e:
+            log(f"建立基準失敗: {e}")
+            return
+        self.baseline_established = True
+        self.save_state()
+        log(f"已建立基準: {len(self.known)} 個公告")
+
+    def run(self, max_polls=None, emit_initial=False):
+        """
+        持續輪詢直到 stop() 或達到 max_polls
+
+        還沒有基準時，第一次成功的輪詢只建立基準（emit_initial=True 時也輸出事件）
+        """
+        if not self.baseline_established:
+            self.establish_baseline(emit_initial)
+
+        while not self._stop.is_set() and (max_polls is None or self.polls < max_polls):
+            wait = self.interval.current
+            if self._stop.wait(wait):
+                break
+            if not self.baseline_established:
+                self.establish_baseline(emit_initial)
+                continue
+            try:
+                changed = self.poll()
+            except Exception as e:
+                log(f"輪詢失敗: {e}")
+                changed = False
+            self.interval.update(changed)
+            if changed:
+                log(f"發現變化，{self.interval.current:.0f} 秒後再次輪詢")
+
+    def stop(self):
+        self._stop.set()
+
+
+def log(message):
+    """進度信息輸出到標準錯誤，標準輸出只保留事件"""
+    print(message, file=sys.stderr, flush=True)
+
+
+def main(argv=None):
+    import argparse
+
+    from whitopia_cache import ResponseCache
+    from whitopia_scraper import WhitopiaScraper
+
+    parser = argparse.ArgumentParser(description="Whitopia.jp 監視模式")
+    parser.add_argument('--min-interval', type=float, default=60, help="最短輪詢間隔（秒）")
+    parser.add_argument('--max-interval', type=float, default=1800, help="最長輪詢間隔（秒）")
+    parser.add_argument('--backoff', type=float, default=1.5, help="沒有變化時間隔的倍數")
+    parser.add_argument('--jsonl', metavar='FILE', help="把事件追加到 JSONL 文件（而不是輸出到終端）")
+    parser.add_argument('--store-only', action='store_true', help="只輸出店鋪開業相關的公告")
+    parser.add_argument('--state-file', default='whitopia_watch_state.json', help="已知公告的狀態文件")
+    parser.add_argument('--emit-initial', action='store_true', help="第一次輪詢時也輸出全部公告")
+    parser.add_argument('--max-polls', type=int, default=None, help="輪詢次數上限")
+    parser.add_argument('--cache-dir', default='.whitopia_cache', help="HTTP 回應快取目錄（用於條件請求）")
+    args = parser.parse_args(argv)
+
+    scraper = WhitopiaScraper(cache=ResponseCache(args.cache_dir), quiet=True)
+    sinks = [JsonlSink(args.jsonl)] if args.jsonl else [StdoutSink()]
+    watcher = NewsWatcher(
+        scraper, sinks,
+        interval=AdaptiveInterval(args.min_interval, args.max_interval, args.backoff),
+        store_only=args.store_only,
+        state_file=args.state_file
+    )
+
+    log(f"開始監視 {scraper.base_url}（間隔 {args.min_interval:.0f}~{args.max_interval:.0f} 秒）")
+    try:
+        watcher.run(max_polls=args.max_polls, emit_initial=args.emit_initial)
+    except KeyboardInterrupt:
+        pass
+    log(f"監視結束: 輪詢 {watcher.polls} 次，輸出 {watcher.events} 個事件")
+
+
+if __name__ == "__main__":
+    main()